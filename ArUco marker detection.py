@@ -1,8 +1,16 @@
 import cv2
-import numpy as np
 from cv2 import aruco
+import argparse
 import os
-from tkinter import Tk, filedialog
+import time
+
+from async_saver import AsyncSaver
+from filters import apply_filters
+from frame_pipeline import FramePipeline
+from frame_profiler import FrameProfiler
+from frame_sources import open_frame_source
+from gui_overlay import Button, ButtonOverlay
+from marker_detection import detect_markers  # Cached detector, see marker_detection.py
 
 # Helper Functions
 
@@ -23,91 +31,31 @@ def generate_aruco_markers():
         print(f"Error generating ArUco markers: {str(e)}")
         return False
 
-# Function to detect ArUco markers in a given frame
-def detect_markers(frame):
-    try:
-        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)  # Convert frame to grayscale
-        aruco_dict = aruco.getPredefinedDictionary(aruco.DICT_6X6_250)  # Predefined dictionary for detection
-        parameters = aruco.DetectorParameters()  # Detection parameters
-        detector = aruco.ArucoDetector(aruco_dict, parameters)  # ArUco detector
-        corners, ids, rejected = detector.detectMarkers(gray)  # Detect markers
-        return corners, ids
-    except Exception as e:
-        print(f"Error detecting markers: {str(e)}")
-        return None, None
-
-# Function to apply filters to the frame
-def apply_filters(frame, filter_type):
-    try:
-        if filter_type == 'grayscale':
-            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)  # Convert to grayscale
-        elif filter_type == 'blur':
-            return cv2.GaussianBlur(frame, (5, 5), 0)  # Apply Gaussian blur
-        elif filter_type == 'edge':
-            gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
-            return cv2.Canny(gray, 100, 200)  # Apply edge detection
-        elif filter_type == 'sharpen':
-            kernel = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]])  # Sharpening kernel
-            return cv2.filter2D(frame, -1, kernel)  # Apply sharpening filter
-        return frame
-    except Exception as e:
-        print(f"Error applying filter {filter_type}: {str(e)}")
-        return frame
-
-# Function to save the output frame to a file
-def save_output(frame):
+# Function to queue the output frame for saving; encoding and writing happen in the background
+def save_output(saver, frame):
     try:
-        Tk().withdraw()  # Hide the root Tkinter window
-        file_path = filedialog.asksaveasfilename(defaultextension=".png", filetypes=[
-            ("PNG files", "*.png"),
-            ("JPEG files", "*.jpg"),
-            ("All files", "*.*")
-        ])
+        file_path = saver.save(frame)  # Named by the saver's pattern, no dialog
         if file_path:
-            cv2.imwrite(file_path, frame)  # Save the frame to the selected file
-            print(f"Frame saved to {file_path}")
+            print(f"Saving frame to {file_path}")
+        else:
+            print("Save queue is full, frame not saved")
     except Exception as e:
         print(f"Error saving output: {str(e)}")
 
 # GUI Classes
 
-# Class for button objects
-class Button:
-    def __init__(self, x, y, width, height, text, action):
-        self.x = x
-        self.y = y
-        self.width = width
-        self.height = height
-        self.text = text
-        self.action = action  # Function to execute when the button is clicked
-
-    # Check if the button was clicked
-    def is_clicked(self, mouse_x, mouse_y):
-        return self.x <= mouse_x <= self.x + self.width and self.y <= mouse_y <= self.y + self.height
-
-    # Draw the button on the frame
-    def draw(self, img, color=(200, 200, 200), text_color=(0, 0, 0)):
-        cv2.rectangle(img, (self.x, self.y), (self.x + self.width, self.y + self.height), color, -1)
-        cv2.rectangle(img, (self.x, self.y), (self.x + self.width, self.y + self.height), (0, 0, 0), 1)
-
-        font = cv2.FONT_HERSHEY_SIMPLEX
-        font_scale = 0.5
-        thickness = 1
-        text_size = cv2.getTextSize(self.text, font, font_scale, thickness)[0]
-        text_x = self.x + (self.width - text_size[0]) // 2
-        text_y = self.y + (self.height + text_size[1]) // 2
-
-        cv2.putText(img, self.text, (text_x, text_y), font, font_scale, text_color, thickness)
-
 # Class for the GUI interface
 class GUI:
-    def __init__(self):
+    def __init__(self, saver=None, burst_frames=10):
+        self.saver = saver  # AsyncSaver the loop hands frames to
+        self.burst_frames = burst_frames  # Frames recorded by the Burst button
         self.buttons = []  # List of buttons
         self.current_filter = None  # Currently applied filter
         self.should_quit = False  # Flag to indicate quitting the application
-        self.save_action = False  # Flag for saving frame
+        self.save_action = False  # Flag for saving frame, handled by the video loop on the next frame
         self.transformed_frame = None  # Transformed frame after applying filters
         self.setup_buttons()  # Initialize buttons
+        self.overlay = ButtonOverlay(self.buttons)  # Button bar rendered once, blitted every frame
 
     # Setup buttons with their positions and actions
     def setup_buttons(self):
@@ -117,25 +65,25 @@ class GUI:
         x, y = margin, margin
 
         # Add filter buttons
-        self.buttons.append(Button(x, y, button_width, button_height, "Grayscale", lambda: self.set_filter('grayscale')))
-        x += button_width + margin
-        self.buttons.append(Button(x, y, button_width, button_height, "Blur", lambda: self.set_filter('blur')))
-        x += button_width + margin
-        self.buttons.append(Button(x, y, button_width, button_height, "Edge Detection", lambda: self.set_filter('edge')))
-        x += button_width + margin
-        self.buttons.append(Button(x, y, button_width, button_height, "Sharpen", lambda: self.set_filter('sharpen')))
+        self.filter_buttons = {}  # filter type -> button, used to highlight the active filter
+        for text, filter_type in (("Grayscale", 'grayscale'), ("Blur", 'blur'), ("Edge Detection", 'edge'), ("Sharpen", 'sharpen')):
+            button = Button(x, y, button_width, button_height, text, lambda f=filter_type: self.set_filter(f))
+            self.buttons.append(button)
+            self.filter_buttons[filter_type] = button
+            x += button_width + margin
 
         # Add control buttons
         x = margin
         y += button_height + margin
         self.buttons.append(Button(x, y, button_width, button_height, "Save Frame", self.save_frame))
         x += button_width + margin
+        self.buttons.append(Button(x, y, button_width, button_height, f"Burst x{self.burst_frames}", self.burst))
+        x += button_width + margin
         self.buttons.append(Button(x, y, button_width, button_height, "Quit", self.quit))
 
     # Draw all buttons on the frame
     def draw_buttons(self, frame):
-        for button in self.buttons:
-            button.draw(frame)
+        self.overlay.composite(frame)
 
     # Handle mouse click events
     def handle_click(self, x, y, frame):
@@ -149,57 +97,124 @@ class GUI:
     # Set the current filter
     def set_filter(self, filter_type):
         self.current_filter = filter_type
+        for button in self.buttons:
+            button.active = self.filter_buttons.get(filter_type) is button
+        self.overlay.invalidate()  # Highlight changed, re-render the button bar once
         print(f"Filter set to: {filter_type}")
 
-    # Save the current transformed frame
+    # Save the next displayed frame (without the button bar); only sets a flag, the loop never waits
     def save_frame(self):
-        if self.transformed_frame is not None:
-            save_output(self.transformed_frame)
+        self.save_action = True
+
+    # Save the next burst_frames displayed frames
+    def burst(self):
+        if self.saver is not None:
+            self.saver.start_burst(self.burst_frames)
 
     # Quit the application
     def quit(self):
         self.should_quit = True
 
-# Main function to run the application
-def main():
-    cap = cv2.VideoCapture(0)  # Open the default camera
+# Worker-side processing: apply the selected filter and detect markers; stage times go into item.timings
+def process_frame(gui, item):
+    frame = item.frame  # The capture thread hands each frame to exactly one worker, no copy needed
+    start = time.perf_counter()
+    item.corners, item.ids = detect_markers(frame)
+    detected = time.perf_counter()
+    item.timings["detect"] = detected - start
+
+    display_frame = frame
+    filter_type = gui.current_filter  # Read once, the GUI may change it mid-frame
+    if filter_type:
+        display_frame = apply_filters(frame, filter_type, output_channels=3)  # Keep 3 channels for the color overlays
+    filtered = time.perf_counter()
+    item.timings["filter"] = filtered - detected
+    if item.ids is not None:
+        aruco.drawDetectedMarkers(display_frame, item.corners, item.ids)
+    item.timings["markers"] = time.perf_counter() - filtered
+    item.output = display_frame
+
+# Main function to run the application; saved frames go to output_dir, see async_saver.py. Frame timings
+# are shown with 'h' and, with profile_log, appended to a CSV / JSON lines log, see frame_profiler.py
+def main(source=0, workers=2, output_dir="captures", burst_frames=10, hud=False, profile_log=None,
+         profile_interval=10.0):
+    cap = open_frame_source(source)  # Camera index, video file or image directory
     if not cap.isOpened():
         print("Error: Could not open camera")
         return
 
-    gui = GUI()  # Initialize GUI
-
-    try:
-        while not gui.should_quit:
-            ret, frame = cap.read()  # Capture frame from camera
-            if not ret:
-                print("Failed to grab frame")
-                break
-
-            display_frame = frame.copy()  # Create a copy for display
+    saver = AsyncSaver(output_dir)  # Background encoding and writing of saved frames
+    gui = GUI(saver, burst_frames)  # Initialize GUI
+    profiler = FrameProfiler(hud=hud, log_path=profile_log, log_interval=profile_interval)
+    pipeline = FramePipeline(cap, lambda item: process_frame(gui, item), workers=workers)
+    latest = {'frame': None}
 
-            # Apply the selected filter
-            if gui.current_filter:
-                display_frame = apply_filters(display_frame, gui.current_filter)
-                gui.transformed_frame = display_frame
-
-            # Draw GUI buttons
-            gui.draw_buttons(display_frame)
-
-            cv2.imshow('Camera Feed', display_frame)  # Show the camera feed with GUI
-
-            # Handle mouse click events
-            def mouse_event(event, x, y, flags, param):
-                if event == cv2.EVENT_LBUTTONDOWN:
-                    gui.handle_click(x, y, frame)
+    # Handle mouse click events
+    def mouse_event(event, x, y, flags, param):
+        if event == cv2.EVENT_LBUTTONDOWN:
+            gui.handle_click(x, y, latest['frame'])
 
-            cv2.setMouseCallback('Camera Feed', mouse_event)
+    cv2.namedWindow('Camera Feed')
+    cv2.setMouseCallback('Camera Feed', mouse_event)
 
-            if cv2.waitKey(1) & 0xFF == ord('q'):  # Quit if 'q' is pressed
+    try:
+        pipeline.start()
+        while not gui.should_quit:
+            item = pipeline.next_result(timeout=0.01)
+            if item is None:
+                if pipeline.finished:
+                    if pipeline.capture_failed:
+                        print("Failed to grab frame")
+                    break
+            else:
+                display_frame = item.output
+                latest['frame'] = item.frame
+                if gui.current_filter:
+                    gui.transformed_frame = display_frame
+
+                # Queue frames for saving before the buttons are drawn into them
+                if gui.save_action:
+                    gui.save_action = False
+                    save_output(saver, display_frame)
+                saver.offer(display_frame)  # Saves the frame while a burst is running
+
+                # Draw GUI buttons
+                with profiler.timed("buttons"):
+                    gui.draw_buttons(display_frame)
+                profiler.draw_hud(display_frame)
+
+                with profiler.timed("display"):
+                    cv2.imshow('Camera Feed', display_frame)  # Show the camera feed with GUI
+                profiler.frame_done(item.timings, latency=item.latency(), dropped=pipeline.dropped)
+                profiler.maybe_export()
+
+            key = cv2.waitKey(1) & 0xFF
+            if key == ord('q'):  # Quit if 'q' is pressed
                 break
+            if key == ord('s'):  # Save the next frame
+                gui.save_frame()
+            elif key == ord('b'):  # Record a burst
+                gui.burst()
+            elif key == ord('h'):  # Show / hide the performance HUD
+                profiler.toggle_hud()
     finally:
+        pipeline.stop()
         cap.release()  # Release the camera
         cv2.destroyAllWindows()  # Close all OpenCV windows
+        print(pipeline.report())
+        print(profiler.report())
+        profiler.maybe_export(force=True)
+        saver.close()  # Waits for the frames still being written
+        print(f"Saver: {saver.format_stats()}")
 
 if __name__ == '__main__':
-    main()
+    parser = argparse.ArgumentParser(description="ArUco marker detection with filters, saving and a performance HUD")
+    parser.add_argument("source", nargs="?", default=0, help="camera index, video file or image directory")
+    parser.add_argument("output_dir", nargs="?", default="captures", help="directory for saved frames")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--hud", action="store_true", help="start with the performance HUD shown ('h' toggles)")
+    parser.add_argument("--profile-log", help="append frame stats to this .csv or .jsonl file")
+    parser.add_argument("--profile-interval", type=float, default=10.0, help="seconds between log entries")
+    args = parser.parse_args()
+    main(args.source, args.workers, args.output_dir, hud=args.hud, profile_log=args.profile_log,
+         profile_interval=args.profile_interval)
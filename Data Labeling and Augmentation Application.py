@@ -2,13 +2,34 @@ import cv2
 import numpy as np
 import tkinter as tk
 from tkinter import ttk, filedialog
-from PIL import Image, ImageTk
 import os
+import functools
+
+from async_saver import AsyncSaver
+from cropping import crop_roi, export_roi, roi_from_points
+from image_cache import default_cache
+from tiled_image import TiledImage
+
+PREVIEW_DELAY_MS = 30  # Slider events arriving within this window are coalesced into one preview
+
+
+# 256-entry table equivalent to cv2.convertScaleAbs(img, alpha=1, beta=beta)
+@functools.lru_cache(maxsize=64)
+def brightness_lut(beta):
+    values = np.abs(np.arange(256, dtype=np.float64) + beta)
+    return np.clip(np.rint(values), 0, 255).astype(np.uint8)
 
 
 class ImageLabelingApp:
-    def __init__(self, root):
+    def __init__(self, root, export_format="npy", data_dtype=np.float32, save_dir=None,
+                 save_pattern="{prefix}_{timestamp}_{index:03d}"):
         self.root = root
+        self.export_format = export_format  # "npy", "raw" or the old "text" dump, see roi_export.py
+        self.data_dtype = data_dtype  # float32 or float16 for the normalized / standardized data
+        # Every save goes to a new <save_dir>/<save_pattern> folder, written in the background; the
+        # directory is asked for once (and again with "Save To...") when not given
+        self.saver = AsyncSaver(save_dir or "", pattern=save_pattern, prefix="roi")
+        self.save_dir = save_dir
         self.root.title("Image Labeling")
 
         # Main frame
@@ -17,8 +38,8 @@ class ImageLabelingApp:
 
         # Canvas and scrollbars
         self.canvas = tk.Canvas(self.main_frame)
-        self.v_scrollbar = ttk.Scrollbar(self.main_frame, orient="vertical", command=self.canvas.yview)
-        self.h_scrollbar = ttk.Scrollbar(self.main_frame, orient="horizontal", command=self.canvas.xview)
+        self.v_scrollbar = ttk.Scrollbar(self.main_frame, orient="vertical", command=self.scroll_y)
+        self.h_scrollbar = ttk.Scrollbar(self.main_frame, orient="horizontal", command=self.scroll_x)
 
         # Configure canvas
         self.canvas.configure(xscrollcommand=self.h_scrollbar.set, yscrollcommand=self.v_scrollbar.set)
@@ -40,10 +61,12 @@ class ImageLabelingApp:
         self.rotate_btn = ttk.Button(self.button_frame, text="Rotate", command=lambda: self.process_image(1))
         self.grayscale_btn = ttk.Button(self.button_frame, text="Grayscale", command=lambda: self.process_image(3))
         self.save_btn = ttk.Button(self.button_frame, text="Save", command=self.save_images_and_data)
+        self.save_to_btn = ttk.Button(self.button_frame, text="Save To...", command=self.choose_save_dir)
 
         self.rotate_btn.pack(side=tk.LEFT, padx=5, pady=5)
         self.grayscale_btn.pack(side=tk.LEFT, padx=5, pady=5)
         self.save_btn.pack(side=tk.LEFT, padx=5, pady=5)
+        self.save_to_btn.pack(side=tk.LEFT, padx=5, pady=5)
 
         # Sliders for brightness and color adjustment
         self.slider_frame = ttk.Frame(root)
@@ -57,19 +80,35 @@ class ImageLabelingApp:
         )
         self.brightness_slider.set(0)
         self.brightness_slider.pack(side=tk.LEFT, fill=tk.X, expand=True, padx=5)
+        # Full-resolution adjustment only once the user lets go of the slider
+        self.brightness_slider.bind("<ButtonRelease-1>", lambda event: self.commit_brightness())
+        self.brightness_slider.bind("<KeyRelease>", lambda event: self.commit_brightness())
 
         self.image = None
-        self.photo = None
         self.roi_start = None
         self.roi_end = None
         self.roi = None
         self.processed_image = None
         self.brightness_adjusted_image = None
+        self.roi_preview = None  # Screen-sized downsample of the ROI for live slider previews
+        self.brightness_value = 0.0
+        self.brightness_dirty = False  # Slider moved since the last full-resolution adjustment
+        self.preview_job = None
         self.processed_data = []
 
+        # Tiled display state: only the tiles in view are on the canvas, at one pyramid level
+        self.tiled = None
+        self.zoom_level = 0  # Pyramid level shown; canvas pixel * tiled.scale(level) = full-resolution pixel
+        self.tile_items = {}  # (tx, ty) -> (canvas item, PhotoImage)
+        self.render_job = None
+
         self.canvas.bind("<ButtonPress-1>", self.start_roi)
         self.canvas.bind("<B1-Motion>", self.draw_roi)
         self.canvas.bind("<ButtonRelease-1>", self.end_roi)
+        self.canvas.bind("<Configure>", lambda event: self.schedule_render())
+        self.canvas.bind("<Control-MouseWheel>", lambda event: self.zoom(-1 if event.delta > 0 else 1))
+        self.canvas.bind("<Control-Button-4>", lambda event: self.zoom(-1))  # X11 wheel up
+        self.canvas.bind("<Control-Button-5>", lambda event: self.zoom(1))  # X11 wheel down
 
     def load_image(self, path):
         # Convert path format
@@ -80,29 +119,83 @@ class ImageLabelingApp:
             return
 
         try:
-            # Load image using PIL first (for webp support)
-            pil_image = Image.open(path)
-            # Convert to RGB if needed
-            if pil_image.mode != "RGB":
-                pil_image = pil_image.convert("RGB")
-
-            # Convert PIL image to numpy array for OpenCV processing
-            self.image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+            # Decode once into a memory-mapped pyramid (reused on later loads), see tiled_image.py
+            self.tiled = TiledImage.open(path)
 
-            # Create PhotoImage for display
-            self.photo = ImageTk.PhotoImage(pil_image)
+            # Full-resolution BGR image for OpenCV processing; slicing reads only the slice from disk
+            self.image = self.tiled.full_res
 
-            # Update canvas
-            self.canvas.delete("all")
-            self.canvas.create_image(0, 0, image=self.photo, anchor="nw")
-            self.canvas.configure(scrollregion=self.canvas.bbox("all"))
+            # Start at full resolution, like before
+            self.show_level(0)
 
-            print("Image loaded successfully!")
+            print(f"Image loaded successfully! (image cache: {default_cache.stats.format()})")
 
         except Exception as e:
             print(f"Error loading image: {str(e)}")
             return
 
+    def scroll_x(self, *args):
+        self.canvas.xview(*args)
+        self.schedule_render()
+
+    def scroll_y(self, *args):
+        self.canvas.yview(*args)
+        self.schedule_render()
+
+    def zoom(self, step):
+        # Step one pyramid level coarser (+1) or finer (-1), keeping the view centered
+        if self.tiled is None:
+            return
+        level = min(max(0, self.zoom_level + step), len(self.tiled.levels) - 1)
+        if level == self.zoom_level:
+            return
+        center_x = self.canvas.canvasx(self.canvas.winfo_width() / 2)
+        center_y = self.canvas.canvasy(self.canvas.winfo_height() / 2)
+        factor = self.tiled.scale(self.zoom_level) / self.tiled.scale(level)
+        self.canvas.scale("roi", 0, 0, factor, factor)  # Keep the ROI outline on the same pixels
+        if self.roi_start:
+            self.roi_start = (self.roi_start[0] * factor, self.roi_start[1] * factor)
+        if self.roi_end:
+            self.roi_end = (self.roi_end[0] * factor, self.roi_end[1] * factor)
+        self.show_level(level, (center_x * factor, center_y * factor))
+
+    def show_level(self, level, center=None):
+        self.zoom_level = level
+        self.canvas.delete("tile")
+        self.tile_items = {}
+        height, width = self.tiled.levels[level]
+        self.canvas.configure(scrollregion=(0, 0, width, height))
+        if center is not None:
+            self.canvas.xview_moveto(max(0.0, (center[0] - self.canvas.winfo_width() / 2) / width))
+            self.canvas.yview_moveto(max(0.0, (center[1] - self.canvas.winfo_height() / 2) / height))
+        self.schedule_render()
+
+    def schedule_render(self):
+        if self.render_job is None:
+            self.render_job = self.root.after_idle(self.render_visible_tiles)
+
+    def render_visible_tiles(self):
+        from PIL import Image, ImageTk  # Only the tile display needs PIL, loaded on first render
+
+        # Put the tiles in view on the canvas and drop the ones that scrolled out
+        self.render_job = None
+        if self.tiled is None:
+            return
+        x0, y0 = self.canvas.canvasx(0), self.canvas.canvasy(0)
+        x1, y1 = x0 + self.canvas.winfo_width(), y0 + self.canvas.winfo_height()
+        visible = set(self.tiled.visible_tiles(self.zoom_level, x0, y0, x1, y1))
+        for key in [key for key in self.tile_items if key not in visible]:
+            self.canvas.delete(self.tile_items.pop(key)[0])
+        size = self.tiled.tile_size
+        for tx, ty in visible:
+            if (tx, ty) in self.tile_items:
+                continue
+            tile = self.tiled.tile(self.zoom_level, tx, ty)
+            photo = ImageTk.PhotoImage(Image.fromarray(cv2.cvtColor(tile, cv2.COLOR_BGR2RGB)))
+            item = self.canvas.create_image(tx * size, ty * size, image=photo, anchor="nw", tags="tile")
+            self.tile_items[(tx, ty)] = (item, photo)
+        self.canvas.tag_raise("roi")
+
     def start_roi(self, event):
         self.roi_start = (self.canvas.canvasx(event.x), self.canvas.canvasy(event.y))
         self.canvas.delete("roi")
@@ -122,20 +215,18 @@ class ImageLabelingApp:
 
     def extract_roi(self):
         if self.roi_start and self.roi_end and self.image is not None:
-            x1, y1 = int(self.roi_start[0]), int(self.roi_start[1])
-            x2, y2 = int(self.roi_end[0]), int(self.roi_end[1])
-
-            # Ensure coordinates are within bounds
-            x1, x2 = min(x1, x2), max(x1, x2)
-            y1, y2 = min(y1, y2), max(y1, y2)
-
-            # Ensure coordinates don't exceed image dimensions
-            height, width = self.image.shape[:2]
-            x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
-            y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+            # Canvas coordinates are pixels of the displayed pyramid level, map them to full resolution
+            scale = self.tiled.scale(self.zoom_level) if self.tiled is not None else 1.0
+            roi = roi_from_points(self.roi_start, self.roi_end, self.image.shape, scale)  # Clamped to the image
+            if roi[2] == 0 or roi[3] == 0:  # A click without a drag, or a drag outside the image
+                print("Please drag to select a non-empty ROI!")
+                return
 
             # Get ROI from image
-            self.roi = self.image[y1:y2, x1:x2].copy()
+            self.roi = crop_roi(self.image, roi, copy=True)
+            self.roi_preview = self.make_preview(self.roi)
+            self.brightness_adjusted_image = None
+            self.brightness_dirty = self.brightness_value != 0
 
             # Show ROI in separate window
             cv2.imshow("Selected ROI", self.roi)
@@ -156,52 +247,70 @@ class ImageLabelingApp:
         if self.processed_image is not None:
             cv2.imshow("Processed ROI", self.processed_image)
 
+    def make_preview(self, roi):
+        # Downsample so the preview fits in half the screen; small ROIs are used as they are
+        max_width = max(1, self.root.winfo_screenwidth() // 2)
+        max_height = max(1, self.root.winfo_screenheight() // 2)
+        height, width = roi.shape[:2]
+        if height == 0 or width == 0:
+            return roi
+        scale = min(max_width / width, max_height / height)
+        if scale >= 1:
+            return roi
+        size = (max(1, int(width * scale)), max(1, int(height * scale)))
+        return cv2.resize(roi, size, interpolation=cv2.INTER_AREA)
+
     def adjust_brightness(self, value):
         if self.roi is None:
             print("Please select ROI first!")
             return
 
-        value = float(value)
-        self.brightness_adjusted_image = cv2.convertScaleAbs(self.roi, alpha=1, beta=value)
-        cv2.imshow("Brightness Adjusted ROI", self.brightness_adjusted_image)
+        # Only remember the latest value; a burst of slider events results in a single preview
+        self.brightness_value = float(value)
+        self.brightness_dirty = True
+        if self.preview_job is None:
+            self.preview_job = self.root.after(PREVIEW_DELAY_MS, self.show_brightness_preview)
+
+    def show_brightness_preview(self):
+        self.preview_job = None
+        if self.roi_preview is None:
+            return
+        preview = cv2.LUT(self.roi_preview, brightness_lut(self.brightness_value))
+        cv2.imshow("Brightness Adjusted ROI", preview)
+
+    def commit_brightness(self):
+        # Apply the current slider value to the full-resolution ROI
+        if self.roi is None or not self.brightness_dirty:
+            return
+        self.brightness_adjusted_image = cv2.LUT(self.roi, brightness_lut(self.brightness_value))
+        self.brightness_dirty = False
+
+    # Ask for the directory saves go to
+    def choose_save_dir(self):
+        save_dir = filedialog.askdirectory(title="Select Save Directory")
+        if save_dir:
+            self.save_dir = save_dir
+            self.saver.output_dir = save_dir
+        return bool(save_dir)
 
     def save_images_and_data(self):
         if self.roi is None:
             print("No ROI selected!")
             return
+        self.commit_brightness()
 
         # Save augmented ROI images
-        save_path = filedialog.askdirectory(title="Select Save Directory")
-        if not save_path:
+        if self.save_dir is None and not self.choose_save_dir():
             return
 
-        roi_path = os.path.join(save_path, "roi.jpg")
-        normalized_path = os.path.join(save_path, "roi_normalized.jpg")
-        standardized_path = os.path.join(save_path, "roi_standardized.jpg")
-        data_file_path = os.path.join(save_path, "processed_data.txt")
-
-        # Save ROI
-        cv2.imwrite(roi_path, self.roi)
-
-        # Normalize and save
-        normalized = self.roi / 255.0
-        cv2.imwrite(normalized_path, (normalized * 255).astype(np.uint8))
-
-        # Standardize and save
-        mean, std = self.roi.mean(), self.roi.std()
-        standardized = (self.roi - mean) / (std if std > 0 else 1)
-        cv2.imwrite(standardized_path, np.clip((standardized * 127 + 127), 0, 255).astype(np.uint8))
-
-        # Save data
-        with open(data_file_path, "w") as file:
-            file.write(f"ROI: {self.roi.size}\n")
-            file.write(" ".join(map(str, self.roi.flatten())) + "\n")
-            file.write(f"Normalized: {normalized.size}\n")
-            file.write(" ".join(map(str, normalized.flatten())) + "\n")
-            file.write(f"Standardized: {standardized.size}\n")
-            file.write(" ".join(map(str, standardized.flatten())) + "\n")
+        # The export runs on the saver's thread with its own copy of the ROI, the UI stays responsive
+        save_path = self.saver.next_path(extension="")
+        self.saver.submit(export_roi, save_path, self.roi.copy(), self.data_dtype, self.export_format)
+        print(f"Saving images and data to {save_path}")
 
-        print(f"Saved images and data to {save_path}")
+    # Wait for queued saves and stop the saver
+    def close(self):
+        self.saver.close()
 
 
 def main():
@@ -209,6 +318,7 @@ def main():
     app = ImageLabelingApp(root)
     app.load_image(r"D:\One pice\ddd.webp")
     root.mainloop()
+    app.close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,235 @@
+"""Background saving of frames and export jobs, off the capture / UI thread.
+
+AsyncSaver takes a frame, copies it (the caller keeps drawing into its
+buffer) and returns the path it will be written to straight away. A
+thread pool encodes the frames (cv2.imencode releases the GIL), and one
+writer thread writes the encoded bytes to disk in submission order, each
+file as <name>.tmp followed by a rename so readers never see half a file.
+Other slow work (the labeling app's data export) can be queued behind
+the frames with submit().
+
+File names come from a pattern instead of a dialog per frame:
+
+    {prefix}     saver prefix ("frame")
+    {timestamp}  local time of the save call, 20240131-142501
+    {index}      running number of frames saved by this saver
+    {burst}      number of the burst the frame belongs to (0 outside bursts)
+    {frame}      position of the frame within its burst
+
+Burst mode records the next N frames passed to offer(), which the video
+loop calls once per frame; outside a burst offer() costs nothing.
+
+    saver = AsyncSaver("captures", pattern="{prefix}_{timestamp}_{index:05d}", extension=".png")
+    saver.save(frame)                   # -> "captures/frame_20240131-142501_00000.png", written later
+    saver.start_burst(30)               # the next 30 offered frames
+    saver.offer(frame)                  # in the video loop
+    saver.close()                       # waits for everything queued
+    print(saver.format_stats())
+
+When the queue holds max_pending frames, save() drops the frame (and
+counts it) instead of blocking the caller; a video loop keeps its frame
+rate even if the disk cannot keep up.
+"""
+
+import os
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+DEFAULT_PATTERN = "{prefix}_{timestamp}_{index:05d}"
+BURST_PATTERN = "{prefix}_{timestamp}_burst{burst:03d}_{frame:03d}"
+DEFAULT_MAX_PENDING = 64
+
+
+# Encode a frame into the bytes of an image file
+def encode_image(frame, extension, params):
+    ok, buffer = cv2.imencode(extension, frame, params)
+    if not ok:
+        raise IOError(f"Could not encode frame as {extension}")
+    return buffer
+
+
+# Write bytes to path through a temporary file, so the file appears complete or not at all
+def write_file(path, data):
+    tmp = f"{path}.tmp"
+    with open(tmp, "wb") as file:
+        file.write(data)
+    os.replace(tmp, path)
+
+
+# Frame / job saving on a background writer thread with a thread pool for encoding
+class AsyncSaver:
+    def __init__(self, output_dir="captures", pattern=DEFAULT_PATTERN, extension=".png", params=None,
+                 prefix="frame", burst_pattern=BURST_PATTERN, threads=None, max_pending=DEFAULT_MAX_PENDING):
+        self.output_dir = output_dir
+        self.pattern = pattern
+        self.burst_pattern = burst_pattern
+        self.extension = extension
+        self.params = params or []
+        self.prefix = prefix
+        self.max_pending = max_pending
+        self.encoders = ThreadPoolExecutor(threads or min(4, os.cpu_count() or 1), thread_name_prefix="encode")
+        self.saved = 0  # Files written
+        self.jobs = 0  # submit() jobs finished
+        self.failed = 0
+        self.dropped = 0  # Frames not queued because max_pending were waiting
+        self.encode_seconds = 0.0
+        self.write_seconds = 0.0
+        self.calls = 0  # Frames queued
+        self.call_seconds = 0.0  # Time save() spent on the caller's thread
+        self.last_path = None
+        self._index = 0
+        self._burst = 0
+        self._burst_remaining = 0
+        self._burst_frame = 0
+        self._pending_frames = 0
+        self._lock = threading.Lock()
+        self._queue = queue.Queue()
+        self._idle = threading.Condition(self._lock)
+        self._closed = False
+        self._writer = threading.Thread(target=self._write_loop, name="async-saver", daemon=True)
+        self._writer.start()
+
+    # Path for the next save from the naming pattern (extension "" names a directory); caller holds the lock
+    def _next_path(self, extension=None, burst_frame=None):
+        fields = {"prefix": self.prefix, "timestamp": time.strftime("%Y%m%d-%H%M%S"), "index": self._index,
+                  "burst": self._burst if burst_frame is not None else 0, "frame": burst_frame or 0}
+        pattern = self.pattern if burst_frame is None else self.burst_pattern
+        self._index += 1
+        extension = self.extension if extension is None else extension
+        return os.path.join(self.output_dir, pattern.format(**fields) + extension)
+
+    # Reserve the next name of the pattern, e.g. for the files of a submit() job
+    def next_path(self, extension=None):
+        with self._lock:
+            return self._next_path(extension)
+
+    # Queue a copy of frame for writing; returns its path, or None when it was dropped
+    def save(self, frame, path=None, _burst_frame=None):
+        start = time.perf_counter()
+        with self._lock:
+            if self._closed:
+                raise RuntimeError("AsyncSaver is closed")
+            if self._pending_frames >= self.max_pending:
+                self.dropped += 1
+                return None
+            self._pending_frames += 1
+            path = path or self._next_path(burst_frame=_burst_frame)
+        frame = frame.copy()  # The caller draws the overlay into its buffer right after this
+        encoded = self.encoders.submit(self._encode, frame)
+        self._queue.put((path, encoded))
+        self.calls += 1
+        self.call_seconds += time.perf_counter() - start
+        return path
+
+    # Queue fn(*args) behind the frames already queued, e.g. a data export
+    def submit(self, fn, *args):
+        if self._closed:
+            raise RuntimeError("AsyncSaver is closed")
+        self._queue.put((None, (fn, args)))  # Jobs are not counted against max_pending
+
+    # Record the next `frames` frames passed to offer()
+    def start_burst(self, frames):
+        with self._lock:
+            self._burst += 1
+            self._burst_remaining = frames
+            self._burst_frame = 0
+        print(f"Burst {self._burst}: recording {frames} frames to {self.output_dir}")
+
+    @property
+    def in_burst(self):
+        return self._burst_remaining > 0
+
+    # Called by the video loop for every frame; saves it while a burst is running
+    def offer(self, frame):
+        if self._burst_remaining <= 0:
+            return None
+        with self._lock:
+            self._burst_remaining -= 1
+            burst_frame = self._burst_frame
+            self._burst_frame += 1
+        return self.save(frame, _burst_frame=burst_frame)
+
+    def _encode(self, frame):
+        start = time.perf_counter()
+        data = encode_image(frame, self.extension, self.params)
+        with self._lock:
+            self.encode_seconds += time.perf_counter() - start
+        return data
+
+    def _write_loop(self):
+        while True:
+            entry = self._queue.get()
+            if entry is None:
+                break
+            path, work = entry
+            try:
+                if path is None:
+                    fn, args = work
+                    fn(*args)
+                    with self._lock:
+                        self.jobs += 1
+                else:
+                    data = work.result()
+                    start = time.perf_counter()
+                    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+                    write_file(path, data)
+                    with self._lock:
+                        self.write_seconds += time.perf_counter() - start
+                        self.saved += 1
+                    self.last_path = path
+            except Exception as e:
+                with self._lock:
+                    self.failed += 1
+                print(f"Error saving {path or 'data'}: {str(e)}")
+            finally:
+                with self._lock:
+                    if path is not None:
+                        self._pending_frames -= 1
+                    self._queue.task_done()
+                    self._idle.notify_all()
+
+    @property
+    def pending(self):
+        return self._queue.unfinished_tasks
+
+    # Block until everything queued so far is on disk
+    def flush(self, timeout=None):
+        deadline = None if timeout is None else time.perf_counter() + timeout
+        with self._idle:
+            while self._queue.unfinished_tasks:
+                remaining = None if deadline is None else deadline - time.perf_counter()
+                if remaining is not None and remaining <= 0:
+                    return False
+                self._idle.wait(remaining)
+        return True
+
+    # Finish the queued work and stop the threads
+    def close(self):
+        with self._lock:
+            if self._closed:
+                return
+            self._closed = True
+        self._queue.put(None)
+        self._writer.join()
+        self.encoders.shutdown()
+
+    def stats(self):
+        return {"saved": self.saved, "jobs": self.jobs, "failed": self.failed, "dropped": self.dropped,
+                "pending": self.pending, "encode_seconds": self.encode_seconds, "write_seconds": self.write_seconds,
+                "call_seconds": self.call_seconds}
+
+    def format_stats(self):
+        call_ms = 1000.0 * self.call_seconds / self.calls if self.calls else 0.0
+        return (f"saved {self.saved} frames, {self.jobs} jobs to {self.output_dir} ({self.failed} failed, "
+                f"{self.dropped} dropped), encode {self.encode_seconds:.2f} s, write {self.write_seconds:.2f} s, "
+                f"{call_ms:.2f} ms per save() on the caller's thread")
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
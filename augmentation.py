@@ -0,0 +1,277 @@
+"""Batch augmentation of labeled ROIs over whole datasets.
+
+A policy (JSON file or dict) describes the random transforms; every
+annotated ROI produces `variants` augmented images. Images are decoded
+once per worker task and the work is spread over a process pool. Each
+variant is seeded from (seed, image index, ROI index, variant), so the
+output does not depend on the number of workers or on scheduling.
+
+Policy keys (all optional):
+
+    {"variants": 10,              # augmented images per ROI
+     "rotation": [-30, 30],       # degrees
+     "hflip": 0.5, "vflip": 0.0,  # probabilities
+     "brightness": [-40, 40],     # added to every pixel (like the brightness slider)
+     "contrast": [0.8, 1.2],      # multiplier
+     "noise": 8.0,                # std of Gaussian noise, 0 disables it
+     "crop": [0.8, 1.0],          # random crop, fraction of the ROI side
+     "grayscale": 0.0,            # probability
+     "output_size": null}         # [width, height] to resize every variant to
+
+Annotations are CSV (header image,x,y,w,h,label) or JSONL with the same
+keys; image paths are relative to the image directory. Without an
+annotation file every image is one sample covering the whole image.
+Variants go to <output>/<label>/<stem>_rNNN_vNNN<ext>, where the stem is
+the image path relative to the image directory with "__" between folders
+(a/x.png -> a__x), so same-named images in different folders never
+overwrite each other.
+
+    python augmentation.py images/ -a rois.csv -p policy.json -o augmented/ --workers 8
+"""
+
+import argparse
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from frame_sources import list_image_files
+
+DEFAULT_POLICY = {
+    "variants": 10,
+    "rotation": [-30.0, 30.0],
+    "hflip": 0.5,
+    "vflip": 0.0,
+    "brightness": [-40.0, 40.0],
+    "contrast": [0.8, 1.2],
+    "noise": 8.0,
+    "crop": [0.8, 1.0],
+    "grayscale": 0.0,
+    "output_size": None,
+}
+
+
+# Declarative description of the random transforms
+class AugmentationPolicy:
+    def __init__(self, **settings):
+        unknown = set(settings) - set(DEFAULT_POLICY)
+        if unknown:
+            raise ValueError(f"Unknown policy keys: {', '.join(sorted(unknown))}")
+        values = dict(DEFAULT_POLICY, **settings)
+        self.variants = int(values["variants"])
+        self.rotation = self._range(values["rotation"], "rotation")
+        self.hflip = float(values["hflip"])
+        self.vflip = float(values["vflip"])
+        self.brightness = self._range(values["brightness"], "brightness")
+        self.contrast = self._range(values["contrast"], "contrast")
+        self.noise = float(values["noise"] or 0.0)
+        self.crop = self._range(values["crop"], "crop")
+        self.grayscale = float(values["grayscale"])
+        self.output_size = tuple(values["output_size"]) if values["output_size"] else None
+        if self.variants < 1:
+            raise ValueError("variants must be at least 1")
+        if self.crop and not 0.0 < self.crop[0] <= self.crop[1] <= 1.0:
+            raise ValueError("crop must be a range within (0, 1]")
+
+    @staticmethod
+    def _range(value, name):
+        if value is None:
+            return None
+        if isinstance(value, (int, float)):
+            return (-float(value), float(value))
+        if len(value) != 2 or value[0] > value[1]:
+            raise ValueError(f"{name} must be [low, high]")
+        return (float(value[0]), float(value[1]))
+
+    @classmethod
+    def load(cls, path):
+        with open(path) as file:
+            return cls(**json.load(file))
+
+
+# Apply one random draw of the policy to an ROI
+def augment(roi, policy, rng):
+    image = roi
+    if policy.crop:
+        height, width = image.shape[:2]
+        scale = rng.uniform(*policy.crop)
+        w, h = max(1, int(round(width * scale))), max(1, int(round(height * scale)))
+        x, y = int(rng.integers(0, width - w + 1)), int(rng.integers(0, height - h + 1))
+        image = image[y:y + h, x:x + w]  # A view, the following transforms produce new arrays
+    if policy.rotation:
+        angle = rng.uniform(*policy.rotation)
+        if angle:
+            height, width = image.shape[:2]
+            matrix = cv2.getRotationMatrix2D((width / 2, height / 2), angle, 1.0)
+            image = cv2.warpAffine(image, matrix, (width, height), borderMode=cv2.BORDER_REFLECT_101)
+    flip = None
+    if rng.random() < policy.hflip:
+        flip = 1
+    if rng.random() < policy.vflip:
+        flip = -1 if flip == 1 else 0
+    if flip is not None:
+        image = cv2.flip(image, flip)
+    alpha = rng.uniform(*policy.contrast) if policy.contrast else 1.0
+    beta = rng.uniform(*policy.brightness) if policy.brightness else 0.0
+    if alpha != 1.0 or beta != 0.0:
+        # Clamp to 0..255 through a lookup table; convertScaleAbs would mirror negative results back up
+        table = np.clip(np.rint(np.arange(256) * alpha + beta), 0, 255).astype(np.uint8)
+        image = cv2.LUT(image, table)
+    if policy.noise > 0:
+        noise = rng.normal(0.0, policy.noise, size=image.shape).astype(np.float32)
+        image = cv2.add(image.astype(np.float32), noise)
+        image = np.clip(image, 0, 255, out=image).astype(np.uint8)
+    if image.ndim == 3 and rng.random() < policy.grayscale:
+        image = cv2.cvtColor(cv2.cvtColor(image, cv2.COLOR_BGR2GRAY), cv2.COLOR_GRAY2BGR)
+    if policy.output_size:
+        image = cv2.resize(image, policy.output_size, interpolation=cv2.INTER_AREA)
+    if np.may_share_memory(image, roi):
+        image = image.copy()  # Never hand out views into the decoded source image
+    return image
+
+
+# Read annotations as {image path: [(x, y, w, h, label), ...]} in file order
+def load_annotations(path, image_dir):
+    annotations = {}
+    with open(path, newline="") as file:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = (json.loads(line) for line in file if line.strip())
+        else:
+            rows = csv.DictReader(file)
+        for row in rows:
+            image = os.path.normpath(os.path.join(image_dir, row["image"]))
+            roi = (int(row["x"]), int(row["y"]), int(row["w"]), int(row["h"]), str(row.get("label") or ""))
+            annotations.setdefault(image, []).append(roi)
+    return annotations
+
+
+# Output file stem of every image: its path relative to image_dir without the extension, directories joined
+# with "__" (a/x.png -> a__x), so same-named images in different folders do not overwrite each other.
+# Raises ValueError when two images still map to the same stem (compared case-insensitively).
+def output_stems(paths, image_dir):
+    stems, seen = {}, {}
+    for path in paths:
+        relative = os.path.splitext(os.path.relpath(path, image_dir))[0]
+        parts = relative.replace("\\", "/").split("/")
+        parts = [part if part != ".." else "_" for part in parts if part not in ("", ".")]
+        stem = "__".join(parts)
+        other = seen.setdefault(stem.lower(), path)
+        if other != path:
+            raise ValueError(f"Output names collide: {other} and {path} both map to {stem}")
+        stems[path] = stem
+    return stems
+
+
+# Per-process settings, filled in by _init_worker
+_worker_settings = {}
+
+
+def _init_worker(policy, output_dir, seed, extension):
+    cv2.setNumThreads(1)  # One OpenCV thread per process, the pool provides the parallelism
+    _worker_settings.update(policy=policy, output_dir=output_dir, seed=seed, extension=extension)
+
+
+# Worker: decode one image, write every variant of every ROI, return their index rows
+def _augment_image(task):
+    image_index, path, stem, rois = task
+    policy = _worker_settings["policy"]
+    output_dir = _worker_settings["output_dir"]
+    image = cv2.imread(path)
+    if image is None:
+        print(f"Skipping unreadable image: {path}", file=sys.stderr)
+        return []
+    if rois is None:
+        rois = [(0, 0, image.shape[1], image.shape[0], "")]
+    rows = []
+    for roi_index, (x, y, w, h, label) in enumerate(rois):
+        roi = image[max(0, y):y + h, max(0, x):x + w]
+        if roi.size == 0:
+            continue
+        label_dir = os.path.join(output_dir, label or "unlabeled")
+        os.makedirs(label_dir, exist_ok=True)
+        for variant in range(policy.variants):
+            rng = np.random.default_rng([_worker_settings["seed"], image_index, roi_index, variant])
+            name = f"{stem}_r{roi_index:03d}_v{variant:03d}{_worker_settings['extension']}"
+            out_path = os.path.join(label_dir, name)
+            cv2.imwrite(out_path, augment(roi, policy, rng))
+            rows.append({"file": os.path.relpath(out_path, output_dir), "source": path, "roi": [x, y, w, h],
+                         "label": label, "variant": variant})
+    return rows
+
+
+# Augment a whole dataset; returns throughput stats. Results are streamed to disk as they are produced.
+def augment_dataset(image_dir, output_dir, policy=None, annotations=None, workers=None, seed=0, extension=".png",
+                    progress=True):
+    policy = policy or AugmentationPolicy()
+    if annotations:
+        tasks = list(load_annotations(annotations, image_dir).items())
+    else:
+        tasks = [(path, None) for path in list_image_files(image_dir)]
+    stems = output_stems([path for path, _ in tasks], image_dir)  # Fails before anything is written
+    tasks = [(i, path, stems[path], rois) for i, (path, rois) in enumerate(tasks)]
+    workers = workers or os.cpu_count() or 1
+    os.makedirs(output_dir, exist_ok=True)
+
+    samples = 0
+    start = time.perf_counter()
+    initargs = (policy, output_dir, seed, extension)
+    with open(os.path.join(output_dir, "index.jsonl"), "w") as index:
+        if workers == 1:
+            _init_worker(*initargs)
+            results = map(_augment_image, tasks)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=initargs)
+            results = pool.imap(_augment_image, tasks)  # Index rows stay in task order
+        try:
+            for rows in results:
+                for row in rows:
+                    index.write(json.dumps(row) + "\n")
+                samples += len(rows)
+                if progress:
+                    rate = samples / (time.perf_counter() - start)
+                    print(f"\r{samples} samples  {rate:.1f}/s", end="", file=sys.stderr)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+    if progress:
+        print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    rate = samples / elapsed if elapsed > 0 else 0.0
+    return {"samples": samples, "seconds": elapsed, "samples_per_sec": rate,
+            "samples_per_sec_per_core": rate / workers, "workers": workers}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("-a", "--annotations", help="CSV or JSONL with image,x,y,w,h,label")
+    parser.add_argument("-p", "--policy", help="policy JSON file (default: built-in policy)")
+    parser.add_argument("--variants", type=int, help="override the policy's variants per ROI")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--ext", default=".png", help="output image extension")
+    args = parser.parse_args()
+
+    try:
+        policy = AugmentationPolicy.load(args.policy) if args.policy else AugmentationPolicy()
+        if args.variants:
+            policy.variants = args.variants
+        stats = augment_dataset(args.image_dir, args.output, policy, args.annotations, args.workers, args.seed, args.ext)
+    except (IOError, ValueError, KeyError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(f"{stats['samples']} samples in {stats['seconds']:.2f} s: {stats['samples_per_sec']:.1f} samples/sec, "
+          f"{stats['samples_per_sec_per_core']:.1f} per core on {stats['workers']} workers")
+
+
+if __name__ == "__main__":
+    main()
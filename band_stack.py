@@ -0,0 +1,210 @@
+"""Multispectral band stacks from data.zip (or an extracted directory).
+
+The band rasters (k1.tif ... k12.tif, k8a.tif) are single-band images
+of the same size. BandStack orders them like Sentinel-2 (B1 ... B8, B8A,
+B9 ... B12) and serves them as one (H, W, bands) cube.
+
+The first load decodes every band straight from the zip (no extraction)
+into a .npy cube in the cache directory. Later loads of the same source
+(same path, size and mtime) memory-map that file, so they do not copy
+or decode anything. With lazy=True nothing is stacked up front and
+band() decodes only the band that is asked for.
+
+    stack = BandStack.open("data.zip")
+    stack.names          # ['k1', ..., 'k8', 'k8a', 'k9', ..., 'k12']
+    stack.cube.shape     # (200, 600, 13), a read-only memmap
+    nir = stack.band("k8")
+"""
+
+import hashlib
+import os
+import re
+import tempfile
+import threading
+import zipfile
+
+import cv2
+import numpy as np
+from numpy.lib.format import open_memmap
+
+DEFAULT_CACHE_DIR = os.path.join(tempfile.gettempdir(), "band_stack_cache")
+BAND_ORDER = ("k1", "k2", "k3", "k4", "k5", "k6", "k7", "k8", "k8a", "k9", "k10", "k11", "k12")
+BAND_PATTERN = re.compile(r"^k\d+a?$", re.IGNORECASE)
+BAND_EXTENSIONS = (".tif", ".tiff")
+
+
+# Band name -> file path (inside the zip or the directory) for every band raster of a source
+def _find_bands(source):
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            members = [name for name in archive.namelist() if not name.endswith("/")]
+    else:
+        members = [entry.name for entry in os.scandir(source) if entry.is_file()]
+    bands = {}
+    for member in members:
+        stem, extension = os.path.splitext(os.path.basename(member))
+        if extension.lower() in BAND_EXTENSIONS and BAND_PATTERN.match(stem):
+            bands[stem.lower()] = member
+    return bands
+
+
+# Sentinel-2 order for the known bands, anything else after them in natural order
+def _band_sort_key(name):
+    if name in BAND_ORDER:
+        return (0, BAND_ORDER.index(name), name)
+    return (1, int(re.sub(r"\D", "", name) or 0), name)
+
+
+# Raw bytes of a file inside a zip or a directory (band rasters, point lists ...)
+def read_member(source, name):
+    if zipfile.is_zipfile(source):
+        with zipfile.ZipFile(source) as archive:
+            for member in archive.namelist():
+                if member == name or os.path.basename(member) == name:
+                    return archive.read(member)
+        raise KeyError(f"{name} not found in {source}")
+    with open(os.path.join(source, os.path.basename(name)), "rb") as file:
+        return file.read()
+
+
+def _decode(data, name):
+    band = cv2.imdecode(np.frombuffer(data, dtype=np.uint8), cv2.IMREAD_UNCHANGED)
+    if band is None:
+        raise IOError(f"Could not decode band {name}")
+    if band.ndim != 2:
+        raise ValueError(f"Band {name} has {band.shape[2]} channels, expected a single-band raster")
+    return band
+
+
+# Cache file for a source: keyed by its path plus size and mtime (of the zip, or of every band file)
+def _cache_file(source, members, cache_dir):
+    source = os.path.abspath(source)
+    if zipfile.is_zipfile(source):
+        stats = [os.stat(source)]
+    else:
+        stats = [os.stat(os.path.join(source, member)) for member in members]
+    key = "|".join([source] + members + [f"{s.st_size}:{s.st_mtime_ns}" for s in stats])
+    digest = hashlib.sha1(key.encode("utf-8")).hexdigest()[:16]
+    stem = os.path.splitext(os.path.basename(source.rstrip(os.sep)))[0]
+    return os.path.join(cache_dir, f"{stem}-{digest}.npy")
+
+
+# Multispectral bands of one source as an (H, W, bands) cube, with lazy per-band access
+class BandStack:
+    def __init__(self, source, names, members, cache_dir=DEFAULT_CACHE_DIR, mmap=True):
+        self.source = source
+        self.names = names
+        self.members = members  # Paths of the band files, in band order
+        self.cache_dir = cache_dir
+        self.mmap = mmap
+        self._cube = None
+        self._bands = {}  # Bands decoded on their own before the cube exists
+        self._lock = threading.Lock()
+
+    @classmethod
+    def open(cls, source, cache_dir=DEFAULT_CACHE_DIR, mmap=True, lazy=False):
+        bands = _find_bands(source)
+        if not bands:
+            raise IOError(f"No band rasters (k1.tif ...) found in {source}")
+        names = sorted(bands, key=_band_sort_key)
+        stack = cls(source, names, [bands[name] for name in names], cache_dir, mmap)
+        if not lazy:
+            stack.load()
+        return stack
+
+    @property
+    def cube(self):
+        if self._cube is None:
+            self.load()
+        return self._cube
+
+    @property
+    def shape(self):
+        return self.cube.shape
+
+    # Index of a band given by name ("k8a") or position
+    def index(self, band):
+        if isinstance(band, str):
+            return self.names.index(band.lower())
+        return int(band)
+
+    # One band as (H, W). A view into the cube once it is loaded, otherwise only that band is decoded.
+    def band(self, band):
+        i = self.index(band)
+        if self._cube is not None:
+            return self._cube[:, :, i]
+        with self._lock:
+            array = self._bands.get(i)
+            if array is None:
+                array = self._bands[i] = _decode(read_member(self.source, self.members[i]), self.names[i])
+        return array
+
+    # Build (or reuse) the cached cube and map it
+    def load(self):
+        with self._lock:
+            if self._cube is not None:
+                return self._cube
+            if self.cache_dir is None:
+                self._cube = self._stack_in_memory()
+                return self._cube
+            path = _cache_file(self.source, self.members, self.cache_dir)
+            if not os.path.exists(path):
+                self._write_cache(path)
+            if self.mmap:
+                self._cube = np.load(path, mmap_mode="r")
+            else:
+                self._cube = np.load(path)
+            self._bands.clear()
+            return self._cube
+
+    # (index, band) for every band; bands already decoded by band() are not decoded again
+    def _iter_bands(self):
+        archive = zipfile.ZipFile(self.source) if zipfile.is_zipfile(self.source) else None  # One open for all bands
+        try:
+            for i, (name, member) in enumerate(zip(self.names, self.members)):
+                band = self._bands.get(i)
+                if band is None:
+                    data = archive.read(member) if archive else read_member(self.source, member)
+                    band = _decode(data, name)
+                yield i, band
+        finally:
+            if archive:
+                archive.close()
+
+    def _stack_in_memory(self):
+        cube = None
+        for i, band in self._iter_bands():
+            if cube is None:
+                cube = np.empty(band.shape + (len(self.names),), dtype=band.dtype)
+            self._check_band(band, cube, i)
+            cube[:, :, i] = band
+        return cube
+
+    # Decode band by band into <cache>.tmp, then rename, so a crash never leaves a half-written cube
+    def _write_cache(self, path):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        tmp_path = path[:-len(".npy")] + f".{os.getpid()}.tmp.npy"  # Concurrent builders never share a file
+        cube = None
+        try:
+            for i, band in self._iter_bands():
+                if cube is None:
+                    cube = open_memmap(tmp_path, mode="w+", dtype=band.dtype, shape=band.shape + (len(self.names),))
+                self._check_band(band, cube, i)
+                cube[:, :, i] = band
+            cube.flush()
+            del cube
+            os.replace(tmp_path, path)
+        except BaseException:
+            if os.path.exists(tmp_path):
+                os.remove(tmp_path)
+            raise
+
+    def _check_band(self, band, cube, i):
+        if band.shape != cube.shape[:2] or band.dtype != cube.dtype:
+            raise ValueError(f"Band {self.names[i]} is {band.shape} {band.dtype}, "
+                             f"expected {cube.shape[:2]} {cube.dtype} like {self.names[0]}")
+
+
+# The (H, W, bands) cube of a source, memory-mapped from the cache
+def load_band_stack(source, cache_dir=DEFAULT_CACHE_DIR, mmap=True):
+    return BandStack.open(source, cache_dir, mmap).cube
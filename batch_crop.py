@@ -0,0 +1,170 @@
+"""Non-interactive batch cropping from an annotation manifest.
+
+The manifest lists image paths and any number of ROIs per image, in the
+same CSV / JSONL layout augmentation.py reads (image,x,y,w,h,label;
+paths relative to the image directory). Each image is decoded once,
+through the shared image cache (the next one is decoded in the
+background while the current one is being written), every ROI is a slice of the decoded image (no copy) and the
+crops are encoded and written by a thread pool, so encoding and disk I/O
+overlap. ROIs are clipped to the image; empty ones are skipped.
+
+Crops go to <output>/<label>/<stem>_rNNN<ext> ("unlabeled" without a
+label), where the stem is the image path relative to the image directory
+with "__" between folders (a/x.png -> a__x_r000.png), so same-named
+images in different folders never overwrite each other; names that
+still collide stop the run before anything is written. One row per crop
+goes to the index (CSV or JSONL, in manifest order):
+
+    file, source, roi_index, x, y, w, h, label
+
+where x, y, w, h are the clipped coordinates actually cropped.
+
+    python batch_crop.py images/ -m rois.csv -o crops/ --index crops/index.csv --threads 8
+"""
+
+import argparse
+import collections
+import csv
+import functools
+import json
+import os
+import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import cv2
+
+from augmentation import load_annotations, output_stems
+from cropping import clip_roi
+from image_cache import default_cache, imread
+
+INDEX_FIELDS = ["file", "source", "roi_index", "x", "y", "w", "h", "label"]
+
+
+class JsonlIndex:
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, row):
+        self.file.write(json.dumps(row) + "\n")
+
+
+class CsvIndex:
+    def __init__(self, file):
+        self.writer = csv.DictWriter(file, INDEX_FIELDS)
+        self.writer.writeheader()
+
+    def write(self, row):
+        self.writer.writerow(row)
+
+
+def open_index(file, fmt):
+    if fmt == "jsonl":
+        return JsonlIndex(file)
+    if fmt == "csv":
+        return CsvIndex(file)
+    raise ValueError(f"Unknown index format: {fmt}")
+
+
+def _write_crop(path, crop, params):
+    if not cv2.imwrite(path, crop, params):
+        raise IOError(f"Could not write crop: {path}")
+
+
+# Crop every ROI of a manifest; returns throughput stats
+def crop_batch(image_dir, manifest, output_dir, index_path=None, fmt=None, threads=None, extension=".png",
+               params=None, progress=True):
+    annotations = load_annotations(manifest, image_dir)
+    stems = output_stems(annotations, image_dir)  # Raises on name collisions before anything is written
+    if index_path is None:
+        index_path = os.path.join(output_dir, "index.jsonl")
+    if fmt is None:
+        fmt = "csv" if index_path.lower().endswith(".csv") else "jsonl"
+    threads = threads or min(32, (os.cpu_count() or 1) + 4)
+    params = params or []
+    os.makedirs(output_dir, exist_ok=True)
+    created_dirs = set()
+
+    crops = skipped = images = failed = 0
+    pending = collections.deque()  # (future, index row) in manifest order
+    max_pending = threads * 8  # Bounds how many decoded images the pending crops keep alive
+    start = time.perf_counter()
+    with open(index_path, "w", newline="") as file, \
+            ThreadPoolExecutor(threads) as writers, ThreadPoolExecutor(1) as decoder:
+        index = open_index(file, fmt)
+
+        def finish_oldest():
+            future, row = pending.popleft()
+            future.result()  # Re-raises write errors
+            index.write(row)
+
+        paths = list(annotations)
+        read = functools.partial(imread, use_cache=False)  # Every image is read once, don't pin it in memory
+        next_image = decoder.submit(read, paths[0]) if paths else None
+        for i, path in enumerate(paths):
+            image = next_image.result()
+            next_image = decoder.submit(read, paths[i + 1]) if i + 1 < len(paths) else None
+            if image is None:
+                print(f"Skipping unreadable image: {path}", file=sys.stderr)
+                failed += 1
+                continue
+            images += 1
+            height, width = image.shape[:2]
+            stem = stems[path]
+            for roi_index, (x, y, w, h, label) in enumerate(annotations[path]):
+                clipped = clip_roi(x, y, w, h, width, height)
+                if clipped is None:
+                    skipped += 1
+                    continue
+                cx, cy, cw, ch = clipped
+                label_dir = os.path.join(output_dir, label or "unlabeled")
+                if label_dir not in created_dirs:
+                    os.makedirs(label_dir, exist_ok=True)
+                    created_dirs.add(label_dir)
+                out_path = os.path.join(label_dir, f"{stem}_r{roi_index:03d}{extension}")
+                crop = image[cy:cy + ch, cx:cx + cw]  # A view; the pending write keeps the image alive
+                row = {"file": os.path.relpath(out_path, output_dir), "source": path, "roi_index": roi_index,
+                       "x": cx, "y": cy, "w": cw, "h": ch, "label": label}
+                pending.append((writers.submit(_write_crop, out_path, crop, params), row))
+                crops += 1
+                while len(pending) > max_pending:
+                    finish_oldest()
+            if progress:
+                rate = crops / (time.perf_counter() - start)
+                print(f"\r{images}/{len(paths)} images  {crops} crops  {rate:.0f}/s", end="", file=sys.stderr)
+        while pending:
+            finish_oldest()
+    if progress:
+        print(file=sys.stderr)
+
+    elapsed = time.perf_counter() - start
+    return {"images": images, "crops": crops, "skipped": skipped, "unreadable": failed, "seconds": elapsed,
+            "crops_per_sec": crops / elapsed if elapsed > 0 else 0.0, "threads": threads}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("image_dir")
+    parser.add_argument("-m", "--manifest", required=True, help="CSV or JSONL with image,x,y,w,h,label")
+    parser.add_argument("-o", "--output", required=True, help="output directory")
+    parser.add_argument("--index", help="index file, .csv or .jsonl (default: <output>/index.jsonl)")
+    parser.add_argument("--threads", type=int, default=None, help="writer threads")
+    parser.add_argument("--ext", default=".png", help="crop image extension")
+    parser.add_argument("--jpeg-quality", type=int, default=None)
+    args = parser.parse_args()
+
+    params = [cv2.IMWRITE_JPEG_QUALITY, args.jpeg_quality] if args.jpeg_quality else None
+    try:
+        stats = crop_batch(args.image_dir, args.manifest, args.output, args.index, threads=args.threads,
+                           extension=args.ext, params=params)
+    except (IOError, ValueError, KeyError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(f"{stats['crops']} crops from {stats['images']} images in {stats['seconds']:.2f} s "
+          f"({stats['crops_per_sec']:.0f} crops/sec on {stats['threads']} threads), "
+          f"{stats['skipped']} empty ROIs skipped, {stats['unreadable']} unreadable images")
+    print(f"Image cache: {default_cache.stats.format()}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,285 @@
+"""Headless batch marker detection over video files and image directories.
+
+Frames are split into shards of consecutive frames and the shards are
+run on a process pool. Video shards are decoded by the worker that owns
+them (it seeks to the shard start), image shards are passed as file
+paths, so no pixel data is pickled between processes. Results are
+written in frame order as JSONL (one object per frame) or CSV (one row
+per marker).
+
+Seeking with CAP_PROP_POS_FRAMES and CAP_PROP_FRAME_COUNT are not frame
+accurate for every codec and container, so a video is only sharded when
+a probe finds them exact (seek to shard starts and the last frame, read
+the position back). Otherwise one sequential reader in this process
+decodes the video and sends chunks of frames to the pool: every frame
+exactly once, at the cost of pickling the pixels. A sharded worker also
+checks its own seek and fails instead of duplicating or skipping frames,
+and the last shard reads to the end of the video whatever the frame
+count said.
+
+    python batch_detect.py footage.mp4 -o markers.jsonl
+    python batch_detect.py recorded_frames/ -o markers.csv --workers 8
+
+    from batch_detect import detect_batch
+    stats = detect_batch("footage.mp4", "markers.jsonl", workers=4)
+"""
+
+import argparse
+import collections
+import csv
+import json
+import multiprocessing
+import os
+import sys
+import time
+
+import cv2
+
+from frame_sources import list_image_files
+from image_cache import imread
+from marker_detection import DEFAULT_DICTIONARY, detect_markers, get_detector
+
+CSV_FIELDS = ["frame", "source", "marker_id"] + [f"{axis}{i}" for i in range(4) for axis in ("x", "y")]
+
+# Per-process detector settings, filled in by _init_worker
+_worker_settings = {"dictionary": DEFAULT_DICTIONARY, "params": None}
+
+
+def _init_worker(dictionary, params):
+    cv2.setNumThreads(1)  # One OpenCV thread per process, the pool provides the parallelism
+    _worker_settings["dictionary"] = dictionary
+    _worker_settings["params"] = params
+    get_detector(dictionary, params)  # Build the detector once per worker, not on the first shard
+
+
+# Turn detect_markers output into a JSON-friendly record
+def make_record(index, source, corners, ids):
+    markers = []
+    if ids is not None:
+        for marker_id, marker_corners in zip(ids.ravel().tolist(), corners):
+            points = marker_corners.reshape(4, 2)
+            markers.append({"id": int(marker_id), "corners": [[round(float(x), 2), round(float(y), 2)] for x, y in points]})
+    return {"frame": index, "source": source, "markers": markers}
+
+
+def _detect(frame):
+    return detect_markers(frame, _worker_settings["dictionary"], _worker_settings["params"])
+
+
+# Worker: detect markers in one shard of image files
+def _detect_image_shard(shard):
+    start, paths = shard
+    records = []
+    for offset, path in enumerate(paths):
+        frame = imread(path, use_cache=False)  # Served from IMAGE_CACHE_DIR when an earlier run decoded it
+        if frame is None:
+            print(f"Skipping unreadable image: {path}", file=sys.stderr)
+            corners, ids = None, None
+        else:
+            corners, ids = _detect(frame)
+        records.append(make_record(start + offset, os.path.basename(path), corners, ids))
+    return records
+
+
+# Seek to a frame and check the backend really is there; False when seeking is not exact
+def _seek_exact(cap, index):
+    if index and not cap.set(cv2.CAP_PROP_POS_FRAMES, index):
+        return False
+    return int(cap.get(cv2.CAP_PROP_POS_FRAMES)) == index
+
+
+# Worker: detect markers in frames [start, start + count) of a video, or to its end when count is None
+def _detect_video_shard(shard):
+    path, start, count = shard
+    cap = cv2.VideoCapture(path)
+    records = []
+    try:
+        if not _seek_exact(cap, start):
+            raise IOError(f"Seeking to frame {start} of {path} is not frame accurate")
+        index = start
+        while count is None or index < start + count:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            corners, ids = _detect(frame)
+            records.append(make_record(index, os.path.basename(path), corners, ids))
+            index += 1
+    finally:
+        cap.release()
+    return records
+
+
+# Worker: detect markers in frames decoded by the sequential reader
+def _detect_frame_shard(shard):
+    start, source, frames = shard
+    return [make_record(start + offset, source, *_detect(frame)) for offset, frame in enumerate(frames)]
+
+
+# Chunks (start, source name, frames) of a video decoded front to back in this process
+def _read_frame_shards(path, shard_size):
+    cap = cv2.VideoCapture(path)
+    try:
+        start, frames = 0, []
+        while True:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+            if len(frames) == shard_size:
+                yield start, os.path.basename(path), frames
+                start, frames = start + len(frames), []
+        if frames:
+            yield start, os.path.basename(path), frames
+    finally:
+        cap.release()
+
+
+# True when seeking to the shard starts and the last frame lands exactly there, and nothing follows the last frame
+def _probe_seeking(path, total, shard_size):
+    starts = list(range(shard_size, total, shard_size))
+    probes = starts[:1] + starts[len(starts) // 2:len(starts) // 2 + 1] + starts[-1:] + [total - 1]
+    cap = cv2.VideoCapture(path)
+    try:
+        for index in probes:
+            if not _seek_exact(cap, index) or not cap.read()[0]:
+                return False
+            if int(cap.get(cv2.CAP_PROP_POS_FRAMES)) != index + 1:
+                return False
+        return not cap.read()[0]  # A frame after the last one means the frame count is wrong
+    finally:
+        cap.release()
+
+
+# Split a video or image directory into (worker function, shards, total frame count); shards may be a
+# generator (sequential video reading) and total None when the frame count is not trustworthy
+def plan_shards(source, shard_size):
+    if os.path.isdir(source):
+        files = list_image_files(source)
+        shards = [(i, files[i:i + shard_size]) for i in range(0, len(files), shard_size)]
+        return _detect_image_shard, shards, len(files)
+
+    cap = cv2.VideoCapture(source)
+    if not cap.isOpened():
+        raise IOError(f"Could not open video: {source}")
+    total = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+    cap.release()
+    if total <= 0 or not _probe_seeking(source, total, shard_size):
+        print(f"Seeking in {source} is not frame accurate, decoding it sequentially", file=sys.stderr)
+        return _detect_frame_shard, _read_frame_shards(source, shard_size), None
+    shards = [(source, i, min(shard_size, total - i)) for i in range(0, total, shard_size)]
+    shards[-1] = shards[-1][:2] + (None,)  # Read the last shard to the end, the frame count may be short
+    return _detect_video_shard, shards, total
+
+
+# pool.imap that keeps at most `ahead` tasks in flight, so a generator of decoded frames is not read ahead
+# into memory all at once; results in task order
+def _bounded_imap(pool, fn, tasks, ahead):
+    pending = collections.deque()
+    for task in tasks:
+        pending.append(pool.apply_async(fn, (task,)))
+        if len(pending) >= ahead:
+            yield pending.popleft().get()
+    while pending:
+        yield pending.popleft().get()
+
+
+# Writers for the two output formats
+class JsonlWriter:
+    def __init__(self, file):
+        self.file = file
+
+    def write(self, record):
+        self.file.write(json.dumps(record) + "\n")
+
+
+class CsvWriter:
+    def __init__(self, file):
+        self.writer = csv.writer(file)
+        self.writer.writerow(CSV_FIELDS)
+
+    def write(self, record):
+        if not record["markers"]:
+            self.writer.writerow([record["frame"], record["source"], ""] + [""] * 8)  # Keep empty frames visible
+        for marker in record["markers"]:
+            flat = [value for point in marker["corners"] for value in point]
+            self.writer.writerow([record["frame"], record["source"], marker["id"]] + flat)
+
+
+def open_writer(file, fmt):
+    if fmt == "jsonl":
+        return JsonlWriter(file)
+    if fmt == "csv":
+        return CsvWriter(file)
+    raise ValueError(f"Unknown output format: {fmt}")
+
+
+# Run detection over a whole video / image directory and write results in frame order
+def detect_batch(source, output, fmt=None, workers=None, shard_size=64, dictionary=DEFAULT_DICTIONARY,
+                 params=None, progress=True):
+    if fmt is None:
+        fmt = "csv" if str(output).lower().endswith(".csv") else "jsonl"
+    workers = workers or os.cpu_count() or 1
+    worker_fn, shards, total = plan_shards(source, shard_size)
+
+    frames = 0
+    detections = 0
+    start = time.perf_counter()
+    with open(output, "w", newline="") as file:
+        writer = open_writer(file, fmt)
+        if workers == 1:
+            _init_worker(dictionary, params)
+            results = map(worker_fn, shards)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(workers, initializer=_init_worker, initargs=(dictionary, params))
+            if isinstance(shards, list):
+                results = pool.imap(worker_fn, shards)  # imap keeps shard order
+            else:
+                results = _bounded_imap(pool, worker_fn, shards, 2 * workers)
+        try:
+            for records in results:
+                for record in records:
+                    writer.write(record)
+                    detections += len(record["markers"])
+                frames += len(records)
+                if progress:
+                    elapsed = time.perf_counter() - start
+                    print(f"\r{frames}/{total or '?'} frames  {frames / elapsed:.1f} fps", end="", file=sys.stderr)
+        finally:
+            if pool is not None:
+                pool.close()
+                pool.join()
+
+    elapsed = time.perf_counter() - start
+    if progress:
+        print(file=sys.stderr)
+    return {
+        "frames": frames,
+        "detections": detections,
+        "seconds": elapsed,
+        "fps": frames / elapsed if elapsed > 0 else 0.0,
+        "workers": workers,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", help="video file or directory of images")
+    parser.add_argument("-o", "--output", required=True, help="output .jsonl or .csv file")
+    parser.add_argument("--format", choices=["jsonl", "csv"], default=None, help="default: from the output extension")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--shard-size", type=int, default=64, help="consecutive frames per task")
+    parser.add_argument("--dictionary", default=DEFAULT_DICTIONARY)
+    args = parser.parse_args()
+
+    try:
+        stats = detect_batch(args.source, args.output, args.format, args.workers, args.shard_size, args.dictionary)
+    except (IOError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(f"{stats['frames']} frames, {stats['detections']} markers in {stats['seconds']:.2f} s "
+          f"({stats['fps']:.1f} frames/sec on {stats['workers']} workers)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,49 @@
+"""Time the video loop spends per saved frame, synchronous imwrite vs AsyncSaver.
+
+    python -m benchmarks.bench_async_saver [--frames 30] [--ext .png] [--source clip.mp4]
+
+"imwrite" is the old save path minus the dialog: the loop encodes and
+writes the frame itself. "AsyncSaver.save" is what the loop pays now
+(a copy and a queue put); "drained" is the wall time until every queued
+frame is on disk, i.e. the throughput of the encoder pool and writer.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from async_saver import AsyncSaver
+from benchmarks.common import benchmark_frames, format_summary, summarize, time_per_item
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=30)
+    parser.add_argument("--ext", default=".png", help="image format, .png or .jpg")
+    parser.add_argument("--threads", type=int, default=None, help="encoder threads")
+    parser.add_argument("--source", default=None, help="video file or image directory (default: synthetic)")
+    args = parser.parse_args()
+
+    frames = benchmark_frames(args.source, args.frames)
+    print(f"{len(frames)} frames of {frames[0].shape[1]}x{frames[0].shape[0]}, {args.ext}, {os.cpu_count()} cores")
+    with tempfile.TemporaryDirectory() as tmp:
+        counter = iter(range(10 ** 9))
+        sync = summarize(time_per_item(
+            lambda frame: cv2.imwrite(os.path.join(tmp, f"sync_{next(counter)}{args.ext}"), frame), frames))
+        print(format_summary("imwrite on the loop thread", sync))
+
+        saver = AsyncSaver(os.path.join(tmp, "async"), extension=args.ext, threads=args.threads,
+                           max_pending=len(frames) + 1)
+        start = time.perf_counter()
+        queued = summarize(time_per_item(saver.save, frames, warmup=0))
+        saver.close()
+        drained = time.perf_counter() - start
+        print(format_summary("AsyncSaver.save", queued))
+        print(f"{'drained':<32} {drained:.2f} s for {saver.saved} frames ({saver.saved / drained:.1f} frames/s)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Augmentation throughput in samples/sec (total and per core) for 1..N workers.
+
+    python -m benchmarks.bench_augmentation [--images 16] [--variants 8] [--max-workers N]
+
+Writes a synthetic image directory with two annotated ROIs per image to a
+temporary directory and augments it with the default policy.
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+
+import cv2
+
+from augmentation import AugmentationPolicy, augment_dataset
+from benchmarks.common import synthetic_marker_frame
+
+
+def write_dataset(directory, images, width=1280, height=720):
+    image_dir = os.path.join(directory, "images")
+    os.makedirs(image_dir)
+    annotations = os.path.join(directory, "rois.csv")
+    with open(annotations, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["image", "x", "y", "w", "h", "label"])
+        for i in range(images):
+            name = f"img_{i:04d}.jpg"
+            cv2.imwrite(os.path.join(image_dir, name), synthetic_marker_frame(width, height, seed=i))
+            writer.writerow([name, 100, 80, 256, 256, "marker"])
+            writer.writerow([name, 600, 300, 320, 240, "background"])
+    return image_dir, annotations
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=16)
+    parser.add_argument("--variants", type=int, default=8)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir, annotations = write_dataset(tmp, args.images)
+        policy = AugmentationPolicy(variants=args.variants)
+        counts = sorted({min(2 ** i, args.max_workers) for i in range(args.max_workers.bit_length() + 1)})
+        print(f"{args.images} images x 2 ROIs x {args.variants} variants")
+        print(f"{'workers':>7}  {'samples/s':>10}  {'per core':>9}")
+        for workers in counts:
+            stats = augment_dataset(image_dir, os.path.join(tmp, f"out_{workers}"), policy, annotations,
+                                    workers=workers, progress=False)
+            print(f"{workers:7d}  {stats['samples_per_sec']:10.1f}  {stats['samples_per_sec_per_core']:9.1f}")
+
+
+if __name__ == "__main__":
+    main()
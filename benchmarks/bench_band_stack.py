@@ -0,0 +1,58 @@
+"""Load time of the multispectral band stack: cold (decode from the zip) vs cached (memmap).
+
+    python -m benchmarks.bench_band_stack [--source data.zip] [--repeat 5]
+
+"cold" decodes every band out of the zip and writes the cube cache,
+"cached" maps the cache file, "cached + read" also touches every value
+(sum over the cube) and "lazy band" decodes a single band without
+building the cube.
+"""
+
+import argparse
+import shutil
+import tempfile
+import time
+
+from band_stack import BandStack
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return 1000.0 * min(times)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="data.zip", help="zip or directory with k1.tif ... k12.tif")
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    cache_dir = tempfile.mkdtemp()
+    try:
+        def cold():
+            shutil.rmtree(cache_dir, ignore_errors=True)
+            return BandStack.open(args.source, cache_dir=cache_dir).cube
+
+        cube = cold()
+        print(f"{args.source}: {cube.shape[2]} bands of {cube.shape[0]}x{cube.shape[1]} {cube.dtype} "
+              f"({cube.nbytes / 1e6:.1f} MB)")
+        print(f"{'load':<16} {'best ms':>9}")
+        rows = [
+            ("cold", cold),
+            ("in memory", lambda: BandStack.open(args.source, cache_dir=None).cube),
+            ("cached", lambda: BandStack.open(args.source, cache_dir=cache_dir).cube),
+            ("cached + read", lambda: BandStack.open(args.source, cache_dir=cache_dir).cube.sum()),
+            ("lazy band", lambda: BandStack.open(args.source, cache_dir=cache_dir, lazy=True).band("k8")),
+        ]
+        for name, fn in rows:
+            print(f"{name:<16} {timed(fn, args.repeat):9.2f}")
+    finally:
+        shutil.rmtree(cache_dir, ignore_errors=True)
+
+
+if __name__ == "__main__":
+    main()
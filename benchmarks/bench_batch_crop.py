@@ -0,0 +1,81 @@
+"""Crops/sec of batch_crop.crop_batch against a crop-per-ROI loop.
+
+    python -m benchmarks.bench_batch_crop [--images 50] [--rois 400] [--max-threads N]
+
+Writes a synthetic image directory and a manifest with `rois` random
+ROIs per image. The baseline is what one-crop-at-a-time tooling does:
+decode the image for every ROI, copy the crop, write it, append a line
+to a text file.
+"""
+
+import argparse
+import csv
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from batch_crop import crop_batch
+from benchmarks.common import synthetic_marker_frame
+
+
+def write_manifest_dataset(directory, images, rois, width=1280, height=720, seed=0):
+    image_dir = os.path.join(directory, "images")
+    os.makedirs(image_dir)
+    manifest = os.path.join(directory, "rois.csv")
+    rng = np.random.default_rng(seed)
+    with open(manifest, "w", newline="") as file:
+        writer = csv.writer(file)
+        writer.writerow(["image", "x", "y", "w", "h", "label"])
+        for i in range(images):
+            name = f"img_{i:04d}.jpg"
+            cv2.imwrite(os.path.join(image_dir, name), synthetic_marker_frame(width, height, seed=i))
+            for _ in range(rois):
+                w, h = (int(v) for v in rng.integers(32, 160, size=2))
+                x, y = int(rng.integers(0, width - w)), int(rng.integers(0, height - h))
+                writer.writerow([name, x, y, w, h, f"class_{int(rng.integers(0, 4))}"])
+    return image_dir, manifest
+
+
+def crop_one_by_one(image_dir, manifest, output_dir, limit):
+    os.makedirs(output_dir, exist_ok=True)
+    with open(manifest, newline="") as file, open(os.path.join(output_dir, "roi_data.txt"), "w") as data:
+        for n, row in enumerate(csv.DictReader(file)):
+            if n == limit:
+                return n
+            image = cv2.imread(os.path.join(image_dir, row["image"]))
+            x, y, w, h = (int(row[k]) for k in ("x", "y", "w", "h"))
+            cv2.imwrite(os.path.join(output_dir, f"crop_{n:06d}.png"), image[y:y + h, x:x + w].copy())
+            data.write(f"ROI Coordinates: x={x}, y={y}, w={w}, h={h}\n")
+    return n + 1
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--images", type=int, default=50)
+    parser.add_argument("--rois", type=int, default=400, help="ROIs per image")
+    parser.add_argument("--max-threads", type=int, default=(os.cpu_count() or 1) * 2)
+    parser.add_argument("--baseline-crops", type=int, default=2000, help="crops timed for the baseline")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        image_dir, manifest = write_manifest_dataset(tmp, args.images, args.rois)
+        print(f"{args.images} images x {args.rois} ROIs = {args.images * args.rois} crops")
+
+        start = time.perf_counter()
+        done = crop_one_by_one(image_dir, manifest, os.path.join(tmp, "baseline"), args.baseline_crops)
+        baseline = done / (time.perf_counter() - start)
+        print(f"{'one by one':<12} {baseline:9.0f} crops/s  (first {done} crops)")
+
+        counts = sorted({min(2 ** i, args.max_threads) for i in range(args.max_threads.bit_length() + 1)})
+        for threads in counts:
+            stats = crop_batch(image_dir, manifest, os.path.join(tmp, f"out_{threads}"),
+                               os.path.join(tmp, f"index_{threads}.csv"), threads=threads, progress=False)
+            print(f"{f'{threads} threads':<12} {stats['crops_per_sec']:9.0f} crops/s  "
+                  f"{stats['seconds']:.2f} s  {stats['crops_per_sec'] / baseline:.1f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Frames/sec of batch_detect.detect_batch for 1..N worker processes.
+
+    python -m benchmarks.bench_batch_detect [--source PATH] [--max-workers N]
+
+Without --source a synthetic 720p clip with embedded markers is written
+to a temporary directory first.
+"""
+
+import argparse
+import os
+import tempfile
+
+import cv2
+
+from batch_detect import detect_batch
+from benchmarks.common import synthetic_marker_frame
+
+
+def write_synthetic_clip(path, count=240, width=1280, height=720):
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), 30, (width, height))
+    for i in range(count):
+        writer.write(synthetic_marker_frame(width, height, seed=i))
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", help="video file or image directory")
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--frames", type=int, default=240, help="length of the synthetic clip")
+    parser.add_argument("--shard-size", type=int, default=32)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        source = args.source
+        if source is None:
+            source = os.path.join(tmp, "synthetic.avi")
+            write_synthetic_clip(source, args.frames)
+
+        baseline = None
+        print(f"{'workers':>7}  {'frames/s':>9}  {'speedup':>7}  {'efficiency':>10}")
+        counts = sorted({min(2 ** i, args.max_workers) for i in range(args.max_workers.bit_length() + 1)})
+        for workers in counts:
+            stats = detect_batch(source, os.path.join(tmp, "out.jsonl"), workers=workers,
+                                 shard_size=args.shard_size, progress=False)
+            baseline = baseline or stats["fps"]
+            speedup = stats["fps"] / baseline
+            print(f"{workers:7d}  {stats['fps']:9.1f}  {speedup:7.2f}  {speedup / workers:10.0%}")
+
+
+if __name__ == "__main__":
+    main()
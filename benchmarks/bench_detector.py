@@ -0,0 +1,59 @@
+"""Per-frame detection time with and without the cached detector.
+
+    python -m benchmarks.bench_detector [--frames PATH] [--count 60] [--dictionary DICT_6X6_250]
+
+PATH may be a recorded video file or a directory of images; without it,
+synthetic 720p frames with the markers from markers/ are used.
+"""
+
+import argparse
+
+import cv2
+from cv2 import aruco
+
+from benchmarks.common import benchmark_frames, format_summary, summarize, time_per_item
+from marker_detection import DEFAULT_DICTIONARY, detect_markers, get_detector, resolve_dictionary_id
+
+
+# The original detect_markers: dictionary, parameters and detector rebuilt on every call
+def detect_markers_uncached(frame, dictionary=DEFAULT_DICTIONARY):
+    gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+    aruco_dict = aruco.getPredefinedDictionary(resolve_dictionary_id(dictionary))
+    parameters = aruco.DetectorParameters()
+    detector = aruco.ArucoDetector(aruco_dict, parameters)
+    corners, ids, rejected = detector.detectMarkers(gray)
+    return corners, ids
+
+
+# Just the setup work the cache removes from every frame
+def build_detector_uncached(dictionary=DEFAULT_DICTIONARY):
+    aruco_dict = aruco.getPredefinedDictionary(resolve_dictionary_id(dictionary))
+    return aruco.ArucoDetector(aruco_dict, aruco.DetectorParameters())
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", help="video file or image directory with recorded frames")
+    parser.add_argument("--count", type=int, default=60, help="number of frames to use")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--dictionary", default=DEFAULT_DICTIONARY)
+    args = parser.parse_args()
+
+    frames = benchmark_frames(args.frames, args.count)
+    get_detector(args.dictionary)  # Build once up front, like the first frame of a session would
+
+    before = summarize(time_per_item(lambda f: detect_markers_uncached(f, args.dictionary), frames, args.repeat))
+    after = summarize(time_per_item(lambda f: detect_markers(f, args.dictionary), frames, args.repeat))
+    setup = summarize(time_per_item(lambda f: build_detector_uncached(args.dictionary), frames, args.repeat))
+
+    height, width = frames[0].shape[:2]
+    print(f"{len(frames)} frames at {width}x{height}, dictionary {args.dictionary}")
+    print(format_summary("rebuild detector per frame", before))
+    print(format_summary("cached detector", after))
+    print(format_summary("setup alone (removed per frame)", setup))
+    print(f"saved per frame: {before['mean_ms'] - after['mean_ms']:.3f} ms "
+          f"({before['mean_ms'] / after['mean_ms']:.2f}x)")
+
+
+if __name__ == "__main__":
+    main()
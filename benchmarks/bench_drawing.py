@@ -0,0 +1,59 @@
+"""Per-event latency of dragging a shape in the drawing tool, full redraw vs incremental.
+
+    python -m benchmarks.bench_drawing [--moves 300]
+
+Replays the same drag (a rectangle and a circle growing and shrinking
+around the canvas centre) on canvases from 800x600 up to 8K. "full
+redraw" is the old mouse-move handler: copy the whole canvas and draw
+the shape. "incremental" is IncrementalCanvas.preview(). imshow is not
+included (the benchmark runs headless); the old tool also called it on
+the full frame for every event and every loop iteration, the new one
+once per changed frame.
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import format_summary, summarize, time_per_item
+from drawing_canvas import IncrementalCanvas, draw_shape
+
+SIZES = [(800, 600), (1920, 1080), (3840, 2160), (7680, 4320)]
+
+
+def drag_path(width, height, moves, seed=0):
+    rng = np.random.default_rng(seed)
+    cx, cy = width // 2, height // 2
+    span = min(width, height) // 3
+    path = []
+    for i in range(moves):
+        angle = 2 * np.pi * i / moves
+        radius = span * (0.5 + 0.5 * np.sin(3 * angle)) + rng.uniform(-3, 3)
+        path.append((int(cx + radius * np.cos(angle)), int(cy + radius * np.sin(angle))))
+    return (cx, cy), path
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--moves", type=int, default=300, help="mouse-move events per drag")
+    args = parser.parse_args()
+
+    for width, height in SIZES:
+        print(f"{width}x{height}")
+        start, path = drag_path(width, height, args.moves)
+        for mode in ("rectangle", "circle"):
+            image = np.zeros((height, width, 3), dtype=np.uint8)
+
+            def full_redraw(end):
+                temp = image.copy()
+                draw_shape(temp, mode, start, end)
+
+            canvas = IncrementalCanvas(width, height)
+            full = summarize(time_per_item(full_redraw, path))
+            incremental = summarize(time_per_item(lambda end: canvas.preview(mode, start, end), path))
+            print(format_summary(f"  {mode} full redraw", full))
+            print(format_summary(f"  {mode} incremental", incremental))
+
+
+if __name__ == "__main__":
+    main()
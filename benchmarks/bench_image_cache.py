@@ -0,0 +1,63 @@
+"""Decode vs cache hit times of image_cache.ImageCache.
+
+    python -m benchmarks.bench_image_cache [--image ddd.webp] [--size 6000x8000]
+
+Times cv2.imread, a memory hit, and a disk hit from a fresh cache (what
+another tool or the next run sees with IMAGE_CACHE_DIR set), for the
+given image and for a large synthetic JPEG.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from image_cache import ImageCache
+
+
+def timed(fn, repeat=5):
+    best = None
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        elapsed = time.perf_counter() - start
+        best = elapsed if best is None else min(best, elapsed)
+    return 1000.0 * best, result
+
+
+def measure(path, disk_dir):
+    decode_ms, image = timed(lambda: cv2.imread(path))
+    cache = ImageCache(disk_dir=disk_dir)
+    cache.imread(path)  # Miss: decode and store
+    memory_ms, _ = timed(lambda: cache.imread(path))
+    disk_ms, _ = timed(lambda: ImageCache(disk_dir=disk_dir).imread(path))
+    touch_ms, _ = timed(lambda: int(ImageCache(disk_dir=disk_dir).imread(path).sum(dtype=np.uint64)))
+    print(f"{os.path.basename(path)} {image.shape[1]}x{image.shape[0]} ({image.nbytes / 1e6:.0f} MB decoded)")
+    print(f"  cv2.imread          {decode_ms:9.2f} ms")
+    print(f"  memory hit          {memory_ms:9.3f} ms")
+    print(f"  disk hit (mmap)     {disk_ms:9.3f} ms")
+    print(f"  disk hit + read all {touch_ms:9.2f} ms")
+    print(f"  {cache.stats.format()}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--image", default="ddd.webp")
+    parser.add_argument("--size", default="6000x8000", help="synthetic JPEG HEIGHTxWIDTH")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        if os.path.exists(args.image):
+            measure(args.image, os.path.join(tmp, "cache"))
+        height, width = map(int, args.size.lower().split("x"))
+        noise = np.random.default_rng(0).integers(0, 256, size=(height // 16, width // 16, 3), dtype=np.uint8)
+        path = os.path.join(tmp, "large.jpg")
+        cv2.imwrite(path, cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC))
+        measure(path, os.path.join(tmp, "cache"))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,59 @@
+"""Per-frame cost of drawing the button bar vs compositing the cached overlay.
+
+    python -m benchmarks.bench_overlay [--frames 200]
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import format_summary, summarize, time_per_item
+from gui_overlay import Button, ButtonOverlay
+
+
+# The camera app's button layout
+def make_buttons(width=150, height=30, margin=10):
+    buttons = []
+    x, y = margin, margin
+    for text in ("Grayscale", "Blur", "Edge Detection", "Sharpen"):
+        buttons.append(Button(x, y, width, height, text, None))
+        x += width + margin
+    x, y = margin, y + height + margin
+    for text in ("Save Frame", "Quit"):
+        buttons.append(Button(x, y, width, height, text, None))
+        x += width + margin
+    return buttons
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=200)
+    args = parser.parse_args()
+
+    buttons = make_buttons()
+    overlay = ButtonOverlay(buttons)
+
+    def draw_each(frame):
+        for button in buttons:
+            button.draw(frame)
+
+    for width, height in ((1280, 720), (1920, 1080)):
+        for channels in (3, 1):
+            shape = (height, width) if channels == 1 else (height, width, channels)
+            frame = np.full(shape, 90, dtype=np.uint8)
+            frames = [frame] * args.frames
+            drawn = summarize(time_per_item(draw_each, frames))
+            blitted = summarize(time_per_item(overlay.composite, frames))
+
+            expected, actual = frame.copy(), frame.copy()
+            draw_each(expected)
+            overlay.composite(actual)
+            label = f"{width}x{height} {'gray' if channels == 1 else 'BGR'}"
+            print(f"{label}  (identical pixels: {np.array_equal(expected, actual)})")
+            print(format_summary("  Button.draw per button", drawn))
+            print(format_summary("  cached overlay blit", blitted))
+    print(f"overlay renders: {overlay.renders}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,63 @@
+"""Full-scene prediction time and memory of the pixel classifiers.
+
+    python -m benchmarks.bench_pixel_classifier [--source data.zip] [--scale 8]
+
+Classifies the shipped 200x600 scene, then a scene `scale` times larger
+in both directions (the band cube tiled into a memmap on disk) to show
+that time grows linearly and peak memory stays at the tile buffers.
+Peak memory is what tracemalloc sees allocated during prediction.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+import tracemalloc
+
+import numpy as np
+from numpy.lib.format import open_memmap
+
+from band_stack import BandStack
+from pixel_classifier import METHODS, load_training_samples, make_classifier, predict_scene
+
+
+def measure(cube, classifier):
+    tracemalloc.start()
+    start = time.perf_counter()
+    labels = predict_scene(cube, classifier)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1] - labels.nbytes
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="data.zip")
+    parser.add_argument("--scale", type=int, default=8, help="tile the scene scale x scale times for the large run")
+    args = parser.parse_args()
+
+    cube = BandStack.open(args.source).cube
+    samples, labels = load_training_samples(args.source, cube)
+    classifiers = [make_classifier(method).fit(samples, labels) for method in METHODS]
+
+    with tempfile.TemporaryDirectory() as tmp:
+        height, width, bands = cube.shape
+        large = open_memmap(os.path.join(tmp, "large.npy"), mode="w+", dtype=cube.dtype,
+                            shape=(height * args.scale, width * args.scale, bands))
+        for y in range(args.scale):
+            large[y * height:(y + 1) * height] = np.tile(cube, (1, args.scale, 1))
+        large.flush()
+
+        print(f"{'method':<9} {'scene':>11} {'ms':>9} {'Mpx/s':>7} {'peak MB':>8}")
+        for classifier in classifiers:
+            for scene in (cube, large):
+                elapsed, peak = measure(scene, classifier)
+                pixels = scene.shape[0] * scene.shape[1]
+                print(f"{classifier.name:<9} {scene.shape[0]:>5}x{scene.shape[1]:<5} {1000 * elapsed:9.1f} "
+                      f"{pixels / elapsed / 1e6:7.2f} {peak / 1e6:8.1f}")
+        del large
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+"""Time and peak memory of ROI normalization / standardization.
+
+    python -m benchmarks.bench_preprocessing [--size 4000]
+
+Compares the old float64 expressions in save_images_and_data with the
+single-pass statistics and preallocated float32 / float16 outputs of
+preprocessing.py. Peak memory is what tracemalloc sees numpy allocate
+on top of the input ROI.
+"""
+
+import argparse
+import time
+import tracemalloc
+
+import numpy as np
+
+from preprocessing import RunningStats, compute_stats, normalize, standardize, standardized_to_uint8
+
+
+def legacy(roi):
+    normalized = roi / 255.0
+    normalized_jpeg = (normalized * 255).astype(np.uint8)
+    mean, std = roi.mean(), roi.std()
+    standardized = (roi - mean) / (std if std > 0 else 1)
+    standardized_jpeg = np.clip((standardized * 127 + 127), 0, 255).astype(np.uint8)
+    return normalized, standardized, normalized_jpeg, standardized_jpeg
+
+
+def single_pass(roi, dtype):
+    mean, std = compute_stats(roi)
+    normalized = normalize(roi, dtype=dtype)
+    standardized = standardize(roi, mean, std, dtype=dtype)
+    return normalized, standardized, standardized_to_uint8(roi, mean, std)
+
+
+def measure(fn, *args):
+    fn(*args)  # Warm up
+    tracemalloc.start()
+    start = time.perf_counter()
+    fn(*args)
+    elapsed = time.perf_counter() - start
+    peak = tracemalloc.get_traced_memory()[1]
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=4000, help="ROI side in pixels")
+    args = parser.parse_args()
+
+    roi = np.random.default_rng(0).integers(0, 256, size=(args.size, args.size, 3), dtype=np.uint8)
+    print(f"{args.size}x{args.size}x3 uint8 ROI ({roi.nbytes / 1e6:.0f} MB)")
+    print(f"{'variant':<22} {'time s':>8} {'peak MB':>9}")
+    for name, fn, extra in [("legacy float64", legacy, ()),
+                            ("single pass float32", single_pass, (np.float32,)),
+                            ("single pass float16", single_pass, (np.float16,))]:
+        elapsed, peak = measure(fn, roi, *extra)
+        print(f"{name:<22} {elapsed:8.3f} {peak / 1e6:9.1f}")
+
+    # Dataset-wide statistics from batches, never holding more than one batch
+    batches = 8
+    stats = RunningStats(per_channel=True)
+    start = time.perf_counter()
+    for i in range(batches):
+        stats.update(np.random.default_rng(i).integers(0, 256, size=(16, 512, 512, 3), dtype=np.uint8))
+    print(f"per-channel stats over {batches} batches of 16x512x512x3: "
+          f"{time.perf_counter() - start:.3f} s (incl. generation), mean {np.round(stats.mean, 2)}, "
+          f"std {np.round(stats.std, 2)}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,52 @@
+"""Write time and size of the ROI data export formats.
+
+    python -m benchmarks.bench_roi_export [--size 1000] [--skip-text]
+
+Uses the arrays save_images_and_data produces for a size x size BGR ROI.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import numpy as np
+
+from preprocessing import compute_stats, normalize, standardize
+from roi_export import load_roi_data, save_roi_data
+
+
+def roi_arrays(size, seed=0):
+    roi = np.random.default_rng(seed).integers(0, 256, size=(size, size, 3), dtype=np.uint8)
+    mean, std = compute_stats(roi)
+    return {"roi": roi, "normalized": normalize(roi), "standardized": standardize(roi, mean, std)}
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--size", type=int, default=1000, help="ROI side in pixels")
+    parser.add_argument("--skip-text", action="store_true", help="skip the (slow) text format")
+    args = parser.parse_args()
+
+    arrays = roi_arrays(args.size)
+    formats = ["npy", "raw"] if args.skip_text else ["npy", "raw", "text"]
+    print(f"{args.size}x{args.size}x3 ROI")
+    print(f"{'format':<6} {'write s':>9} {'size MB':>9}")
+    for fmt in formats:
+        with tempfile.TemporaryDirectory() as tmp:
+            start = time.perf_counter()
+            paths = save_roi_data(tmp, arrays, fmt)
+            elapsed = time.perf_counter() - start
+            size = sum(os.path.getsize(p) for p in paths)
+            print(f"{fmt:<6} {elapsed:9.3f} {size / 1e6:9.1f}")
+            if fmt == "raw":
+                start = time.perf_counter()
+                mapped = load_roi_data(paths[1])
+                same = all(np.array_equal(mapped[name], arrays[name]) for name in arrays)
+                print(f"       memmap load {1000 * (time.perf_counter() - start):.1f} ms incl. compare, "
+                      f"round trip identical: {same}")
+                del mapped
+
+
+if __name__ == "__main__":
+    main()
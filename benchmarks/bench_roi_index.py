@@ -0,0 +1,68 @@
+"""ROI feature throughput and query latency of roi_index.py.
+
+    python -m benchmarks.bench_roi_index [--rois 2000] [--entries 100000] [--max-distance 4]
+
+Computes the features of --rois random ROIs of a textured image, then
+times nearest() and duplicate_pairs() over an index of --entries hashes
+(the ROI hashes, topped up with random ones and planted near-duplicates).
+"""
+
+import argparse
+import tempfile
+import time
+
+import numpy as np
+
+from benchmarks.common import format_summary, summarize
+from benchmarks.fixtures import random_rois, textured_image
+from roi_index import RoiIndex, RoiIndexWriter, compute_features
+
+
+def timed(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        result = fn()
+        times.append((time.perf_counter() - start) * 1000.0)
+    return result, times
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--rois", type=int, default=2000)
+    parser.add_argument("--entries", type=int, default=100000, help="index size for the query timings")
+    parser.add_argument("--max-distance", type=int, default=4)
+    parser.add_argument("--repeat", type=int, default=5)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    image = textured_image(1920, 1080)
+    boxes = random_rois(1920, 1080, count=args.rois)
+    crops = [image[y:y + h, x:x + w] for x, y, w, h in boxes]
+    _, times = timed(lambda: compute_features(crops), args.repeat)
+    print(format_summary(f"compute_features x{args.rois}", summarize(times)))
+    print(f"  {1000 * min(times) / args.rois:.1f} us per ROI")
+
+    writer = RoiIndexWriter()
+    writer.add_image(image, boxes, "textured.png")
+    with tempfile.TemporaryDirectory() as tmp:
+        writer.save(tmp)
+        index = RoiIndex(tmp)
+        # Pad to --entries: random hashes plus copies of real ones with a few flipped bits
+        extra = rng.integers(0, 2 ** 63, max(0, args.entries - len(index)), dtype=np.uint64)
+        planted = min(100, len(extra))
+        flips = rng.integers(0, 64, (planted, 2)).astype(np.uint64)
+        extra[:planted] = index.phash[rng.integers(0, len(index), planted)] ^ (np.uint64(1) << flips[:, 0])
+        index.phash = np.concatenate([index.phash, extra])
+        print(f"\n{len(index)} entries, {planted} planted near-duplicates")
+
+        query = index.phash[0]
+        _, times = timed(lambda: index.nearest(query, k=10), args.repeat)
+        print(format_summary("nearest k=10", summarize(times)))
+        pairs, times = timed(lambda: index.duplicate_pairs(args.max_distance), args.repeat)
+        print(format_summary(f"duplicate_pairs <= {args.max_distance} bits", summarize(times)))
+        print(f"  {len(pairs)} pairs")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,55 @@
+"""Detection throughput of StreamManager over several streams, per stream and in total.
+
+    python -m benchmarks.bench_stream_manager [--streams 4] [--frames 60] [--workers 1 2 4]
+
+Writes --streams synthetic MJPG clips with embedded markers and runs
+them through one StreamManager (files are read losslessly, so every
+frame is detected) for each worker count.
+"""
+
+import argparse
+import os
+import tempfile
+import time
+
+import cv2
+
+from benchmarks.fixtures import marker_frames
+from stream_manager import StreamManager
+
+
+def write_clip(path, frames, fps=30):
+    height, width = frames[0].shape[:2]
+    writer = cv2.VideoWriter(path, cv2.VideoWriter_fourcc(*"MJPG"), fps, (width, height))
+    for frame in frames:
+        writer.write(frame)
+    writer.release()
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--streams", type=int, default=4)
+    parser.add_argument("--frames", type=int, default=60, help="frames per stream")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--workers", type=int, nargs="+", default=[1, 2, 4])
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        paths = []
+        for i in range(args.streams):
+            path = os.path.join(tmp, f"cam{i}.avi")
+            write_clip(path, marker_frames(args.width, args.height, count=args.frames, seed=100 * i))
+            paths.append(path)
+        print(f"{args.streams} streams x {args.frames} frames of {args.width}x{args.height}, {os.cpu_count()} cores")
+        for workers in args.workers:
+            start = time.perf_counter()
+            with StreamManager(paths, workers=workers) as manager:
+                detections = sum(1 for _ in manager.detections())
+            elapsed = time.perf_counter() - start
+            print(f"\n{workers} workers: {detections} merged detections in {elapsed:.2f} s")
+            print(manager.report())
+
+
+if __name__ == "__main__":
+    main()
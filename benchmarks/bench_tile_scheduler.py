@@ -0,0 +1,79 @@
+"""Scaling of tiled scene processing over 1..N worker processes.
+
+    python -m benchmarks.bench_tile_scheduler [--max-workers N] [--size 6000x8000] [--scale 8]
+
+Two workloads: the "blur -> sharpen" filter chain on a synthetic BGR
+image (edge is left out: Canny cannot be tiled exactly, filter_tiled runs
+it untiled), and k-NN classification of the data.zip band cube tiled
+`scale` x `scale` times. Times cover run() only (pool start-up and the
+shared-memory setup happen once per scheduler and are reported apart).
+The single-process rows run the same function on the whole array
+without any tiling.
+"""
+
+import argparse
+import functools
+import os
+import time
+
+import cv2
+import numpy as np
+
+from band_stack import BandStack
+from filters import apply_filters, filter_halo
+from pixel_classifier import load_training_samples, make_classifier, predict_scene
+from tile_scheduler import TileScheduler
+
+
+def best_of(fn, repeat):
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        fn()
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def scaling(name, array, fn, halo, max_workers, tile_size, repeat):
+    baseline = best_of(lambda: fn(array), repeat)
+    pixels = array.shape[0] * array.shape[1]
+    print(f"\n{name}: {array.shape[1]}x{array.shape[0]}, untiled single process {1000 * baseline:.0f} ms")
+    print(f"{'workers':>7}  {'setup ms':>8}  {'run ms':>8}  {'Mpx/s':>7}  {'speedup':>7}  {'efficiency':>10}")
+    counts = sorted({min(2 ** i, max_workers) for i in range(max_workers.bit_length() + 1)})
+    for workers in counts:
+        start = time.perf_counter()
+        with TileScheduler(fn, array.shape, array.dtype, tile_size, halo, workers) as scheduler:
+            setup = time.perf_counter() - start
+            scheduler.run(array)  # Warm up worker caches (compiled filter chains)
+            elapsed = best_of(lambda: scheduler.run(array), repeat)
+        speedup = baseline / elapsed
+        print(f"{workers:7d}  {1000 * setup:8.0f}  {1000 * elapsed:8.0f}  {pixels / elapsed / 1e6:7.1f}  "
+              f"{speedup:7.2f}  {speedup / workers:10.0%}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--max-workers", type=int, default=os.cpu_count() or 1)
+    parser.add_argument("--size", default="6000x8000", help="synthetic image HEIGHTxWIDTH")
+    parser.add_argument("--scale", type=int, default=8, help="band cube tiling for the classification workload")
+    parser.add_argument("--tile-size", type=int, default=512)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--source", default="data.zip")
+    args = parser.parse_args()
+
+    height, width = map(int, args.size.lower().split("x"))
+    noise = np.random.default_rng(0).integers(0, 256, size=(height // 8, width // 8, 3), dtype=np.uint8)
+    image = cv2.resize(noise, (width, height), interpolation=cv2.INTER_CUBIC)
+    spec = "blur -> sharpen"
+    scaling(spec, image, functools.partial(apply_filters, filter_type=spec), filter_halo(spec),
+            args.max_workers, args.tile_size, args.repeat)
+
+    cube = BandStack.open(args.source).cube
+    classifier = make_classifier("knn").fit(*load_training_samples(args.source, cube))
+    large = np.tile(cube, (args.scale, args.scale, 1))
+    scaling("knn classification", large, functools.partial(predict_scene, classifier=classifier), 0,
+            args.max_workers, args.tile_size, 1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,88 @@
+"""Peak memory of loading a large image: full decode + copies vs TiledImage.
+
+    python -m benchmarks.bench_tiled_image [--width 12000 --height 9000]
+
+Every measurement runs in a fresh process and reports that process's
+peak RSS. "full decode" is what ImageLabelingApp.load_image used to do
+(PIL decode, np.array, cvtColor); the ImageTk.PhotoImage it also built,
+another full-size copy inside Tk, cannot be created headless and is not
+included. "tiled" opens the image through TiledImage and renders the
+tiles of a 1920x1080 viewport, once on a cold cache and once warm.
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import sys
+import tempfile
+import time
+
+import numpy as np
+
+
+def peak_rss_mb():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024  # bytes on macOS, KiB on Linux
+
+
+def write_large_jpeg(path, width, height):
+    import cv2
+
+    rng = np.random.default_rng(0)
+    image = cv2.resize(rng.integers(0, 256, size=(height // 64, width // 64, 3), dtype=np.uint8), (width, height))
+    cv2.imwrite(path, image, [cv2.IMWRITE_JPEG_QUALITY, 90])
+
+
+def full_decode(path):
+    import cv2
+    from PIL import Image
+
+    Image.MAX_IMAGE_PIXELS = None
+    start = time.perf_counter()
+    pil_image = Image.open(path)
+    if pil_image.mode != "RGB":
+        pil_image = pil_image.convert("RGB")
+    image = cv2.cvtColor(np.array(pil_image), cv2.COLOR_RGB2BGR)
+    return time.perf_counter() - start, peak_rss_mb(), image.shape
+
+
+def tiled_view(path, cache_dir):
+    from tiled_image import TiledImage
+
+    start = time.perf_counter()
+    tiled = TiledImage.open(path, cache_dir=cache_dir)
+    for level in (0, tiled.level_for_zoom(1920 / tiled.shape[1])):
+        for tx, ty in tiled.visible_tiles(level, 0, 0, 1920, 1080):
+            tiled.tile(level, tx, ty)
+    return time.perf_counter() - start, peak_rss_mb(), tiled.shape
+
+
+def measure(fn, *args):
+    with multiprocessing.get_context("spawn").Pool(1) as pool:
+        return pool.apply(fn, args)
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--width", type=int, default=12000)
+    parser.add_argument("--height", type=int, default=9000)
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "large.jpg")
+        measure(write_large_jpeg, path, args.width, args.height)
+        baseline = measure(peak_rss_mb)
+        decoded_mb = args.width * args.height * 3 / 1e6
+        print(f"{args.width}x{args.height} JPEG ({os.path.getsize(path) / 1e6:.1f} MB on disk, "
+              f"{decoded_mb:.0f} MB decoded), empty process {baseline:.0f} MB")
+        cache_dir = os.path.join(tmp, "cache")
+        for label, fn, fn_args in (("full decode", full_decode, (path,)),
+                                   ("tiled, cold cache", tiled_view, (path, cache_dir)),
+                                   ("tiled, warm cache", tiled_view, (path, cache_dir))):
+            seconds, peak, shape = measure(fn, *fn_args)
+            print(f"{label:<18} {seconds:7.2f} s   peak RSS {peak:7.0f} MB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+"""Per-frame cost of full-frame detection vs MarkerTracker on a 1080p stream.
+
+    python -m benchmarks.bench_tracking [--frames 120] [--interval 15]
+
+The synthetic stream moves the markers from markers/ a few pixels per
+frame, like a slowly panning camera.
+"""
+
+import argparse
+
+import numpy as np
+
+from benchmarks.common import format_summary, load_marker_images, summarize, synthetic_marker_frame, time_per_item
+from marker_detection import detect_markers
+from marker_tracking import MarkerTracker
+
+
+# Frames where each marker drifts along its own direction
+def moving_marker_frames(count, width=1920, height=1080, marker_size=180, markers=3):
+    marker_images = load_marker_images()[:markers]
+    rng = np.random.default_rng(1)
+    start = rng.uniform([100, 100], [width - 2 * marker_size, height - 2 * marker_size], size=(len(marker_images), 2))
+    velocity = rng.uniform(-3, 3, size=(len(marker_images), 2))
+    frames = []
+    for i in range(count):
+        positions = np.clip(start + velocity * i, 40, [width - marker_size - 40, height - marker_size - 40])
+        frames.append(synthetic_marker_frame(width, height, marker_images, marker_size, seed=0,
+                                             positions=positions.astype(int).tolist()))
+    return frames
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--frames", type=int, default=120)
+    parser.add_argument("--interval", type=int, default=15, help="full detection every N frames")
+    args = parser.parse_args()
+
+    frames = moving_marker_frames(args.frames)
+    full = summarize(time_per_item(detect_markers, frames))
+
+    tracker = MarkerTracker(redetect_interval=args.interval)
+    found = []
+    tracked = summarize(time_per_item(lambda f: found.append(tracker.update(f)), frames, warmup=0))
+
+    missing = sum(1 for result in found if result.ids is None or len(result.ids) < 3)
+    print(f"{len(frames)} frames at 1920x1080, 3 markers, full detection every {args.interval} frames")
+    print(format_summary("full-frame detection", full))
+    print(format_summary("tracker", tracked))
+    print(f"speedup {full['mean_ms'] / tracked['mean_ms']:.2f}x, full detections on "
+          f"{tracker.full_detection_rate():.0%} of frames, frames with a missing marker: {missing}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,128 @@
+"""Import-time budget check for the package and the headless entry points; exits 1 when over budget.
+
+    python -m benchmarks.check_import_time [--runs 5] [--scale 1.5]
+    python -m pytest tests/test_import_time.py
+
+Every check runs its statement in a fresh interpreter under
+`python -X importtime` and adds up the cumulative import time of the
+modules the statement imported (interpreter start-up is not included).
+The baseline module (numpy or cv2) is imported before the statement, so
+its cost never counts against a budget. The fastest of --runs runs
+counts, and --scale loosens or tightens all budgets at once. Budgets are
+several times the measured cost, so scheduler noise does not fail the
+check but an accidental heavy import (pandas, a GUI toolkit, a model
+file loaded at import time) does. Independently of time, each check
+fails when it loaded a module it must not: `import visiontools` may not
+load OpenCV or numpy, and no headless path may load tkinter or PIL.
+"""
+
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+GUI_MODULES = ("tkinter", "PIL")
+HEAVY_MODULES = ("cv2", "numpy") + GUI_MODULES
+
+LOAD_SCRIPT = ("import importlib.util as util; spec = util.spec_from_file_location('script', {path!r}); "
+               "spec.loader.exec_module(util.module_from_spec(spec))")
+
+# Statements run before the measured one, their imports are not counted
+BASELINES = {"python": "pass", "numpy": "import numpy", "cv2": "import cv2"}
+
+# (label, statement, baseline, budget in ms, modules that must not be loaded)
+CHECKS = [
+    ("import visiontools", "import visiontools", "python", 15, HEAVY_MODULES),
+    ("visiontools.load_roi_data", "from visiontools import load_roi_data", "numpy", 25, ("cv2",) + GUI_MODULES),
+    ("visiontools.detect_markers", "from visiontools import detect_markers", "cv2", 40, GUI_MODULES),
+    ("visiontools filters/crop/normalize", "from visiontools import apply_filters, crop_roi, normalize", "cv2", 40,
+     GUI_MODULES),
+    ("import batch_detect", "import batch_detect", "cv2", 60, GUI_MODULES),
+    ("import batch_crop", "import batch_crop", "cv2", 80, GUI_MODULES),
+    ("import augmentation", "import augmentation", "cv2", 60, GUI_MODULES),
+    ("import frame_pipeline", "import frame_pipeline", "cv2", 60, GUI_MODULES),
+    ("import stream_manager", "import stream_manager", "cv2", 80, GUI_MODULES),
+    ("import tile_scheduler", "import tile_scheduler", "cv2", 80, GUI_MODULES),
+    ("import roi_index", "import roi_index", "cv2", 40, GUI_MODULES),
+    ("import tiled_image", "import tiled_image", "cv2", 40, GUI_MODULES),
+    ("ArUco marker detection.py", LOAD_SCRIPT.format(path="ArUco marker detection.py"), "cv2", 120, GUI_MODULES),
+]
+
+MARKER = "--- measured imports ---"
+
+# Runs in the child: baseline, marker on stderr, the statement, then which watched modules it loaded
+CHILD = """
+import json, sys
+{baseline}
+sys.stderr.write({marker!r} + "\\n")
+{statement}
+print(json.dumps([m for m in {watched!r} if m in sys.modules]))
+"""
+
+IMPORT_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| (\s*)\S")
+
+
+# Milliseconds of the top-level imports in -X importtime output after the marker
+def parse_importtime(stderr):
+    total_us = 0
+    measuring = False
+    for line in stderr.splitlines():
+        if line.strip() == MARKER:
+            measuring = True
+            continue
+        match = IMPORT_LINE.match(line)
+        if measuring and match and not match.group(2):  # Nested imports are part of their parent's cumulative time
+            total_us += int(match.group(1))
+    return total_us / 1000.0
+
+
+def measure(statement, baseline="pass", watched=(), runs=5):
+    best, loaded = None, []
+    code = CHILD.format(baseline=baseline, marker=MARKER, statement=statement, watched=tuple(watched))
+    for _ in range(runs):
+        output = subprocess.run([sys.executable, "-X", "importtime", "-c", code], cwd=REPO_DIR, capture_output=True,
+                                text=True)
+        if output.returncode != 0:
+            raise RuntimeError(f"{statement!r} failed:\n{output.stderr[-2000:]}")
+        ms = parse_importtime(output.stderr)
+        best = ms if best is None else min(best, ms)
+        loaded = json.loads(output.stdout.strip().splitlines()[-1])
+    return best, loaded
+
+
+# Run every check; prints a table and returns the labels of the failed ones
+def run_checks(runs=5, scale=1.0, out=print):
+    failures = []
+    out(f"{'check':<36} {'imports':>9} {'budget':>8}")
+    for label, statement, baseline, budget, forbidden in CHECKS:
+        ms, loaded = measure(statement, BASELINES[baseline], forbidden, runs)
+        allowed = budget * scale
+        problems = []
+        if ms > allowed:
+            problems.append("over budget")
+        if loaded:
+            problems.append(f"loaded {', '.join(loaded)}")
+        out(f"{label:<36} {ms:7.1f}ms {allowed:6.0f}ms  {'; '.join(problems) or 'ok'}")
+        if problems:
+            failures.append(label)
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--runs", type=int, default=5, help="fresh interpreters per check (fastest counts)")
+    parser.add_argument("--scale", type=float, default=1.0, help="multiply every budget")
+    args = parser.parse_args()
+
+    failures = run_checks(args.runs, args.scale)
+    if failures:
+        print(f"{len(failures)} import checks failed: {', '.join(failures)}")
+        sys.exit(1)
+    print("All import checks passed")
+
+
+if __name__ == "__main__":
+    main()
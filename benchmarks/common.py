@@ -0,0 +1,101 @@
+"""Helpers shared by the benchmark scripts: frame sources and timing."""
+
+import glob
+import os
+import statistics
+import time
+
+import cv2
+import numpy as np
+
+MARKER_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "markers")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
+
+# Load up to `limit` recorded frames from a video file or an image directory
+def load_recorded_frames(path, limit=200):
+    frames = []
+    if os.path.isdir(path):
+        files = sorted(f for f in glob.glob(os.path.join(path, "*")) if f.lower().endswith(IMAGE_EXTENSIONS))
+        for file in files[:limit]:
+            frame = cv2.imread(file)
+            if frame is not None:
+                frames.append(frame)
+    else:
+        cap = cv2.VideoCapture(path)
+        while len(frames) < limit:
+            ret, frame = cap.read()
+            if not ret:
+                break
+            frames.append(frame)
+        cap.release()
+    return frames
+
+
+# Load the marker images from markers/ (generated by generate_aruco_markers)
+def load_marker_images():
+    markers = []
+    for file in sorted(glob.glob(os.path.join(MARKER_DIR, "marker_*.png"))):
+        marker = cv2.imread(file, cv2.IMREAD_GRAYSCALE)
+        if marker is not None:
+            markers.append(marker)
+    return markers
+
+
+# Paste the markers onto a noisy background, with a white quiet zone around each one
+def synthetic_marker_frame(width=1280, height=720, markers=None, marker_size=160, seed=0, positions=None):
+    rng = np.random.default_rng(seed)
+    frame = rng.integers(60, 180, size=(height, width, 3), dtype=np.uint8)
+    frame = cv2.GaussianBlur(frame, (7, 7), 0)
+    markers = load_marker_images() if markers is None else markers
+    border = marker_size // 8
+    for i, marker in enumerate(markers):
+        if positions is not None:
+            x, y = positions[i]
+        else:
+            x = int(rng.integers(border, max(border + 1, width - marker_size - border)))
+            y = int(rng.integers(border, max(border + 1, height - marker_size - border)))
+        frame[y - border:y + marker_size + border, x - border:x + marker_size + border] = 255
+        resized = cv2.resize(marker, (marker_size, marker_size), interpolation=cv2.INTER_NEAREST)
+        frame[y:y + marker_size, x:x + marker_size] = resized[:, :, None]
+    return frame
+
+
+# Recorded frames when a path is given, otherwise synthetic frames with embedded markers
+def benchmark_frames(path=None, count=60, width=1280, height=720):
+    if path:
+        frames = load_recorded_frames(path, count)
+        if frames:
+            return frames
+        print(f"No frames could be read from {path}, falling back to synthetic frames")
+    return [synthetic_marker_frame(width, height, seed=i) for i in range(count)]
+
+
+# Call fn(item) for every item, `repeat` times, and return per-call timings in milliseconds
+def time_per_item(fn, items, repeat=1, warmup=1):
+    for item in items[:warmup]:
+        fn(item)
+    timings = []
+    for _ in range(repeat):
+        for item in items:
+            start = time.perf_counter()
+            fn(item)
+            timings.append((time.perf_counter() - start) * 1000.0)
+    return timings
+
+
+# Summary statistics for a list of millisecond timings
+def summarize(timings):
+    ordered = sorted(timings)
+    return {
+        "n": len(ordered),
+        "mean_ms": statistics.fmean(ordered),
+        "p50_ms": ordered[len(ordered) // 2],
+        "p95_ms": ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))],
+        "min_ms": ordered[0],
+    }
+
+
+def format_summary(label, summary):
+    return (f"{label:<32} mean {summary['mean_ms']:8.3f} ms   p50 {summary['p50_ms']:8.3f} ms   "
+            f"p95 {summary['p95_ms']:8.3f} ms   (n={summary['n']})")
@@ -0,0 +1,92 @@
+"""Synthetic inputs for the benchmark suite: marker frames, ROIs, large image files.
+
+Everything is generated from a seed, so two runs (or two machines) time
+the same work and their results can be compared. Markers are drawn the
+way generate_aruco_markers() in "ArUco marker detection.py" does, but in
+memory, so the suite does not depend on markers/ being present.
+"""
+
+import importlib.util
+import os
+
+import cv2
+import numpy as np
+
+from benchmarks.common import synthetic_marker_frame
+
+REPO_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+RESOLUTIONS = {"vga": (640, 480), "hd": (1280, 720), "fhd": (1920, 1080), "4k": (3840, 2160)}
+QUICK_RESOLUTIONS = ("vga", "hd")
+
+
+# ArUco marker images 0..count-1 of a predefined dictionary
+def generate_marker_images(count=4, size=200, dictionary=cv2.aruco.DICT_6X6_250):
+    aruco_dict = cv2.aruco.getPredefinedDictionary(dictionary)
+    draw = getattr(cv2.aruco, "generateImageMarker", None) or cv2.aruco.drawMarker  # drawMarker before OpenCV 4.7
+    return [draw(aruco_dict, i, size) for i in range(count)]
+
+
+# Frames with the generated markers pasted at random positions
+def marker_frames(width, height, count=8, seed=0):
+    markers = generate_marker_images()
+    marker_size = max(48, min(width, height) // 5)
+    return [synthetic_marker_frame(width, height, markers, marker_size, seed=seed + i) for i in range(count)]
+
+
+# Random (x, y, w, h) ROIs inside a width x height image, from min_size up to a third of the image
+def random_rois(width, height, count=64, min_size=16, seed=0):
+    rng = np.random.default_rng(seed)
+    rois = []
+    for _ in range(count):
+        w = int(rng.integers(min_size, max(min_size + 1, width // 3)))
+        h = int(rng.integers(min_size, max(min_size + 1, height // 3)))
+        x = int(rng.integers(0, width - w + 1))
+        y = int(rng.integers(0, height - h + 1))
+        rois.append((x, y, w, h))
+    return rois
+
+
+# A photo-like texture (smooth gradients plus noise), compresses like a real image rather than noise or flat color
+def textured_image(width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    small = rng.integers(0, 256, size=(max(1, height // 64), max(1, width // 64), 3), dtype=np.uint8)
+    image = cv2.resize(small, (width, height), interpolation=cv2.INTER_CUBIC)
+    noise = rng.integers(-12, 13, size=(height, width, 1), dtype=np.int16)
+    return np.clip(image.astype(np.int16) + noise, 0, 255).astype(np.uint8)
+
+
+# Write a large textured image file (.jpg / .webp / .png) into directory, reused when it already exists
+def large_image_file(directory, width, height, extension=".jpg", quality=90, seed=0):
+    path = os.path.join(directory, f"large_{width}x{height}_{seed}{extension}")
+    if not os.path.exists(path):
+        params = []
+        if extension in (".jpg", ".jpeg"):
+            params = [cv2.IMWRITE_JPEG_QUALITY, quality]
+        elif extension == ".webp":
+            params = [cv2.IMWRITE_WEBP_QUALITY, quality]
+        if not cv2.imwrite(path, textured_image(width, height, seed), params):
+            raise IOError(f"Could not write fixture: {path}")
+    return path
+
+
+# Mouse positions of a drag that grows and shrinks a shape around the canvas centre
+def drag_path(width, height, moves=200, seed=0):
+    rng = np.random.default_rng(seed)
+    cx, cy = width // 2, height // 2
+    span = min(width, height) // 3
+    path = []
+    for i in range(moves):
+        angle = 2 * np.pi * i / moves
+        radius = span * (0.5 + 0.5 * np.sin(3 * angle)) + rng.uniform(-3, 3)
+        path.append((int(cx + radius * np.cos(angle)), int(cy + radius * np.sin(angle))))
+    return (cx, cy), path
+
+
+# Import one of the repository's scripts whose file name has spaces, e.g. "image drawing.py"
+def load_script(filename):
+    path = os.path.join(REPO_DIR, filename)
+    name = "script_" + os.path.splitext(filename)[0].replace(" ", "_").lower()
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
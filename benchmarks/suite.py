@@ -0,0 +1,304 @@
+"""Headless benchmark suite over every tool's hot path, with JSON results and regression checks.
+
+    python -m benchmarks.suite --json results.json              # full run
+    python -m benchmarks.suite --quick --only filters,detect    # subset, small resolutions
+    python -m benchmarks.suite --json new.json --compare results.json --threshold 0.15
+
+Cases (inputs come from benchmarks/fixtures.py, generated from a seed):
+
+    filters      apply_filters per filter and resolution
+    detect       detect_markers on frames with embedded ArUco markers
+    decode       cv2.imread of large JPEG / WebP files, and image_cache hits
+    extract_roi  the labeling app's extract_roi: roi_from_points + crop_roi from drags on pyramid levels
+    crop         crop_with_roi minus the selection window: cached read, save_crop
+    export       the labeling app's save path (cropping.export_roi): images, stats, .npy data
+    drawing      the drawing tool's mouse callback during a drag
+    save         the video loop's cost of AsyncSaver.save
+    profiler     FrameProfiler's per-frame bookkeeping and HUD drawing
+
+Every case reports per-call timings (mean / p50 / p95 / min in ms), the
+peak of Python and numpy allocations during one pass (tracemalloc; memory
+OpenCV allocates internally is not included) and the process's peak RSS
+so far. --compare matches cases by name and exits with status 1 when a
+p50 time or allocation peak grew by more than --threshold (and by more
+than a small absolute noise floor), so the suite can gate a change.
+"""
+
+import argparse
+import contextlib
+import io
+import json
+import os
+import platform
+import resource
+import sys
+import tempfile
+import time
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from benchmarks.common import summarize, time_per_item
+from benchmarks.fixtures import (QUICK_RESOLUTIONS, RESOLUTIONS, drag_path, large_image_file, load_script,
+                                 marker_frames, random_rois)
+
+GROUPS = ("filters", "detect", "decode", "extract_roi", "crop", "export", "drawing", "save", "profiler")
+FILTER_NAMES = ("grayscale", "blur", "edge", "sharpen")
+MIN_TIME_DELTA_MS = 0.05  # Smaller changes are timer noise
+MIN_MEMORY_DELTA = 1024 * 1024
+
+
+# One benchmark: fn is called once per item
+class Case:
+    def __init__(self, name, fn, items, repeat=1, params=None):
+        self.name = name
+        self.fn = fn
+        self.items = items
+        self.repeat = repeat
+        self.params = params or {}
+
+
+def _frames_by_resolution(resolutions, count):
+    return {res: marker_frames(*RESOLUTIONS[res], count=count) for res in resolutions}
+
+
+def filter_cases(context):
+    from filters import apply_filters
+
+    for res, frames in context["frames"].items():
+        for name in FILTER_NAMES:
+            yield Case(f"filters/{name}/{res}", lambda frame, name=name: apply_filters(frame, name), frames,
+                       context["repeat"], {"resolution": res})
+
+
+def detect_cases(context):
+    from marker_detection import detect_markers
+
+    for res, frames in context["frames"].items():
+        yield Case(f"detect/{res}", detect_markers, frames, context["repeat"], {"resolution": res})
+
+
+def decode_cases(context):
+    from image_cache import ImageCache
+
+    for ext in (".jpg", ".webp"):
+        path = large_image_file(context["tmp"], *context["large_size"], ext)
+        params = {"size": "x".join(map(str, context["large_size"])), "bytes": os.path.getsize(path)}
+        yield Case(f"decode/imread{ext}", cv2.imread, [path], 3, params)
+        cache = ImageCache(max_bytes=1 << 30, disk_dir=None)
+        cache.imread(path)
+        yield Case(f"decode/cache_hit{ext}", cache.imread, [path] * 100, 1, params)
+
+
+def extract_roi_cases(context):
+    from cropping import crop_roi, roi_from_points
+    from tiled_image import TiledImage
+
+    path = large_image_file(context["tmp"], *context["large_size"], ".jpg")
+    tiled = TiledImage.open(path, cache_dir=os.path.join(context["tmp"], "tiles"))  # Built once, as on a reload
+    image = tiled.full_res
+    params = {"size": "x".join(map(str, context["large_size"]))}
+    rois = random_rois(image.shape[1], image.shape[0], count=64)
+    for level in sorted({0, min(2, len(tiled.levels) - 1)}):
+        scale = tiled.scale(level)
+        # Drags in canvas coordinates of the displayed level, as the labeling app receives them
+        drags = [((x / scale, y / scale), ((x + w) / scale, (y + h) / scale)) for x, y, w, h in rois]
+
+        # The body of ImageLabelingApp.extract_roi without the imshow
+        def extract(drag, scale=scale):
+            return crop_roi(image, roi_from_points(drag[0], drag[1], image.shape, scale), copy=True)
+
+        yield Case(f"extract_roi/level{level}", extract, drags, context["repeat"], dict(params, level=level))
+
+
+def crop_cases(context):
+    from cropping import save_crop
+    from image_cache import imread
+
+    path = large_image_file(context["tmp"], *context["large_size"], ".jpg")
+    out_dir = os.path.join(context["tmp"], "crops")
+    os.makedirs(out_dir, exist_ok=True)
+    rois = random_rois(*context["large_size"], count=32, seed=1)
+
+    # The body of crop_with_roi once the ROI is selected
+    def crop(roi):
+        save_crop(imread(path), roi, os.path.join(out_dir, "cropped_image.jpg"), os.path.join(out_dir, "roi_data.txt"))
+
+    yield Case("crop/crop_with_roi", crop, rois, 1, {"size": "x".join(map(str, context["large_size"]))})
+
+
+def export_cases(context):
+    from cropping import export_roi
+
+    rng = np.random.default_rng(0)
+    for size in context["roi_sizes"]:
+        rois = [rng.integers(0, 256, size=(size, size, 3), dtype=np.uint8) for _ in range(3)]
+        out_dir = os.path.join(context["tmp"], f"export_{size}")
+
+        def export(roi, out_dir=out_dir):
+            with contextlib.redirect_stdout(io.StringIO()):  # export_roi reports every save
+                export_roi(out_dir, roi, np.float32, "npy")
+
+        yield Case(f"export/npy/{size}", export, rois, 1, {"roi": size})
+
+
+def drawing_cases(context):
+    from drawing_canvas import IncrementalCanvas
+
+    drawing = load_script("image drawing.py")
+    for res in context["resolutions"]:
+        width, height = RESOLUTIONS[res]
+        start, path = drag_path(width, height, moves=200)
+        drawing.canvas = IncrementalCanvas(width, height)  # The callback draws into the module's canvas
+        drawing.draw(cv2.EVENT_LBUTTONDOWN, start[0], start[1], 0, None)
+        yield Case(f"drawing/drag/{res}", lambda xy: drawing.draw(cv2.EVENT_MOUSEMOVE, xy[0], xy[1], 0, None),
+                   path, 1, {"resolution": res})
+
+
+def save_cases(context):
+    from async_saver import AsyncSaver
+
+    for res, frames in context["frames"].items():
+        saver = AsyncSaver(os.path.join(context["tmp"], f"saved_{res}"), max_pending=10 ** 6)
+        context["cleanup"].append(saver.close)
+        yield Case(f"save/async/{res}", saver.save, frames, 1, {"resolution": res})
+
+
+def profiler_cases(context):
+    from frame_profiler import FrameProfiler
+
+    timings = {"capture": 0.001, "detect": 0.02, "filter": 0.003, "markers": 0.0001}
+    profiler = FrameProfiler()
+    yield Case("profiler/frame_done", lambda _: profiler.frame_done(timings, latency=0.03, dropped=0),
+               range(1000), 1)
+    hud = FrameProfiler(hud=True)
+    for res, frames in context["frames"].items():
+        yield Case(f"profiler/hud/{res}", hud.draw_hud, frames, context["repeat"], {"resolution": res})
+
+
+CASE_GROUPS = {"filters": filter_cases, "detect": detect_cases, "decode": decode_cases,
+               "extract_roi": extract_roi_cases, "crop": crop_cases, "export": export_cases,
+               "drawing": drawing_cases, "save": save_cases, "profiler": profiler_cases}
+
+
+# Peak tracemalloc bytes during one pass over the items
+def allocation_peak(fn, items):
+    tracemalloc.start()
+    try:
+        tracemalloc.reset_peak()
+        for item in items:
+            fn(item)
+        return tracemalloc.get_traced_memory()[1]
+    finally:
+        tracemalloc.stop()
+
+
+def peak_rss_bytes():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak if sys.platform == "darwin" else peak * 1024  # Bytes on macOS, KiB on Linux
+
+
+def run_case(case):
+    result = {"name": case.name, "params": case.params}
+    result.update(summarize(time_per_item(case.fn, case.items, case.repeat)))
+    result["alloc_peak_bytes"] = allocation_peak(case.fn, case.items)
+    result["rss_peak_bytes"] = peak_rss_bytes()
+    return result
+
+
+def environment():
+    return {"python": platform.python_version(), "numpy": np.__version__, "opencv": cv2.__version__,
+            "platform": platform.platform(), "machine": platform.machine(), "cpus": os.cpu_count(),
+            "opencv_threads": cv2.getNumThreads(), "time": time.strftime("%Y-%m-%dT%H:%M:%S")}
+
+
+def run_suite(groups, quick=False, repeat=3, frames=8):
+    resolutions = QUICK_RESOLUTIONS if quick else tuple(RESOLUTIONS)
+    results = []
+    with tempfile.TemporaryDirectory() as tmp:
+        context = {"tmp": tmp, "repeat": repeat, "resolutions": resolutions, "cleanup": [],
+                   "large_size": (3000, 2000) if quick else (8000, 6000),
+                   "roi_sizes": (256, 1024) if quick else (256, 1024, 2048)}
+        if {"filters", "detect", "save", "profiler"} & set(groups):
+            context["frames"] = _frames_by_resolution(resolutions, frames)
+        try:
+            for group in groups:
+                for case in CASE_GROUPS[group](context):
+                    result = run_case(case)
+                    print(format_result(result), flush=True)
+                    results.append(result)
+        finally:
+            for cleanup in context["cleanup"]:
+                cleanup()
+    return {"environment": environment(), "quick": quick, "results": results}
+
+
+def format_result(result):
+    return (f"{result['name']:<28} mean {result['mean_ms']:9.3f} ms  p50 {result['p50_ms']:9.3f} ms  "
+            f"p95 {result['p95_ms']:9.3f} ms  alloc {result['alloc_peak_bytes'] / 2 ** 20:8.1f} MB  "
+            f"rss {result['rss_peak_bytes'] / 2 ** 20:7.0f} MB  (n={result['n']})")
+
+
+# Compare two runs by case name; returns (report lines, names of regressed cases)
+def compare_runs(baseline, current, threshold=0.10):
+    base = {result["name"]: result for result in baseline["results"]}
+    lines = [f"{'case':<28} {'base p50':>10} {'new p50':>10} {'ratio':>7} {'base alloc':>11} {'new alloc':>11}"]
+    regressions = []
+    for result in current["results"]:
+        old = base.get(result["name"])
+        if old is None:
+            lines.append(f"{result['name']:<28} {'-':>10} {result['p50_ms']:10.3f}   (new case)")
+            continue
+        ratio = result["p50_ms"] / old["p50_ms"] if old["p50_ms"] > 0 else float("inf")
+        slower = ratio > 1 + threshold and result["p50_ms"] - old["p50_ms"] > MIN_TIME_DELTA_MS
+        grew = (result["alloc_peak_bytes"] > old["alloc_peak_bytes"] * (1 + threshold)
+                and result["alloc_peak_bytes"] - old["alloc_peak_bytes"] > MIN_MEMORY_DELTA)
+        flags = ("  SLOWER" if slower else "") + ("  MORE MEMORY" if grew else "")
+        lines.append(f"{result['name']:<28} {old['p50_ms']:10.3f} {result['p50_ms']:10.3f} {ratio:7.2f} "
+                     f"{old['alloc_peak_bytes'] / 2 ** 20:9.1f}MB {result['alloc_peak_bytes'] / 2 ** 20:9.1f}MB"
+                     f"{flags}")
+        if slower or grew:
+            regressions.append(result["name"])
+    missing = sorted(set(base) - {result["name"] for result in current["results"]})
+    if missing:
+        lines.append(f"not run: {', '.join(missing)}")
+    return lines, regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--only", default=",".join(GROUPS), help=f"comma-separated groups ({', '.join(GROUPS)})")
+    parser.add_argument("--quick", action="store_true", help="small resolutions and images")
+    parser.add_argument("--repeat", type=int, default=3, help="passes over the inputs of the fast cases")
+    parser.add_argument("--frames", type=int, default=8, help="synthetic frames per resolution")
+    parser.add_argument("--json", help="write the results to this file")
+    parser.add_argument("--compare", metavar="BASELINE", help="results file of an earlier run to compare with")
+    parser.add_argument("--threshold", type=float, default=0.10, help="allowed relative slowdown / memory growth")
+    args = parser.parse_args()
+
+    groups = [group.strip() for group in args.only.split(",") if group.strip()]
+    unknown = [group for group in groups if group not in CASE_GROUPS]
+    if unknown:
+        print(f"Error: unknown groups {', '.join(unknown)} (choose from {', '.join(GROUPS)})")
+        sys.exit(2)
+
+    run = run_suite(groups, args.quick, args.repeat, args.frames)
+    if args.json:
+        with open(args.json, "w") as file:
+            json.dump(run, file, indent=2)
+        print(f"Results written to {args.json}")
+
+    if args.compare:
+        with open(args.compare) as file:
+            baseline = json.load(file)
+        lines, regressions = compare_runs(baseline, run, args.threshold)
+        print("\n".join(lines))
+        if regressions:
+            print(f"{len(regressions)} regressions over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+        print("No regressions")
+
+
+if __name__ == "__main__":
+    main()
@@ -1,11 +1,14 @@
 import cv2
 
+from cropping import save_crop
+from image_cache import imread
+
 def crop_with_roi(image_path, save_path, data_file):
     
     # Load the image
-    image = cv2.imread("D:\One pice\ddd.webp")
+    image = imread(image_path)  # Decoded once, shared with the other tools through the image cache
     if image is None:
-        print("Error: Unable to load the image.")
+        print(f"Error: Unable to load the image: {image_path}")
         return
 
     # Display instructions
@@ -19,16 +22,9 @@ def crop_with_roi(image_path, save_path, data_file):
 
     # If ROI is valid
     if roi != (0, 0, 0, 0):
-        x, y, w, h = map(int, roi)  # ROI coordinates
-        cropped_image = image[y:y+h, x:x+w]  # Crop the image
-
-        # Save the cropped image
-        cv2.imwrite(save_path, cropped_image)
+        # Save the cropped image and the ROI coordinates to the data file
+        cropped_image = save_crop(image, roi, save_path, data_file)
         print(f"Cropped image saved to: {save_path}")
-
-        # Save ROI coordinates to the data file
-        with open(data_file, 'w') as file:
-            file.write(f"ROI Coordinates: x={x}, y={y}, w={w}, h={h}\n")
         print(f"ROI coordinates saved to: {data_file}")
 
         # Show the cropped image
@@ -40,7 +36,7 @@ def crop_with_roi(image_path, save_path, data_file):
 
     cv2.destroyAllWindows()
 
-# Example usage
+# Example usage (for many images / ROIs without selecting them by hand, see batch_crop.py)
 if __name__ == "__main__":
     input_image = "input.jpg"  # Replace with your input image path
     output_image = "cropped_image.jpg"  # Replace with your desired output path
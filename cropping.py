@@ -0,0 +1,89 @@
+"""ROI cropping and export shared by the cropping tool, the labeling app and batch_crop.py.
+
+No GUI code: the tools select the ROI interactively and call these
+helpers with plain coordinates, so batch jobs and other processes can
+import them without loading tkinter or PIL.
+
+    roi = roi_from_points((10, 20), (300, 200), image.shape, scale=4.0)   # drag on a 1/4 view
+    crop = crop_roi(image, roi)                                           # a view, no copy
+    save_crop(image, roi, "cropped_image.jpg", "roi_data.txt")
+    export_roi("out/roi_001", crop.copy(), np.float32, "npy")             # images, normalized data, features
+"""
+
+import json
+import os
+
+import cv2
+
+from preprocessing import compute_stats, normalize, standardize, standardized_to_uint8
+from roi_export import save_roi_data
+from roi_index import describe
+
+
+# Clip an ROI to the image; returns None when nothing of it is inside
+def clip_roi(x, y, w, h, width, height):
+    x0, y0 = max(0, x), max(0, y)
+    x1, y1 = min(width, x + w), min(height, y + h)
+    if x1 <= x0 or y1 <= y0:
+        return None
+    return x0, y0, x1 - x0, y1 - y0
+
+
+# (x, y, w, h) of the box between two drag points in view coordinates, scaled to full resolution and
+# clamped to an image of the given shape (w or h may be 0)
+def roi_from_points(start, end, shape, scale=1.0):
+    x1, y1 = int(start[0] * scale), int(start[1] * scale)
+    x2, y2 = int(end[0] * scale), int(end[1] * scale)
+    x1, x2 = min(x1, x2), max(x1, x2)
+    y1, y2 = min(y1, y2), max(y1, y2)
+    height, width = shape[:2]
+    x1, x2 = max(0, min(x1, width)), max(0, min(x2, width))
+    y1, y2 = max(0, min(y1, height)), max(0, min(y2, height))
+    return x1, y1, x2 - x1, y2 - y1
+
+
+# The pixels of an ROI; a view into the image unless copy is set
+def crop_roi(image, roi, copy=False):
+    x, y, w, h = roi
+    crop = image[y:y + h, x:x + w]
+    return crop.copy() if copy else crop
+
+
+# Write an ROI of the image and its coordinates the way the cropping tool does; returns the crop
+def save_crop(image, roi, save_path, data_file=None):
+    x, y, w, h = map(int, roi)
+    crop = crop_roi(image, (x, y, w, h))
+    if not cv2.imwrite(save_path, crop):
+        raise IOError(f"Could not write crop: {save_path}")
+    if data_file:
+        with open(data_file, "w") as file:
+            file.write(f"ROI Coordinates: x={x}, y={y}, w={w}, h={h}\n")
+    return crop
+
+
+# Write the ROI images and its normalized / standardized data into save_path, see roi_export.py
+def export_roi(save_path, roi, data_dtype, export_format):
+    os.makedirs(save_path, exist_ok=True)
+    roi_path = os.path.join(save_path, "roi.jpg")
+    normalized_path = os.path.join(save_path, "roi_normalized.jpg")
+    standardized_path = os.path.join(save_path, "roi_standardized.jpg")
+
+    # Save ROI; the normalized image is the ROI itself once scaled back to 0..255
+    cv2.imwrite(roi_path, roi)
+    cv2.imwrite(normalized_path, roi)
+
+    # Normalize and standardize (statistics in one pass, results written straight into float buffers)
+    mean, std = compute_stats(roi)
+    normalized = normalize(roi, dtype=data_dtype)
+    standardized = standardize(roi, mean, std, dtype=data_dtype)
+    cv2.imwrite(standardized_path, standardized_to_uint8(roi, mean, std))
+
+    # Save data
+    arrays = {"roi": roi, "normalized": normalized, "standardized": standardized}
+    save_roi_data(save_path, arrays, export_format)
+
+    # Histograms, mean / std and perceptual hash, the same features roi_index.py indexes
+    with open(os.path.join(save_path, "roi_features.json"), "w") as file:
+        json.dump(describe(roi), file)
+
+    print(f"Saved images and data to {save_path}")
@@ -0,0 +1,170 @@
+"""Incremental rendering for the interactive drawing tool.
+
+IncrementalCanvas keeps two buffers: `image` holds the committed drawing
+and `display` is what the window shows (the drawing plus the shape that
+is being dragged). Moving the preview shape restores only the bounding
+box of the previous preview from `image` and draws the new one, so the
+cost of a mouse move depends on the size of the shape, not of the
+canvas. The window is only updated (show()) when something changed, and
+several mouse events that arrive between two updates cost one imshow.
+
+Latency per mouse event (callback work) and per displayed update (from
+the first unshown event to the end of imshow) is recorded for stats().
+"""
+
+import collections
+import time
+
+import cv2
+import numpy as np
+
+RECTANGLE_COLOR = (0, 255, 0)
+CIRCLE_COLOR = (255, 0, 0)
+TEXT_COLOR = (0, 255, 255)
+THICKNESS = 2
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 1
+LATENCY_SAMPLES = 2048  # Most recent samples kept per latency series
+
+
+def circle_radius(start, end):
+    return int(((end[0] - start[0]) ** 2 + (end[1] - start[1]) ** 2) ** 0.5)
+
+
+# Draw one shape the way the drawing tool always has
+def draw_shape(img, mode, start, end, text=""):
+    if mode == 'rectangle':
+        cv2.rectangle(img, start, end, RECTANGLE_COLOR, THICKNESS)
+    elif mode == 'circle':
+        cv2.circle(img, start, circle_radius(start, end), CIRCLE_COLOR, THICKNESS)
+    elif mode == 'text':
+        cv2.putText(img, text, end, FONT, FONT_SCALE, TEXT_COLOR, THICKNESS, cv2.LINE_AA)
+
+
+# Box (x0, y0, x1, y1) that contains every pixel draw_shape touches, or None when it is empty
+def shape_bbox(mode, start, end, text=""):
+    pad = THICKNESS + 2  # Line thickness plus anti-aliasing / rounding
+    if mode == 'rectangle':
+        x0, x1 = sorted((start[0], end[0]))
+        y0, y1 = sorted((start[1], end[1]))
+    elif mode == 'circle':
+        radius = circle_radius(start, end)
+        x0, y0, x1, y1 = start[0] - radius, start[1] - radius, start[0] + radius, start[1] + radius
+    elif mode == 'text':
+        (width, height), baseline = cv2.getTextSize(text, FONT, FONT_SCALE, THICKNESS)
+        x0, y0, x1, y1 = end[0], end[1] - height, end[0] + width, end[1] + baseline
+    else:
+        return None
+    return (x0 - pad, y0 - pad, x1 + pad + 1, y1 + pad + 1)
+
+
+# Recent latency samples in milliseconds
+class LatencyStats:
+    def __init__(self, maxlen=LATENCY_SAMPLES):
+        self.samples = collections.deque(maxlen=maxlen)
+        self.count = 0
+
+    def add(self, seconds):
+        self.samples.append(1000.0 * seconds)
+        self.count += 1
+
+    def summary(self):
+        if not self.samples:
+            return {"count": 0}
+        values = np.fromiter(self.samples, dtype=np.float64)
+        p50, p95 = np.percentile(values, [50, 95])
+        return {"count": self.count, "mean_ms": float(values.mean()), "p50_ms": float(p50), "p95_ms": float(p95),
+                "max_ms": float(values.max())}
+
+
+def _format_summary(name, summary):
+    if not summary["count"]:
+        return f"{name}: no samples"
+    return (f"{name}: {summary['count']} samples, mean {summary['mean_ms']:.3f} ms, p50 {summary['p50_ms']:.3f} ms, "
+            f"p95 {summary['p95_ms']:.3f} ms, max {summary['max_ms']:.3f} ms")
+
+
+# Drawing canvas with a backing buffer, dirty-rectangle preview updates and redisplay only when needed
+class IncrementalCanvas:
+    def __init__(self, width=800, height=600, background=(0, 0, 0)):
+        self.image = np.empty((height, width, 3), dtype=np.uint8)
+        self.image[:] = background
+        self.display = self.image.copy()
+        self.dirty = True  # The window has never shown `display`
+        self._preview_box = None
+        self._pending_since = None  # Time of the first event not yet on screen
+        self.event_latency = LatencyStats()
+        self.frame_latency = LatencyStats()
+        self.shows = 0
+
+    # Clip a box to the canvas; None when nothing is left
+    def _clip(self, box):
+        if box is None:
+            return None
+        height, width = self.image.shape[:2]
+        x0, y0 = max(0, box[0]), max(0, box[1])
+        x1, y1 = min(width, box[2]), min(height, box[3])
+        if x1 <= x0 or y1 <= y0:
+            return None
+        return (x0, y0, x1, y1)
+
+    # Copy a region of the committed drawing into the display buffer
+    def _restore(self, box):
+        if box is not None:
+            x0, y0, x1, y1 = box
+            self.display[y0:y1, x0:x1] = self.image[y0:y1, x0:x1]
+
+    def _changed(self, started):
+        self.dirty = True
+        if self._pending_since is None:
+            self._pending_since = started
+        self.event_latency.add(time.perf_counter() - started)
+
+    # Replace the preview shape: restore its old box, draw the new shape into the display only
+    def preview(self, mode, start, end, text=""):
+        started = time.perf_counter()
+        self._restore(self._preview_box)
+        self._preview_box = self._clip(shape_bbox(mode, start, end, text))
+        if self._preview_box is not None:
+            draw_shape(self.display, mode, start, end, text)
+        self._changed(started)
+
+    # Remove the preview shape without drawing anything
+    def cancel_preview(self):
+        if self._preview_box is not None:
+            started = time.perf_counter()
+            self._restore(self._preview_box)
+            self._preview_box = None
+            self._changed(started)
+
+    # Draw a shape into the drawing itself; only its box is copied to the display
+    def commit(self, mode, start, end, text=""):
+        started = time.perf_counter()
+        self._restore(self._preview_box)
+        self._preview_box = None
+        box = self._clip(shape_bbox(mode, start, end, text))
+        if box is not None:
+            draw_shape(self.image, mode, start, end, text)
+            self._restore(box)
+        self._changed(started)
+
+    # imshow the display buffer if it changed since the last call; returns whether it did
+    def show(self, window):
+        if not self.dirty:
+            return False
+        cv2.imshow(window, self.display)
+        self.dirty = False
+        self.shows += 1
+        if self._pending_since is not None:
+            self.frame_latency.add(time.perf_counter() - self._pending_since)
+            self._pending_since = None
+        return True
+
+    def stats(self):
+        return {"events": self.event_latency.summary(), "frames": self.frame_latency.summary(), "shows": self.shows}
+
+    def format_stats(self):
+        stats = self.stats()
+        return "\n".join([_format_summary("event handling", stats["events"]),
+                          _format_summary("event to screen", stats["frames"]),
+                          f"window updates: {stats['shows']}"])
@@ -0,0 +1,244 @@
+"""Frame filters.
+
+apply_filters(frame, name) applies a named filter (or a whole spec). FilterChain compiles
+a spec such as "blur -> sharpen -> edge" once for a given frame shape:
+kernels and every intermediate buffer are allocated up front, each stage
+writes into its buffer through OpenCV's dst= arguments, and the output
+channel count is known before the first frame.
+
+    chain = FilterChain("blur -> sharpen -> edge", frame.shape)
+    chain.output_shape            # (720, 1280)
+    result = chain.run(frame)     # result is the chain's own buffer, reused next call
+    chain.stage_timings()         # [("blur", 1.2), ("sharpen", 0.9), ("edge", 2.1)] mean ms
+"""
+
+import threading
+import time
+
+import cv2
+import numpy as np
+
+SHARPEN_KERNEL = np.array([[-1, -1, -1], [-1, 9, -1], [-1, -1, -1]], dtype=np.float32)  # Sharpening kernel
+
+
+# Filter stages. Each one knows its output channel count and the halo (pixels of context beyond
+# a tile edge it needs for a tiled result to match the whole-frame one; None when no finite halo does),
+# and writes into a preallocated dst.
+
+class GrayscaleStage:
+    name = "grayscale"
+    halo = 0
+
+    def output_channels(self, channels):
+        return 1
+
+    def compile(self, shape):
+        pass
+
+    def apply(self, src, dst):
+        if src.ndim == 2:
+            return src  # Already single-channel, nothing to do
+        return cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=dst)  # Convert to grayscale
+
+
+class BlurStage:
+    name = "blur"
+    halo = 2  # 5x5 kernel
+
+    def __init__(self, ksize=5):
+        self.ksize = (ksize, ksize)
+
+    def output_channels(self, channels):
+        return channels
+
+    def compile(self, shape):
+        pass
+
+    def apply(self, src, dst):
+        return cv2.GaussianBlur(src, self.ksize, 0, dst=dst)  # Apply Gaussian blur
+
+
+class SharpenStage:
+    name = "sharpen"
+    halo = 1  # 3x3 kernel
+
+    def output_channels(self, channels):
+        return channels
+
+    def compile(self, shape):
+        pass
+
+    def apply(self, src, dst):
+        return cv2.filter2D(src, -1, SHARPEN_KERNEL, dst=dst)  # Apply sharpening filter
+
+
+class EdgeStage:
+    name = "edge"
+    halo = None  # Canny's hysteresis follows connected edges without limit, so no halo makes tiles exact
+
+    def __init__(self, threshold1=100, threshold2=200):
+        self.threshold1 = threshold1
+        self.threshold2 = threshold2
+        self.gray = None
+
+    def output_channels(self, channels):
+        return 1
+
+    def compile(self, shape):
+        if len(shape) == 3 and shape[2] > 1:
+            self.gray = np.empty(shape[:2], dtype=np.uint8)  # Scratch buffer for the grayscale input
+
+    def apply(self, src, dst):
+        gray = src if src.ndim == 2 else cv2.cvtColor(src, cv2.COLOR_BGR2GRAY, dst=self.gray)
+        return cv2.Canny(gray, self.threshold1, self.threshold2, edges=dst)  # Apply edge detection
+
+
+class BgrStage:
+    name = "bgr"
+    halo = 0
+
+    def output_channels(self, channels):
+        return 3
+
+    def compile(self, shape):
+        pass
+
+    def apply(self, src, dst):
+        if src.ndim == 3:
+            return src
+        return cv2.cvtColor(src, cv2.COLOR_GRAY2BGR, dst=dst)  # Back to three channels for color overlays
+
+
+FILTER_STAGES = {
+    "grayscale": GrayscaleStage,
+    "blur": BlurStage,
+    "sharpen": SharpenStage,
+    "edge": EdgeStage,
+    "bgr": BgrStage,
+}
+
+
+# Split "blur -> sharpen -> edge" (or a list of names) into stage names
+def parse_spec(spec):
+    if isinstance(spec, str):
+        names = [name.strip().lower() for name in spec.replace(",", "->").split("->")]
+    else:
+        names = [str(name).strip().lower() for name in spec]
+    names = [name for name in names if name]
+    for name in names:
+        if name not in FILTER_STAGES:
+            raise ValueError(f"Unknown filter: {name} (known: {', '.join(FILTER_STAGES)})")
+    return names
+
+
+# Halo a spec needs when run on tiles (stages are applied one after another, so their halos add up).
+# Raises ValueError for specs with a stage that cannot be tiled exactly (edge); see split_tileable.
+def filter_halo(spec):
+    names = parse_spec(spec)
+    untileable = [name for name in names if FILTER_STAGES[name].halo is None]
+    if untileable:
+        raise ValueError(f"{', '.join(untileable)} cannot run on tiles exactly, split the spec with split_tileable")
+    return sum(FILTER_STAGES[name].halo for name in names)
+
+
+# Split a spec into the stages before the first one that cannot be tiled and the rest:
+# "blur -> sharpen -> edge" -> (["blur", "sharpen"], ["edge"])
+def split_tileable(spec):
+    names = parse_spec(spec)
+    for i, name in enumerate(names):
+        if FILTER_STAGES[name].halo is None:
+            return names[:i], names[i:]
+    return names, []
+
+
+def _shape_with_channels(shape, channels):
+    return tuple(shape[:2]) if channels == 1 else (shape[0], shape[1], channels)
+
+
+# A filter spec compiled for one input shape, with preallocated buffers and per-stage timing
+class FilterChain:
+    def __init__(self, spec, shape, output_channels=None):
+        names = parse_spec(spec)
+        input_channels = 1 if len(shape) == 2 else shape[2]
+        if output_channels == 3 and self._channels_after(names, input_channels) == 1:
+            names.append("bgr")  # Callers that draw in color can ask for a 3-channel result
+        self.spec = " -> ".join(names)
+        self.input_shape = tuple(shape)
+        self.stages = []
+        self.buffers = []
+        channels = input_channels
+        current_shape = self.input_shape
+        for name in names:
+            stage = FILTER_STAGES[name]()
+            stage.compile(current_shape)
+            channels = stage.output_channels(channels)
+            current_shape = _shape_with_channels(current_shape, channels)
+            self.stages.append(stage)
+            self.buffers.append(np.empty(current_shape, dtype=np.uint8))
+        self.output_shape = current_shape
+        self.output_channels = channels
+        # Context needed when the chain runs on tiles, None when it cannot be tiled exactly
+        halos = [stage.halo for stage in self.stages]
+        self.halo = None if None in halos else sum(halos)
+        self.totals = [0.0] * len(self.stages)
+        self.runs = 0
+
+    @staticmethod
+    def _channels_after(names, channels):
+        for name in names:
+            channels = FILTER_STAGES[name]().output_channels(channels)
+        return channels
+
+    # Run the chain. The result is written into `out` when given, otherwise into the chain's own last buffer.
+    def run(self, frame, out=None):
+        if frame.shape != self.input_shape:
+            raise ValueError(f"FilterChain compiled for {self.input_shape}, got {frame.shape}")
+        result = frame
+        last = len(self.stages) - 1
+        for i, stage in enumerate(self.stages):
+            dst = out if (i == last and out is not None) else self.buffers[i]
+            start = time.perf_counter()
+            result = stage.apply(result, dst)
+            self.totals[i] += time.perf_counter() - start
+        self.runs += 1
+        if out is not None and result is not out:
+            np.copyto(out, result)  # The last stage passed its input through unchanged
+            result = out
+        return result
+
+    # Mean milliseconds per run for each stage
+    def stage_timings(self):
+        runs = max(1, self.runs)
+        return [(stage.name, 1000.0 * total / runs) for stage, total in zip(self.stages, self.totals)]
+
+    def reset_timings(self):
+        self.totals = [0.0] * len(self.stages)
+        self.runs = 0
+
+
+# Compiled chains per (spec, shape, output_channels); one cache per thread since chains own their buffers
+_chain_cache = threading.local()
+
+
+def get_filter_chain(spec, shape, output_channels=None):
+    chains = getattr(_chain_cache, "chains", None)
+    if chains is None:
+        chains = _chain_cache.chains = {}
+    key = (spec if isinstance(spec, str) else tuple(spec), tuple(shape), output_channels)
+    chain = chains.get(key)
+    if chain is None:
+        chain = chains[key] = FilterChain(spec, shape, output_channels)
+    return chain
+
+
+# Function to apply filters to the frame
+def apply_filters(frame, filter_type, output_channels=None):
+    try:
+        if not filter_type:
+            return frame
+        chain = get_filter_chain(filter_type, frame.shape, output_channels)
+        out = np.empty(chain.output_shape, dtype=np.uint8)  # The caller owns the result, the chain keeps its scratch buffers
+        return chain.run(frame, out)
+    except Exception as e:
+        print(f"Error applying filter {filter_type}: {str(e)}")
+        return frame
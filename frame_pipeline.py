@@ -0,0 +1,325 @@
+"""Threaded capture -> process -> display pipeline.
+
+A capture thread reads frames into a bounded queue, a pool of worker
+threads runs the per-frame processing (filters, detection) and the
+caller's thread consumes the results, which is where cv2.imshow has to
+run. Both queues drop their oldest entry when full, so a slow stage
+never lets stale camera frames pile up.
+
+Headless use, e.g. to test without a camera:
+
+    python frame_pipeline.py --source clip.mp4 --filter blur --workers 4
+    python frame_pipeline.py --source recorded_frames/ --lossless
+    python frame_pipeline.py --source clip.mp4 --track 15
+"""
+
+import argparse
+import collections
+import threading
+import time
+
+import cv2
+
+from filters import apply_filters
+from frame_sources import open_frame_source
+from marker_detection import DEFAULT_DICTIONARY, detect_markers
+from marker_tracking import MarkerTracker
+
+
+# Bounded FIFO queue; when full, put() discards the oldest entry instead of blocking
+class DropOldestQueue:
+    def __init__(self, maxsize, drop_oldest=True):
+        self.maxsize = maxsize
+        self.drop_oldest = drop_oldest  # False makes put() block instead (lossless offline runs)
+        self.dropped = 0
+        self._items = collections.deque()
+        self._cond = threading.Condition()
+        self._closed = False
+
+    def put(self, item):
+        with self._cond:
+            while len(self._items) >= self.maxsize and not self._closed:
+                if self.drop_oldest:
+                    self._items.popleft()
+                    self.dropped += 1
+                    break
+                self._cond.wait()
+            if self._closed:
+                return False
+            self._items.append(item)
+            self._cond.notify_all()
+            return True
+
+    # Return the next item, or None on timeout / when closed and drained
+    def get(self, timeout=None):
+        with self._cond:
+            if not self._items and not self._closed:
+                self._cond.wait(timeout)
+            if not self._items:
+                return None
+            item = self._items.popleft()
+            self._cond.notify_all()
+            return item
+
+    # Wake up all waiters; remaining items can still be drained with get()
+    def close(self):
+        with self._cond:
+            self._closed = True
+            self._cond.notify_all()
+
+    @property
+    def closed(self):
+        return self._closed
+
+    def __len__(self):
+        return len(self._items)
+
+
+# Thread-safe throughput counter for one pipeline stage
+class StageCounter:
+    def __init__(self, name):
+        self.name = name
+        self.count = 0
+        self.busy_seconds = 0.0  # Time spent inside the stage's own work
+        self.started = None
+        self._lock = threading.Lock()
+
+    def add(self, seconds=0.0):
+        with self._lock:
+            if self.started is None:
+                self.started = time.perf_counter()
+            self.count += 1
+            self.busy_seconds += seconds
+
+    def fps(self):
+        if self.started is None:
+            return 0.0
+        elapsed = time.perf_counter() - self.started
+        return self.count / elapsed if elapsed > 0 else 0.0
+
+    def __str__(self):
+        mean_ms = 1000.0 * self.busy_seconds / self.count if self.count else 0.0
+        return f"{self.name:<8} {self.count:6d} frames  {self.fps():7.1f} fps  {mean_ms:7.2f} ms/frame"
+
+
+# One frame travelling through the pipeline
+class FrameItem:
+    __slots__ = ("index", "captured_at", "frame", "output", "corners", "ids", "timings")
+
+    def __init__(self, index, captured_at, frame):
+        self.index = index
+        self.captured_at = captured_at
+        self.frame = frame
+        self.output = None
+        self.corners = None
+        self.ids = None
+        self.timings = {}  # stage -> seconds, filled in by the stages for frame_profiler.py
+
+    # Seconds from capture until now
+    def latency(self):
+        return time.perf_counter() - self.captured_at
+
+
+# Capture thread + worker pool joined by drop-oldest queues; results are pulled with next_result()
+class FramePipeline:
+    def __init__(self, source, process, workers=2, queue_size=2, drop_oldest=None):
+        self.source = source
+        self.process = process  # process(item) fills item.output (and optionally corners/ids)
+        self.workers = max(1, workers)
+        if drop_oldest is None:
+            drop_oldest = getattr(source, "is_live", True)  # Files and image folders are read losslessly
+        self.capture_queue = DropOldestQueue(queue_size, drop_oldest)
+        self.output_queue = DropOldestQueue(queue_size + self.workers, drop_oldest)
+        self.counters = {name: StageCounter(name) for name in ("capture", "process", "display")}
+        self.stale = 0  # Results that finished after a newer frame had already been shown
+        self.capture_failed = False
+        self._stop = threading.Event()
+        self._threads = []
+        self._workers_alive = 0
+        self._workers_lock = threading.Lock()
+        self._last_index = -1
+        self._reorder = {}
+
+    def start(self):
+        self._threads.append(threading.Thread(target=self._capture_loop, name="capture", daemon=True))
+        self._workers_alive = self.workers
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop, name=f"worker-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _capture_loop(self):
+        index = 0
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = self.source.read()
+                if not ret:
+                    self.capture_failed = True
+                    break
+                read_seconds = time.perf_counter() - start
+                self.counters["capture"].add(read_seconds)
+                item = FrameItem(index, time.perf_counter(), frame)
+                item.timings["capture"] = read_seconds
+                self.capture_queue.put(item)
+                index += 1
+        finally:
+            self.capture_queue.close()
+
+    def _worker_loop(self):
+        try:
+            while not self._stop.is_set():
+                item = self.capture_queue.get(timeout=0.1)
+                if item is None:
+                    if self.capture_queue.closed:
+                        break
+                    continue
+                start = time.perf_counter()
+                try:
+                    self.process(item)
+                except Exception as e:
+                    print(f"Error processing frame {item.index}: {str(e)}")
+                    item.output = item.frame  # Pass the frame through so ordered consumers don't stall
+                self.counters["process"].add(time.perf_counter() - start)
+                self.output_queue.put(item)
+        finally:
+            with self._workers_lock:
+                self._workers_alive -= 1
+                if self._workers_alive == 0:
+                    self.output_queue.close()
+
+    # Next processed frame in capture order, None on timeout or once the pipeline has drained
+    def next_result(self, timeout=0.1):
+        while True:
+            if self.output_queue.drop_oldest:
+                item = self.output_queue.get(timeout)
+                if item is None:
+                    return None
+                if item.index < self._last_index:
+                    self.stale += 1  # A newer frame is already on screen, showing this one would go backwards
+                    continue
+            else:
+                item = self._reorder.pop(self._last_index + 1, None)
+                if item is None:
+                    item = self.output_queue.get(timeout)
+                    if item is None:
+                        if self.output_queue.closed and self._reorder:
+                            item = self._reorder.pop(min(self._reorder))
+                        else:
+                            return None
+                    elif item.index != self._last_index + 1:
+                        self._reorder[item.index] = item  # Lossless mode keeps strict frame order
+                        continue
+            self._last_index = item.index
+            self.counters["display"].add()
+            return item
+
+    # True once capture has ended and every processed frame has been consumed
+    @property
+    def finished(self):
+        return self.output_queue.closed and len(self.output_queue) == 0 and not self._reorder
+
+    @property
+    def dropped(self):
+        return self.capture_queue.dropped + self.output_queue.dropped + self.stale
+
+    def stop(self):
+        self._stop.set()
+        self.capture_queue.close()
+        self.output_queue.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+
+    def report(self):
+        lines = [str(counter) for counter in self.counters.values()]
+        lines.append(f"dropped  capture queue {self.capture_queue.dropped}, output queue "
+                     f"{self.output_queue.dropped}, stale {self.stale}")
+        return "\n".join(lines)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Processing step used by the headless runner: optional filter, then marker detection
+def make_processor(filter_fn=None, detect=True, dictionary=DEFAULT_DICTIONARY, tracker=None):
+    def process(item):
+        if tracker is not None:
+            result = tracker.update(item.frame)  # Stateful, needs frames in order (one worker)
+            item.corners, item.ids = result.corners, result.ids
+        elif detect:
+            item.corners, item.ids = detect_markers(item.frame, dictionary)
+        item.output = filter_fn(item.frame) if filter_fn is not None else item.frame
+    return process
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--source", default="0", help="camera index, video file/URL or image directory")
+    parser.add_argument("--workers", type=int, default=2)
+    parser.add_argument("--queue-size", type=int, default=2)
+    parser.add_argument("--filter", default=None, help='filter or chain, e.g. "blur -> sharpen -> edge"')
+    parser.add_argument("--dictionary", default=DEFAULT_DICTIONARY)
+    parser.add_argument("--no-detect", action="store_true", help="skip marker detection")
+    parser.add_argument("--track", type=int, default=0, metavar="N",
+                        help="track markers between frames, full detection every N frames (uses one worker)")
+    parser.add_argument("--lossless", action="store_true", help="block instead of dropping frames")
+    parser.add_argument("--display", action="store_true", help="show frames in a window")
+    args = parser.parse_args()
+
+    source = open_frame_source(args.source)
+    if not source.isOpened():
+        print(f"Error: Could not open source {args.source}")
+        return
+
+    filter_fn = None
+    if args.filter:
+        filter_fn = lambda frame: apply_filters(frame, args.filter)
+
+    tracker = None
+    if args.track and not args.no_detect:
+        tracker = MarkerTracker(args.dictionary, redetect_interval=args.track)
+        args.workers = 1
+
+    process = make_processor(filter_fn, not args.no_detect, args.dictionary, tracker)
+    pipeline = FramePipeline(source, process, args.workers, args.queue_size,
+                             drop_oldest=False if args.lossless else None)
+    markers_seen = 0
+    latencies = []
+    start = time.perf_counter()
+    try:
+        pipeline.start()
+        while not pipeline.finished:
+            item = pipeline.next_result()
+            if item is None:
+                continue
+            latencies.append(item.latency())
+            if item.ids is not None:
+                markers_seen += len(item.ids)
+            if args.display:
+                cv2.imshow("Pipeline", item.output)
+                if cv2.waitKey(1) & 0xFF == ord("q"):
+                    break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        pipeline.stop()
+        source.release()
+        if args.display:
+            cv2.destroyAllWindows()
+
+    elapsed = time.perf_counter() - start
+    print(pipeline.report())
+    if latencies:
+        latencies.sort()
+        print(f"latency  p50 {1000 * latencies[len(latencies) // 2]:.1f} ms, "
+              f"max {1000 * latencies[-1]:.1f} ms")
+    print(f"markers  {markers_seen} detections in {elapsed:.2f} s")
+
+
+if __name__ == "__main__":
+    main()
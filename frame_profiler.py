@@ -0,0 +1,226 @@
+"""Per-frame stage timing, FPS, latency percentiles and an on-screen HUD.
+
+FrameProfiler collects the time each frame spent in every stage
+(capture, detect, filter, buttons, display, ...) and its end-to-end
+latency. It keeps the most recent WINDOW samples per stage for the
+rolling p50 / p95 / p99 and a log-spaced histogram over the whole run.
+Exports carry both: the rolling percentiles and the whole-run
+run_p50 / run_p95 / run_p99 (bin upper edges, within 26%) from the
+histogram, so a soak test's export still describes every frame; JSON
+lines also include the histogram itself. Recording a sample
+is a few array writes; percentiles are only computed when the HUD text
+is refreshed (every HUD_REFRESH seconds) or a snapshot is exported.
+
+The worker threads time their stages into the frame itself
+(FrameItem.timings) and the display loop hands the finished frame to
+the profiler, so the profiler is only ever touched from one thread.
+
+    profiler = FrameProfiler(log_path="soak.csv", log_interval=10)
+    ...
+    profiler.frame_done(item.timings, latency=item.latency(), dropped=pipeline.dropped)
+    with profiler.timed("display"):
+        cv2.imshow(window, frame)
+    profiler.draw_hud(frame)        # when enabled, toggle with profiler.toggle_hud()
+    profiler.maybe_export()         # appends a snapshot every log_interval seconds
+
+Logs are CSV (one row per stage and snapshot) or JSON lines (one
+snapshot per line), chosen by the file extension.
+"""
+
+import collections
+import contextlib
+import csv
+import json
+import os
+import time
+
+import cv2
+import numpy as np
+
+WINDOW = 512  # Recent samples per stage used for the rolling percentiles
+FPS_WINDOW = 120  # Frames the rolling FPS is measured over
+HUD_REFRESH = 0.5  # Seconds between HUD text updates
+HISTOGRAM_EDGES_MS = np.geomspace(0.01, 10000.0, 61)  # Log-spaced bins, 10 per decade
+HUD_FONT = cv2.FONT_HERSHEY_SIMPLEX
+HUD_FONT_SCALE = 0.45
+HUD_LINE_HEIGHT = 18
+HUD_COLOR = (255, 255, 255)
+HUD_COLUMNS = (0, 90, 145, 200)  # x offsets of the stage / p50 / p95 / p99 columns
+CSV_FIELDS = ["time", "uptime_s", "frames", "fps", "dropped", "stage", "count", "mean_ms", "p50_ms", "p95_ms",
+              "p99_ms", "max_ms", "run_p50_ms", "run_p95_ms", "run_p99_ms"]
+
+
+# Timings of one stage: a ring buffer of recent samples plus a histogram of all of them
+class StageStats:
+    def __init__(self, name, window=WINDOW):
+        self.name = name
+        self.recent = np.zeros(window, dtype=np.float64)
+        self.histogram = np.zeros(len(HISTOGRAM_EDGES_MS) + 1, dtype=np.int64)
+        self.count = 0
+        self.total_ms = 0.0
+        self.max_ms = 0.0
+
+    def add(self, seconds):
+        ms = 1000.0 * seconds
+        self.recent[self.count % len(self.recent)] = ms
+        self.count += 1
+        self.total_ms += ms
+        if ms > self.max_ms:
+            self.max_ms = ms
+        self.histogram[np.searchsorted(HISTOGRAM_EDGES_MS, ms)] += 1
+
+    # p50 / p95 / p99 of the recent samples, in ms
+    def percentiles(self):
+        if not self.count:
+            return (0.0, 0.0, 0.0)
+        return tuple(float(p) for p in np.percentile(self.recent[:min(self.count, len(self.recent))], [50, 95, 99]))
+
+    # Percentile over the whole run from the histogram (upper edge of the bin it falls in)
+    def run_percentile(self, q):
+        if not self.count:
+            return 0.0
+        index = int(np.searchsorted(np.cumsum(self.histogram), q / 100.0 * self.count))
+        return float(HISTOGRAM_EDGES_MS[min(index, len(HISTOGRAM_EDGES_MS) - 1)])
+
+    # Non-empty histogram bins as {upper edge in ms: count}; the last bin ("inf") holds everything above the edges
+    def histogram_bins(self):
+        edges = [f"{edge:.4g}" for edge in HISTOGRAM_EDGES_MS] + ["inf"]
+        return {edges[i]: int(self.histogram[i]) for i in np.flatnonzero(self.histogram)}
+
+    # Rolling percentiles (p50_ms ...) over the recent window, run_* percentiles over every sample
+    def summary(self):
+        p50, p95, p99 = self.percentiles()
+        mean = self.total_ms / self.count if self.count else 0.0
+        return {"stage": self.name, "count": self.count, "mean_ms": mean, "p50_ms": p50, "p95_ms": p95,
+                "p99_ms": p99, "max_ms": self.max_ms, "run_p50_ms": self.run_percentile(50),
+                "run_p95_ms": self.run_percentile(95), "run_p99_ms": self.run_percentile(99)}
+
+
+# Frame-level profiler: stage timers, FPS, drops, HUD and periodic export
+class FrameProfiler:
+    def __init__(self, hud=False, log_path=None, log_interval=10.0, window=WINDOW):
+        self.hud_enabled = hud
+        self.log_path = log_path
+        self.log_interval = log_interval
+        self.window = window
+        self.stages = {}  # name -> StageStats, in first-seen order
+        self.frames = 0
+        self.dropped = 0
+        self.started = time.perf_counter()
+        self._frame_times = collections.deque(maxlen=FPS_WINDOW)
+        self._hud_lines = []
+        self._hud_updated = 0.0
+        self._last_export = self.started
+        self._log_header_written = False
+
+    def record(self, stage, seconds):
+        stats = self.stages.get(stage)
+        if stats is None:
+            stats = self.stages[stage] = StageStats(stage, self.window)
+        stats.add(seconds)
+
+    # Time the body of a with-block as one sample of `stage`
+    @contextlib.contextmanager
+    def timed(self, stage):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.record(stage, time.perf_counter() - start)
+
+    # A frame reached the screen: record its stage timings, end-to-end latency and the pipeline's drop count
+    def frame_done(self, timings=None, latency=None, dropped=None):
+        if timings:
+            for stage, seconds in timings.items():
+                self.record(stage, seconds)
+        if latency is not None:
+            self.record("latency", latency)
+        if dropped is not None:
+            self.dropped = dropped
+        self.frames += 1
+        self._frame_times.append(time.perf_counter())
+
+    # Frames per second over the last FPS_WINDOW frames
+    def fps(self):
+        if len(self._frame_times) < 2:
+            return 0.0
+        elapsed = self._frame_times[-1] - self._frame_times[0]
+        return (len(self._frame_times) - 1) / elapsed if elapsed > 0 else 0.0
+
+    def toggle_hud(self):
+        self.hud_enabled = not self.hud_enabled
+        self._hud_updated = 0.0  # Fresh numbers the moment it is shown
+        return self.hud_enabled
+
+    def _refresh_hud(self):
+        lines = [(f"FPS {self.fps():.1f}  frames {self.frames}  dropped {self.dropped}",),
+                 ("stage ms", "p50", "p95", "p99")]
+        for stats in self.stages.values():
+            lines.append((stats.name,) + tuple(f"{p:.1f}" for p in stats.percentiles()))
+        self._hud_lines = lines
+
+    # Draw the stats into the frame's top right corner when the HUD is enabled
+    def draw_hud(self, frame):
+        if not self.hud_enabled:
+            return
+        now = time.perf_counter()
+        if now - self._hud_updated >= HUD_REFRESH:
+            self._refresh_hud()
+            self._hud_updated = now
+        width = 270
+        height = HUD_LINE_HEIGHT * len(self._hud_lines) + 8
+        x0 = max(0, frame.shape[1] - width - 10)
+        y1 = min(frame.shape[0], 10 + height)
+        region = frame[10:y1, x0:x0 + width]
+        np.right_shift(region, 1, out=region)  # Darken the background so the text stays readable
+        for i, cells in enumerate(self._hud_lines):
+            y = 10 + HUD_LINE_HEIGHT * (i + 1)
+            for column, cell in zip(HUD_COLUMNS, cells):  # Fixed columns, the font is not monospaced
+                cv2.putText(frame, cell, (x0 + 6 + column, y), HUD_FONT, HUD_FONT_SCALE, HUD_COLOR, 1, cv2.LINE_AA)
+
+    def snapshot(self):
+        return {"time": time.strftime("%Y-%m-%dT%H:%M:%S"), "uptime_s": time.perf_counter() - self.started,
+                "frames": self.frames, "fps": self.fps(), "dropped": self.dropped,
+                "stages": [stats.summary() for stats in self.stages.values()]}
+
+    # Append a snapshot to the log file every log_interval seconds
+    def maybe_export(self, force=False):
+        if self.log_path is None:
+            return False
+        now = time.perf_counter()
+        if not force and now - self._last_export < self.log_interval:
+            return False
+        self._last_export = now
+        try:
+            self.export(self.log_path)
+        except OSError as e:
+            print(f"Error writing profile log: {str(e)}")
+            return False
+        return True
+
+    def export(self, path):
+        snapshot = self.snapshot()
+        if path.lower().endswith(".csv"):
+            write_header = not self._log_header_written and not (os.path.exists(path) and os.path.getsize(path))
+            with open(path, "a", newline="") as file:
+                writer = csv.DictWriter(file, CSV_FIELDS)
+                if write_header:
+                    writer.writeheader()
+                frame_fields = {key: snapshot[key] for key in ("time", "uptime_s", "frames", "fps", "dropped")}
+                for stage in snapshot["stages"]:
+                    writer.writerow({**frame_fields, **stage})
+            self._log_header_written = True
+        else:
+            for stage in snapshot["stages"]:
+                stage["histogram"] = self.stages[stage["stage"]].histogram_bins()
+            with open(path, "a") as file:
+                file.write(json.dumps(snapshot) + "\n")
+
+    def report(self):
+        lines = [f"{self.frames} frames, {self.fps():.1f} fps (last {FPS_WINDOW}), {self.dropped} dropped"]
+        for stats in self.stages.values():
+            summary = stats.summary()
+            lines.append(f"{stats.name:<10} mean {summary['mean_ms']:7.2f} ms  p50 {summary['p50_ms']:7.2f}  "
+                         f"p95 {summary['p95_ms']:7.2f}  p99 {summary['p99_ms']:7.2f}  max {summary['max_ms']:7.2f}  "
+                         f"(run p99 <= {stats.run_percentile(99):.2f} ms)")
+        return "\n".join(lines)
@@ -0,0 +1,97 @@
+"""Frame sources with the cv2.VideoCapture read()/isOpened()/release() interface.
+
+    source = open_frame_source(0)                 # camera index
+    source = open_frame_source("clip.mp4")        # video file or stream URL
+    source = open_frame_source("recorded_frames") # directory of images, sorted by name
+"""
+
+import glob
+import os
+
+import cv2
+
+from image_cache import imread
+
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".webp", ".tif", ".tiff")
+
+
+# List the image files of a directory in name order
+def list_image_files(directory):
+    files = glob.glob(os.path.join(directory, "*"))
+    return sorted(f for f in files if f.lower().endswith(IMAGE_EXTENSIONS))
+
+
+# Image directory that behaves like a VideoCapture
+class ImageDirectorySource:
+    def __init__(self, directory, loop=False):
+        self.directory = directory
+        self.files = list_image_files(directory)
+        self.loop = loop  # Restart from the first image when the directory is exhausted
+        self.index = 0
+        self.is_live = False
+
+    def isOpened(self):
+        return len(self.files) > 0
+
+    def read(self):
+        while self.files:
+            if self.index >= len(self.files):
+                if not self.loop:
+                    return False, None
+                self.index = 0
+            path = self.files[self.index]
+            self.index += 1
+            # Looping over a directory decodes every image only once; a single pass keeps nothing in memory
+            frame = imread(path, use_cache=self.loop)
+            if frame is not None:
+                return True, frame.copy()  # Callers draw into frames, the cached image stays untouched
+            print(f"Skipping unreadable image: {path}")
+        return False, None
+
+    def get(self, prop):
+        if prop == cv2.CAP_PROP_FRAME_COUNT:
+            return float(len(self.files))
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            return float(self.index)
+        return 0.0
+
+    def set(self, prop, value):
+        if prop == cv2.CAP_PROP_POS_FRAMES:
+            self.index = int(value)
+            return True
+        return False
+
+    def release(self):
+        self.files = []
+
+
+# Wrapper around cv2.VideoCapture that remembers whether it reads from a live device
+class VideoSource:
+    def __init__(self, spec, is_live):
+        self.capture = cv2.VideoCapture(spec)
+        self.is_live = is_live
+
+    def isOpened(self):
+        return self.capture.isOpened()
+
+    def read(self):
+        return self.capture.read()
+
+    def get(self, prop):
+        return self.capture.get(prop)
+
+    def set(self, prop, value):
+        return self.capture.set(prop, value)
+
+    def release(self):
+        self.capture.release()
+
+
+# Open a camera index, video file / stream URL or image directory
+def open_frame_source(spec, loop=False):
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return VideoSource(int(spec), is_live=True)
+    if os.path.isdir(spec):
+        return ImageDirectorySource(spec, loop=loop)
+    is_stream = "://" in spec  # rtsp://, http:// ... behave like a live camera
+    return VideoSource(spec, is_live=is_stream)
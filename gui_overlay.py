@@ -0,0 +1,112 @@
+"""On-frame buttons and a cached overlay for the button bar.
+
+The button bar is rendered once into a small image plus a mask and then
+blitted into every frame with a single masked copy. The overlay is only
+re-rendered after invalidate(), e.g. when the highlighted button changes.
+Grayscale (single-channel) and BGRA frames get their own converted copy
+of the overlay, built on first use.
+"""
+
+import cv2
+import numpy as np
+
+FONT = cv2.FONT_HERSHEY_SIMPLEX
+FONT_SCALE = 0.5
+FONT_THICKNESS = 1
+BUTTON_COLOR = (200, 200, 200)
+ACTIVE_COLOR = (120, 200, 120)
+TEXT_COLOR = (0, 0, 0)
+
+
+# Class for button objects
+class Button:
+    def __init__(self, x, y, width, height, text, action):
+        self.x = x
+        self.y = y
+        self.width = width
+        self.height = height
+        self.text = text
+        self.action = action  # Function to execute when the button is clicked
+        self.active = False  # Highlighted, e.g. the currently selected filter
+
+    # Check if the button was clicked
+    def is_clicked(self, mouse_x, mouse_y):
+        return self.x <= mouse_x <= self.x + self.width and self.y <= mouse_y <= self.y + self.height
+
+    # Draw the button on the frame; origin shifts the button when drawing into a sub-image
+    def draw(self, img, color=None, text_color=TEXT_COLOR, origin=(0, 0)):
+        if color is None:
+            color = ACTIVE_COLOR if self.active else BUTTON_COLOR
+        x, y = self.x - origin[0], self.y - origin[1]
+        cv2.rectangle(img, (x, y), (x + self.width, y + self.height), color, -1)
+        cv2.rectangle(img, (x, y), (x + self.width, y + self.height), (0, 0, 0), 1)
+
+        text_size = cv2.getTextSize(self.text, FONT, FONT_SCALE, FONT_THICKNESS)[0]
+        text_x = x + (self.width - text_size[0]) // 2
+        text_y = y + (self.height + text_size[1]) // 2
+
+        cv2.putText(img, self.text, (text_x, text_y), FONT, FONT_SCALE, text_color, FONT_THICKNESS)
+
+
+# Pre-rendered button bar composited into frames with one masked copy
+class ButtonOverlay:
+    def __init__(self, buttons):
+        self.buttons = buttons
+        self.renders = 0  # How often the overlay was (re)built
+        self._dirty = True
+        self._box = (0, 0, 0, 0)
+        self._bgr = None
+        self._mask = None
+        self._variants = {}  # Overlay converted per channel count
+
+    # Force a re-render on the next composite (button added, moved, highlighted, renamed ...)
+    def invalidate(self):
+        self._dirty = True
+
+    def _render(self):
+        x0 = min(b.x for b in self.buttons)
+        y0 = min(b.y for b in self.buttons)
+        x1 = max(b.x + b.width for b in self.buttons) + 1  # The 1px outline is drawn on x + width
+        y1 = max(b.y + b.height for b in self.buttons) + 1
+        self._box = (x0, y0, x1, y1)
+        self._bgr = np.zeros((y1 - y0, x1 - x0, 3), dtype=np.uint8)
+        self._mask = np.zeros((y1 - y0, x1 - x0), dtype=np.uint8)
+        for button in self.buttons:
+            button.draw(self._bgr, origin=(x0, y0))
+            bx, by = button.x - x0, button.y - y0
+            self._mask[by:by + button.height + 1, bx:bx + button.width + 1] = 1
+        self._variants = {}
+        self._dirty = False
+        self.renders += 1
+
+    # Overlay image converted for frames with `channels` channels
+    def _variant(self, channels):
+        variant = self._variants.get(channels)
+        if variant is None:
+            if channels == 1:
+                variant = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2GRAY)
+            elif channels == 4:
+                variant = cv2.cvtColor(self._bgr, cv2.COLOR_BGR2BGRA)
+            else:
+                variant = self._bgr
+            self._variants[channels] = variant
+        return variant
+
+    # Blit the button bar into the frame in place
+    def composite(self, frame):
+        if not self.buttons:
+            return frame
+        if self._dirty:
+            self._render()
+        x0, y0, x1, y1 = self._box
+        height, width = frame.shape[:2]
+        w, h = min(x1, width) - x0, min(y1, height) - y0
+        if w <= 0 or h <= 0:
+            return frame  # Frame smaller than the bar's top-left corner
+        channels = 1 if frame.ndim == 2 else frame.shape[2]
+        region = frame[y0:y0 + h, x0:x0 + w]
+        if frame.ndim == 3 and channels == 1:
+            region = region[:, :, 0]  # (h, w, 1) single-channel frame
+        overlay = self._variant(channels)
+        cv2.copyTo(overlay[:h, :w], self._mask[:h, :w], dst=region)  # Masked copy straight into the frame view
+        return frame
@@ -0,0 +1,218 @@
+"""Decoded-image cache shared by the cropping, labeling and detection tools.
+
+Decoding a large WebP / JPEG costs far more than keeping the pixels.
+ImageCache keeps decoded images in a byte-budgeted LRU in memory and,
+optionally, as raw .npy arrays on disk. Entries are keyed by the file's
+absolute path, size and mtime, so an edited file is decoded again. Disk
+entries are memory-mapped on load, which makes a hit in a new process
+(another tool, the next run) cost a file open instead of a decode.
+
+Cached images are shared and therefore read-only; copy before drawing
+into one.
+
+    from image_cache import imread        # drop-in for cv2.imread
+    image = imread(path)                  # decoded once per process (and per disk cache)
+    print(default_cache.stats.format())   # "hits 12, disk hits 3, misses 4, decode time saved 1.9 s"
+
+The default cache holds IMAGE_CACHE_BYTES bytes (512 MB) in memory; the
+disk layer is enabled by setting IMAGE_CACHE_DIR (or by passing
+disk_dir). One-pass batch tools read with imread(path, use_cache=False):
+they still get memory and disk hits, but what they decode is not kept
+in memory, since they never read it again. tiled_image.py stores its pyramids under the same key scheme
+and counts its hits in the same stats.
+"""
+
+import collections
+import hashlib
+import json
+import os
+import threading
+import time
+
+import cv2
+import numpy as np
+
+DEFAULT_MAX_BYTES = int(os.environ.get("IMAGE_CACHE_BYTES", 512 * 1024 * 1024))
+DEFAULT_DISK_DIR = os.environ.get("IMAGE_CACHE_DIR") or None
+
+
+# Byte-budgeted LRU cache; on_evict(key) is called for every entry dropped to make room
+class LRUCache:
+    def __init__(self, max_bytes, on_evict=None):
+        self.max_bytes = max_bytes
+        self.on_evict = on_evict
+        self.bytes = 0
+        self.hits = 0
+        self.misses = 0
+        self._items = collections.OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key):
+        with self._lock:
+            value = self._items.get(key)
+            if value is None:
+                self.misses += 1
+                return None
+            self._items.move_to_end(key)
+            self.hits += 1
+            return value
+
+    def put(self, key, value):
+        size = value.nbytes
+        if size > self.max_bytes:
+            return value  # Larger than the whole budget, don't evict everything for it
+        with self._lock:
+            old = self._items.pop(key, None)
+            if old is not None:
+                self.bytes -= old.nbytes
+            self._items[key] = value
+            self.bytes += size
+            while self.bytes > self.max_bytes:
+                evicted_key, evicted = self._items.popitem(last=False)
+                self.bytes -= evicted.nbytes
+                if self.on_evict is not None:
+                    self.on_evict(evicted_key)
+        return value
+
+    def clear(self):
+        with self._lock:
+            self._items.clear()
+            self.bytes = 0
+
+    def __len__(self):
+        return len(self._items)
+
+
+# (absolute path, size, mtime) of a file; raises OSError when it does not exist
+def cache_key(path):
+    stat = os.stat(path)
+    return (os.path.abspath(path), stat.st_size, stat.st_mtime_ns)
+
+
+# Path prefix of a file's entries in a disk cache directory: <dir>/<stem>-<digest of the key>
+def cache_entry(path, cache_dir, key=None):
+    key = key or cache_key(path)
+    digest = hashlib.sha1("|".join(map(str, key)).encode("utf-8")).hexdigest()[:16]
+    return os.path.join(cache_dir, f"{os.path.splitext(os.path.basename(path))[0]}-{digest}")
+
+
+# Hit / miss counters and decode time, shared by everything that caches decoded images
+class CacheStats:
+    def __init__(self):
+        self.hits = 0  # Served from memory
+        self.disk_hits = 0  # Served from the disk cache
+        self.misses = 0  # Decoded
+        self.decode_seconds = 0.0  # Time spent decoding
+        self.saved_seconds = 0.0  # Decode time the hits did not have to spend
+        self._lock = threading.Lock()
+
+    def record_hit(self, saved_seconds, disk=False):
+        with self._lock:
+            if disk:
+                self.disk_hits += 1
+            else:
+                self.hits += 1
+            self.saved_seconds += max(0.0, saved_seconds)
+
+    def record_miss(self, decode_seconds):
+        with self._lock:
+            self.misses += 1
+            self.decode_seconds += decode_seconds
+
+    def as_dict(self):
+        return {"hits": self.hits, "disk_hits": self.disk_hits, "misses": self.misses,
+                "decode_seconds": self.decode_seconds, "saved_seconds": self.saved_seconds}
+
+    def format(self):
+        return (f"hits {self.hits}, disk hits {self.disk_hits}, misses {self.misses}, "
+                f"decode time {self.decode_seconds:.2f} s, decode time saved {self.saved_seconds:.2f} s")
+
+
+# Write the decode time next to a disk entry so later processes know what a hit saves
+def write_meta(path, decode_seconds, source):
+    with open(path, "w") as file:
+        json.dump({"decode_seconds": decode_seconds, "source": source}, file)
+
+
+def read_decode_seconds(path):
+    try:
+        with open(path) as file:
+            return float(json.load(file)["decode_seconds"])
+    except (OSError, ValueError, KeyError):
+        return 0.0
+
+
+# Memory LRU of decoded images with an optional .npy disk layer
+class ImageCache:
+    def __init__(self, max_bytes=DEFAULT_MAX_BYTES, disk_dir=DEFAULT_DISK_DIR, stats=None):
+        self.memory = LRUCache(max_bytes, on_evict=self._forget)
+        self.disk_dir = disk_dir
+        self.stats = stats or CacheStats()
+        self._decode_times = {}  # key -> seconds the decode took, for the time-saved figure; only for cached keys
+
+    def _forget(self, key):
+        self._decode_times.pop(key, None)
+
+    # Keep an image in memory (unless it exceeds the whole budget) together with its decode time
+    def _remember(self, key, image, decode_seconds):
+        if image.nbytes <= self.memory.max_bytes:
+            self._decode_times[key] = decode_seconds
+            self.memory.put(key, image)
+        return image
+
+    # Like cv2.imread (None when the file is missing or undecodable), but served from the cache when possible.
+    # With use_cache=False the image is still looked up, but not kept in memory (one-pass batch reads).
+    def imread(self, path, flags=cv2.IMREAD_COLOR, use_cache=True):
+        try:
+            key = cache_key(path) + (int(flags),)
+        except OSError:
+            return None
+        image = self.memory.get(key)
+        if image is not None:
+            self.stats.record_hit(self._decode_times.get(key, 0.0))
+            return image
+
+        entry = f"{cache_entry(path, self.disk_dir, key[:3])}_{int(flags)}" if self.disk_dir else None
+        if entry and os.path.exists(entry + ".npy"):
+            start = time.perf_counter()
+            try:
+                image = np.load(entry + ".npy", mmap_mode="r")
+            except (OSError, ValueError):
+                image = None  # Damaged entry, decode again and overwrite it
+            if image is not None:
+                decode_seconds = read_decode_seconds(entry + ".json")
+                self.stats.record_hit(decode_seconds - (time.perf_counter() - start), disk=True)
+                return self._remember(key, image, decode_seconds) if use_cache else image
+
+        start = time.perf_counter()
+        image = cv2.imread(path, flags)
+        decode_seconds = time.perf_counter() - start
+        if image is None:
+            return None
+        image.flags.writeable = False  # Shared between callers
+        self.stats.record_miss(decode_seconds)
+        if entry:
+            self._store(entry, image, decode_seconds, key[0])
+        return self._remember(key, image, decode_seconds) if use_cache else image
+
+    def _store(self, entry, image, decode_seconds, source):
+        try:
+            os.makedirs(self.disk_dir, exist_ok=True)
+            tmp = f"{entry}.{os.getpid()}.{threading.get_ident()}.tmp.npy"
+            np.save(tmp, image)
+            write_meta(entry + ".json", decode_seconds, source)
+            os.replace(tmp, entry + ".npy")  # Readers only ever see complete arrays
+        except OSError as e:
+            print(f"Could not write image cache entry {entry}: {str(e)}")
+
+    def clear(self):
+        self.memory.clear()
+        self._decode_times.clear()
+
+
+default_cache = ImageCache()
+
+
+# cv2.imread through the process-wide default cache
+def imread(path, flags=cv2.IMREAD_COLOR, use_cache=True):
+    return default_cache.imread(path, flags, use_cache)
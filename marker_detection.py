@@ -0,0 +1,149 @@
+"""Shared ArUco marker detection.
+
+Building the dictionary, the DetectorParameters and the ArucoDetector is
+done once per (dictionary, parameter set) and reused for every frame.
+
+    from marker_detection import detect_markers, get_detector
+
+    corners, ids = detect_markers(frame)                          # DICT_6X6_250
+    corners, ids = detect_markers(frame, dictionary="DICT_4X4_50")
+    detector = get_detector("DICT_5X5_100", {"minMarkerPerimeterRate": 0.02})
+
+Threads that detect concurrently can each borrow their own detector
+instance from a DetectorPool:
+
+    pool = DetectorPool(4)
+    with pool.borrow() as detector:
+        corners, ids = detect_markers(frame, detector=detector)
+"""
+
+import contextlib
+import queue
+import threading
+
+import cv2
+from cv2 import aruco
+
+DEFAULT_DICTIONARY = "DICT_6X6_250"
+
+
+# Resolve a dictionary given as a name ("DICT_6X6_250" or "6X6_250") or as an aruco constant
+def resolve_dictionary_id(dictionary):
+    if isinstance(dictionary, str):
+        name = dictionary.upper()
+        if not name.startswith("DICT_"):
+            name = "DICT_" + name
+        if not hasattr(aruco, name):
+            raise ValueError(f"Unknown ArUco dictionary: {dictionary}")
+        return getattr(aruco, name)
+    return int(dictionary)
+
+
+# Turn a parameter override dict into a hashable, order-independent key
+def _params_key(params):
+    if not params:
+        return ()
+    return tuple(sorted(params.items()))
+
+
+# Registry of ready-to-use detectors keyed by dictionary + parameter set
+class DetectorRegistry:
+    def __init__(self):
+        self._detectors = {}
+        self._dictionaries = {}
+        self._lock = threading.RLock()  # Only guards creation, lookups of existing entries are lock-free
+
+    # Get the predefined dictionary, built once per id
+    def get_dictionary(self, dictionary=DEFAULT_DICTIONARY):
+        dict_id = resolve_dictionary_id(dictionary)
+        aruco_dict = self._dictionaries.get(dict_id)
+        if aruco_dict is None:
+            with self._lock:
+                aruco_dict = self._dictionaries.get(dict_id)
+                if aruco_dict is None:
+                    aruco_dict = aruco.getPredefinedDictionary(dict_id)
+                    self._dictionaries[dict_id] = aruco_dict
+        return aruco_dict
+
+    # Get the detector for a dictionary and optional DetectorParameters overrides
+    def get(self, dictionary=DEFAULT_DICTIONARY, params=None):
+        key = (resolve_dictionary_id(dictionary), _params_key(params))
+        detector = self._detectors.get(key)
+        if detector is None:
+            with self._lock:
+                detector = self._detectors.get(key)
+                if detector is None:
+                    detector = self._build(key[0], params)
+                    self._detectors[key] = detector
+        return detector
+
+    # A new detector instance, not shared with other callers
+    def create(self, dictionary=DEFAULT_DICTIONARY, params=None):
+        return self._build(resolve_dictionary_id(dictionary), params)
+
+    def _build(self, dict_id, params):
+        parameters = aruco.DetectorParameters()
+        for name, value in (params or {}).items():
+            if not hasattr(parameters, name):
+                raise ValueError(f"Unknown DetectorParameters field: {name}")
+            setattr(parameters, name, value)
+        return aruco.ArucoDetector(self.get_dictionary(dict_id), parameters)
+
+    def clear(self):
+        with self._lock:
+            self._detectors.clear()
+            self._dictionaries.clear()
+
+    def __len__(self):
+        return len(self._detectors)
+
+
+# Process-wide registry used by detect_markers
+default_registry = DetectorRegistry()
+
+
+def get_detector(dictionary=DEFAULT_DICTIONARY, params=None):
+    return default_registry.get(dictionary, params)
+
+
+# Fixed set of detector instances handed out to one thread at a time
+class DetectorPool:
+    def __init__(self, size, dictionary=DEFAULT_DICTIONARY, params=None, registry=None):
+        registry = registry or default_registry
+        self.size = size
+        self._free = queue.Queue()
+        for _ in range(size):
+            self._free.put(registry.create(dictionary, params))
+
+    # Borrow a detector for the duration of a with-block; waits while all are in use
+    @contextlib.contextmanager
+    def borrow(self):
+        detector = self._free.get()
+        try:
+            yield detector
+        finally:
+            self._free.put(detector)
+
+
+# Convert a frame to the single-channel image the detector expects
+def to_gray(frame):
+    if frame.ndim == 2:
+        return frame
+    if frame.shape[2] == 4:
+        return cv2.cvtColor(frame, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+
+
+# Function to detect ArUco markers in a given frame; errors are printed and give (None, None) unless
+# raise_errors is set (callers that count failures)
+def detect_markers(frame, dictionary=DEFAULT_DICTIONARY, params=None, detector=None, raise_errors=False):
+    try:
+        if detector is None:
+            detector = default_registry.get(dictionary, params)
+        corners, ids, rejected = detector.detectMarkers(to_gray(frame))  # Detect markers
+        return corners, ids
+    except Exception as e:
+        if raise_errors:
+            raise
+        print(f"Error detecting markers: {str(e)}")
+        return None, None
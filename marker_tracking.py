@@ -0,0 +1,187 @@
+"""Temporal marker tracking and optional pose estimation.
+
+MarkerTracker runs a full-frame detection only every `redetect_interval`
+frames or when a tracked marker is lost. In between it searches padded
+regions around the previous frame's corners, which is a fraction of the
+pixels when a few markers are in view.
+
+    tracker = MarkerTracker(redetect_interval=15)
+    calibration = CameraCalibration.load("camera.npz")  # optional
+    tracker = MarkerTracker(calibration=calibration, marker_length=0.05)
+    result = tracker.update(frame)
+    result.ids, result.corners, result.poses, result.full_detection
+"""
+
+import cv2
+import numpy as np
+
+from marker_detection import DEFAULT_DICTIONARY, get_detector, to_gray
+
+
+# Camera intrinsics for pose estimation
+class CameraCalibration:
+    def __init__(self, camera_matrix, dist_coeffs=None):
+        self.camera_matrix = np.asarray(camera_matrix, dtype=np.float64).reshape(3, 3)
+        if dist_coeffs is None:
+            dist_coeffs = np.zeros(5)
+        self.dist_coeffs = np.asarray(dist_coeffs, dtype=np.float64).ravel()
+
+    # Load from an .npz (camera_matrix/dist_coeffs or mtx/dist) or an OpenCV .yml/.yaml/.xml file
+    @classmethod
+    def load(cls, path):
+        if path.lower().endswith(".npz"):
+            data = np.load(path)
+            matrix = data["camera_matrix"] if "camera_matrix" in data else data["mtx"]
+            dist = data["dist_coeffs"] if "dist_coeffs" in data else data.get("dist")
+            return cls(matrix, dist)
+        storage = cv2.FileStorage(path, cv2.FILE_STORAGE_READ)
+        if not storage.isOpened():
+            raise IOError(f"Could not open calibration file: {path}")
+        try:
+            matrix = storage.getNode("camera_matrix").mat()
+            dist = storage.getNode("dist_coeffs").mat()
+        finally:
+            storage.release()
+        if matrix is None:
+            raise ValueError(f"No camera_matrix in calibration file: {path}")
+        return cls(matrix, dist)
+
+    def save(self, path):
+        np.savez(path, camera_matrix=self.camera_matrix, dist_coeffs=self.dist_coeffs)
+
+
+# Marker-frame 3D corners in the order detectMarkers returns them (top-left, clockwise)
+def marker_object_points(marker_length):
+    half = marker_length / 2.0
+    return np.array([[-half, half, 0], [half, half, 0], [half, -half, 0], [-half, -half, 0]], dtype=np.float64)
+
+
+# Pose of every detected marker: list of {"id", "rvec", "tvec"} in the units of marker_length
+def estimate_poses(corners, ids, marker_length, calibration):
+    poses = []
+    if ids is None:
+        return poses
+    object_points = marker_object_points(marker_length)
+    for marker_id, marker_corners in zip(ids.ravel(), corners):
+        image_points = marker_corners.reshape(4, 2).astype(np.float64)
+        ok, rvec, tvec = cv2.solvePnP(object_points, image_points, calibration.camera_matrix,
+                                      calibration.dist_coeffs, flags=cv2.SOLVEPNP_IPPE_SQUARE)
+        if ok:
+            poses.append({"id": int(marker_id), "rvec": rvec.ravel(), "tvec": tvec.ravel()})
+    return poses
+
+
+# Draw the axes of each pose onto the frame
+def draw_poses(frame, poses, calibration, marker_length):
+    for pose in poses:
+        cv2.drawFrameAxes(frame, calibration.camera_matrix, calibration.dist_coeffs,
+                          pose["rvec"], pose["tvec"], marker_length * 0.5)
+    return frame
+
+
+# Output of MarkerTracker.update
+class TrackResult:
+    __slots__ = ("corners", "ids", "poses", "full_detection")
+
+    def __init__(self, corners, ids, poses, full_detection):
+        self.corners = corners
+        self.ids = ids
+        self.poses = poses
+        self.full_detection = full_detection  # False when only the tracked regions were searched
+
+
+# Bounding box (x0, y0, x1, y1) of a marker's corners, grown by `pad` pixels and clipped to the frame
+def _padded_box(marker_corners, pad_fraction, min_pad, width, height):
+    points = marker_corners.reshape(4, 2)
+    x0, y0 = points.min(axis=0)
+    x1, y1 = points.max(axis=0)
+    pad = max(min_pad, pad_fraction * max(x1 - x0, y1 - y0))
+    return (max(0, int(x0 - pad)), max(0, int(y0 - pad)),
+            min(width, int(np.ceil(x1 + pad))), min(height, int(np.ceil(y1 + pad))))
+
+
+# True if a marker with the same id was already found at (nearly) the same place
+def _is_duplicate(marker_id, marker_corners, found_ids, found_corners):
+    center = marker_corners.reshape(4, 2).mean(axis=0)
+    for other_id, other_corners in zip(found_ids, found_corners):
+        if other_id == marker_id:
+            other = other_corners.reshape(4, 2)
+            if np.linalg.norm(other.mean(axis=0) - center) < 0.25 * np.ptp(other[:, 0]):
+                return True
+    return False
+
+
+# Tracks markers between frames, falling back to full-frame detection periodically or on loss
+class MarkerTracker:
+    def __init__(self, dictionary=DEFAULT_DICTIONARY, params=None, redetect_interval=10, padding=0.5,
+                 min_padding=16, calibration=None, marker_length=None):
+        self.detector = get_detector(dictionary, params)
+        # A tracked marker fills most of its search region, so smaller contours (noise, texture) can be
+        # rejected early: perimeter 4s in a region of side s * (1 + 2 * padding), halved for shrinking markers.
+        roi_params = dict(params or {})
+        roi_params.setdefault("minMarkerPerimeterRate", 2.0 / (1.0 + 2.0 * padding))
+        self.roi_detector = get_detector(dictionary, roi_params)
+        self.redetect_interval = max(1, redetect_interval)
+        self.padding = padding  # Search margin as a fraction of the marker's size
+        self.min_padding = min_padding  # ... but never less than this many pixels
+        self.calibration = calibration
+        self.marker_length = marker_length
+        self.frames_since_detection = 0
+        self.full_detections = 0
+        self.tracked_frames = 0
+        self._corners = ()
+        self._ids = None
+
+    def reset(self):
+        self._corners = ()
+        self._ids = None
+        self.frames_since_detection = 0
+
+    def _detect_full(self, frame):
+        corners, ids, rejected = self.detector.detectMarkers(to_gray(frame))
+        self.full_detections += 1
+        self.frames_since_detection = 0
+        return corners, ids
+
+    # Search only the padded regions around the previous corners; None if a track was lost
+    def _detect_tracked(self, frame):
+        height, width = frame.shape[:2]
+        boxes = [_padded_box(c, self.padding, self.min_padding, width, height) for c in self._corners]
+        found_corners = []
+        found_ids = []
+        for x0, y0, x1, y1 in boxes:  # Overlapping boxes are searched separately, merging would grow the area
+            corners, ids, rejected = self.roi_detector.detectMarkers(to_gray(frame[y0:y1, x0:x1]))
+            if ids is None:
+                continue
+            offset = np.array([x0, y0], dtype=np.float32)
+            for marker_corners, marker_id in zip(corners, ids.ravel().tolist()):
+                marker_corners = marker_corners + offset
+                if not _is_duplicate(marker_id, marker_corners, found_ids, found_corners):
+                    found_corners.append(marker_corners)
+                    found_ids.append(marker_id)
+        if len(found_ids) < len(self._ids):
+            return None  # Lost (or moved out of its search region)
+        self.tracked_frames += 1
+        self.frames_since_detection += 1
+        return tuple(found_corners), np.array(found_ids, dtype=np.int32).reshape(-1, 1)
+
+    # Process one frame and return a TrackResult
+    def update(self, frame):
+        result = None
+        full = self._ids is None or self.frames_since_detection + 1 >= self.redetect_interval
+        if not full:
+            result = self._detect_tracked(frame)
+        if result is None:
+            full = True
+            result = self._detect_full(frame)
+        self._corners, self._ids = result
+
+        poses = None
+        if self.calibration is not None and self.marker_length:
+            poses = estimate_poses(self._corners, self._ids, self.marker_length, self.calibration)
+        return TrackResult(self._corners, self._ids, poses, full)
+
+    # Share of frames that needed a full-frame detection
+    def full_detection_rate(self):
+        total = self.full_detections + self.tracked_frames
+        return self.full_detections / total if total else 0.0
@@ -0,0 +1,316 @@
+"""Per-pixel land cover classification of the data.zip band stack.
+
+Training points come from the class point files in data.zip (water.txt,
+trees.txt, low_vegetation.txt, built-up.txt; "row col" per line). The
+band vectors of all of them are gathered with a single fancy-indexing
+call on the (H, W, bands) cube. Three classifiers share a fit / predict
+interface:
+
+  mindist   minimum distance to the class means
+  gaussian  Gaussian maximum likelihood (full covariance per class)
+  knn       k nearest neighbours (majority vote, ties go to the nearest)
+
+predict_scene() classifies the scene in row tiles: each tile is
+converted to float32 in one reused buffer and classified with matrix
+products, so memory stays bounded by the tile size for any scene size
+(the cube may be a memmap).
+
+test_points.txt ("row col class") uses numeric class ids, and neither
+the file nor the rest of data.zip says which id is which class. Test
+accuracy is therefore only reported when the mapping is given
+(--test-classes); without it the test points are cross-tabulated
+against the predicted classes, which shows how the ids split over the
+classes without claiming an accuracy.
+
+    python pixel_classifier.py data.zip --method gaussian -o landcover.png
+    python pixel_classifier.py data.zip --test-classes 1=water,2=built-up,3=low_vegetation,4=trees
+"""
+
+import argparse
+import sys
+import time
+
+import cv2
+import numpy as np
+
+from band_stack import BandStack, read_member
+
+CLASS_NAMES = ("water", "trees", "low_vegetation", "built-up")  # Label i is CLASS_NAMES[i]
+CLASS_FILES = {name: f"{name}.txt" for name in CLASS_NAMES}
+CLASS_COLORS = {  # BGR, for the label map image
+    "water": (200, 90, 20),
+    "trees": (30, 110, 30),
+    "low_vegetation": (80, 210, 140),
+    "built-up": (60, 60, 200),
+}
+TEST_FILE = "test_points.txt"
+TILE_PIXELS = 1 << 16  # Pixels classified per tile in predict_scene
+METHODS = ("mindist", "gaussian", "knn")
+
+
+# Whitespace-separated integer table ("row col" or "row col class"); CRLF or LF
+def read_points(source, name, columns=2):
+    values = np.array(read_member(source, name).split(), dtype=np.int64)
+    if values.size % columns:
+        raise ValueError(f"{name}: expected {columns} values per line")
+    return values.reshape(-1, columns)
+
+
+# Band vectors and labels of all training points, gathered in one indexing call
+def gather_samples(cube, points_by_class, class_names=CLASS_NAMES):
+    points = [points_by_class[name] for name in class_names]
+    rows_cols = np.concatenate(points)
+    height, width = cube.shape[:2]
+    inside = (rows_cols[:, 0] >= 0) & (rows_cols[:, 0] < height) & (rows_cols[:, 1] >= 0) & (rows_cols[:, 1] < width)
+    if not inside.all():
+        raise ValueError(f"{np.count_nonzero(~inside)} training points lie outside the {height}x{width} scene")
+    samples = np.asarray(cube[rows_cols[:, 0], rows_cols[:, 1]], dtype=np.float32)
+    labels = np.repeat(np.arange(len(points)), [len(p) for p in points])
+    return samples, labels
+
+
+def load_training_samples(source, cube):
+    points = {name: read_points(source, filename) for name, filename in CLASS_FILES.items()}
+    return gather_samples(cube, points)
+
+
+# "1=water,2=built-up,..." -> {1: "water", 2: "built-up", ...}
+def parse_class_ids(text):
+    class_ids = {}
+    for item in text.split(","):
+        class_id, _, name = item.partition("=")
+        if name.strip() not in CLASS_NAMES:
+            raise ValueError(f"Unknown class in --test-classes: {name.strip()!r} "
+                             f"(expected one of {', '.join(CLASS_NAMES)})")
+        class_ids[int(class_id)] = name.strip()
+    return class_ids
+
+
+# Test points as (samples, numeric class ids as in the file)
+def load_test_points(source, cube):
+    table = read_points(source, TEST_FILE, columns=3)
+    return np.asarray(cube[table[:, 0], table[:, 1]], dtype=np.float32), table[:, 2]
+
+
+# Test points as (samples, labels) in CLASS_NAMES label space; class_ids maps the file's ids to class names
+def load_test_samples(source, cube, class_ids):
+    samples, ids = load_test_points(source, cube)
+    unknown = set(np.unique(ids).tolist()) - set(class_ids)
+    if unknown:
+        raise ValueError(f"{TEST_FILE} has class ids without a mapping: {sorted(unknown)}")
+    lookup = np.zeros(max(class_ids) + 1, dtype=np.int64)
+    for class_id, name in class_ids.items():
+        lookup[class_id] = CLASS_NAMES.index(name)
+    return samples, lookup[ids]
+
+
+# Minimum distance to class means: argmin ||x - m||^2 = argmax (x . m - ||m||^2 / 2)
+class MinimumDistanceClassifier:
+    name = "mindist"
+
+    def fit(self, samples, labels):
+        classes = np.unique(labels)
+        self.means = np.stack([samples[labels == c].mean(axis=0) for c in classes]).astype(np.float32)
+        self.bias = -0.5 * np.einsum("ij,ij->i", self.means, self.means)
+        self.classes = classes
+        return self
+
+    def predict(self, samples):
+        scores = samples @ self.means.T
+        scores += self.bias
+        return self.classes[scores.argmax(axis=1)]
+
+
+# Gaussian maximum likelihood with one full covariance per class
+class GaussianMLClassifier:
+    name = "gaussian"
+
+    def __init__(self, regularization=1e-6, priors=None):
+        self.regularization = regularization  # Relative ridge on the covariance diagonal, keeps it invertible
+        self.priors = priors
+
+    def fit(self, samples, labels):
+        self.classes = np.unique(labels)
+        data = samples.astype(np.float64)
+        self.means = []
+        self.whiteners = []  # W with W^T W = inverse covariance, so the Mahalanobis distance is ||W (x - m)||^2
+        self.constants = []
+        for i, c in enumerate(self.classes):
+            members = data[labels == c]
+            mean = members.mean(axis=0)
+            cov = np.cov(members, rowvar=False)
+            cov += np.eye(len(mean)) * self.regularization * max(np.trace(cov) / len(mean), 1.0)
+            chol = np.linalg.cholesky(cov)
+            prior = self.priors[i] if self.priors is not None else len(members) / len(data)
+            self.means.append(mean.astype(np.float32))
+            self.whiteners.append(np.linalg.inv(chol).T.astype(np.float32))
+            self.constants.append(np.log(prior) - np.log(np.diag(chol)).sum())
+        return self
+
+    def predict(self, samples):
+        scores = np.empty((len(samples), len(self.classes)), dtype=np.float32)
+        centered = np.empty_like(samples, dtype=np.float32)
+        for i, (mean, whitener, constant) in enumerate(zip(self.means, self.whiteners, self.constants)):
+            np.subtract(samples, mean, out=centered)
+            projected = centered @ whitener
+            scores[:, i] = constant - 0.5 * np.einsum("ij,ij->i", projected, projected)
+        return self.classes[scores.argmax(axis=1)]
+
+
+# k nearest neighbours by brute force: distances are one matrix product per block of samples.
+# Neighbours are picked with k argmin passes over a cache-sized block, which beats argpartition
+# for small k and yields them already sorted by distance.
+class KNNClassifier:
+    name = "knn"
+    block_rows = 4096  # Samples per distance block (block_rows x training points float32 stays in cache)
+
+    def __init__(self, k=5):
+        self.k = k
+
+    def fit(self, samples, labels):
+        self.offset = samples.mean(axis=0, dtype=np.float64).astype(np.float32)  # Centering keeps float32 distances precise
+        self.samples = samples.astype(np.float32) - self.offset
+        self.norms = np.einsum("ij,ij->i", self.samples, self.samples)
+        self.classes, self.labels = np.unique(labels, return_inverse=True)
+        return self
+
+    def predict(self, samples):
+        k = min(self.k, len(self.samples))
+        n_classes = len(self.classes)
+        predicted = np.empty(len(samples), dtype=np.int64)
+        centered = np.empty((min(self.block_rows, len(samples)), samples.shape[1]), dtype=np.float32)
+        nearest = np.empty((len(centered), k), dtype=np.intp)
+        for start in range(0, len(samples), self.block_rows):
+            block = samples[start:start + self.block_rows]
+            rows = np.arange(len(block))
+            np.subtract(block, self.offset, out=centered[:len(block)])
+            # ||x - s||^2 up to the per-row constant ||x||^2, which does not change the ranking
+            distances = centered[:len(block)] @ self.samples.T
+            distances *= -2.0
+            distances += self.norms
+            for j in range(k):
+                nearest[:len(block), j] = closest = distances.argmin(axis=1)
+                distances[rows, closest] = np.inf
+            neighbour_labels = self.labels[nearest[:len(block)]]
+            # Votes per class via one bincount; half a vote extra for the closest neighbour breaks ties
+            votes = np.bincount((neighbour_labels + n_classes * rows[:, None]).ravel(),
+                                minlength=n_classes * len(block)).reshape(len(block), n_classes) * 2
+            votes[rows, neighbour_labels[:, 0]] += 1
+            predicted[start:start + len(block)] = votes.argmax(axis=1)
+        return self.classes[predicted]
+
+
+def make_classifier(method, k=5):
+    if method == "mindist":
+        return MinimumDistanceClassifier()
+    if method == "gaussian":
+        return GaussianMLClassifier()
+    if method == "knn":
+        return KNNClassifier(k)
+    raise ValueError(f"Unknown method: {method} (expected one of {', '.join(METHODS)})")
+
+
+# Classify every pixel of an (H, W, bands) cube in row tiles; returns an (H, W) uint8 label map
+def predict_scene(cube, classifier, tile_pixels=TILE_PIXELS, out=None):
+    height, width, bands = cube.shape
+    if out is None:
+        out = np.empty((height, width), dtype=np.uint8)
+    rows = max(1, tile_pixels // width)
+    buffer = np.empty((rows * width, bands), dtype=np.float32)  # Reused float32 copy of the current tile
+    for y in range(0, height, rows):
+        tile = cube[y:y + rows]
+        samples = buffer[:tile.shape[0] * width]
+        np.copyto(samples.reshape(tile.shape), tile, casting="unsafe")
+        out[y:y + rows] = classifier.predict(samples).reshape(tile.shape[:2])
+    return out
+
+
+# Overall accuracy, kappa, per-class producer's / user's accuracy and the confusion matrix
+def accuracy_report(true_labels, predicted, class_names=CLASS_NAMES):
+    n = len(class_names)
+    confusion = np.bincount(true_labels * n + predicted, minlength=n * n).reshape(n, n)  # Rows: truth
+    total = confusion.sum()
+    correct = np.trace(confusion)
+    expected = (confusion.sum(axis=0) * confusion.sum(axis=1)).sum() / max(1, total) ** 2
+    accuracy = correct / max(1, total)
+    kappa = (accuracy - expected) / (1 - expected) if expected < 1 else 1.0
+    with np.errstate(invalid="ignore", divide="ignore"):
+        producers = np.diag(confusion) / confusion.sum(axis=1)
+        users = np.diag(confusion) / confusion.sum(axis=0)
+    return {"accuracy": float(accuracy), "kappa": float(kappa), "samples": int(total), "confusion": confusion,
+            "producers_accuracy": dict(zip(class_names, producers.tolist())),
+            "users_accuracy": dict(zip(class_names, users.tolist()))}
+
+
+def format_report(report, class_names=CLASS_NAMES):
+    width = max(len(name) for name in class_names)
+    lines = [f"overall accuracy {100 * report['accuracy']:.1f}% on {report['samples']} test points, "
+             f"kappa {report['kappa']:.3f}",
+             f"{'truth/predicted':<{width}}  " + " ".join(f"{name[:8]:>8}" for name in class_names)
+             + "  producer  user"]
+    for name, row in zip(class_names, report["confusion"]):
+        producer = report["producers_accuracy"][name]
+        user = report["users_accuracy"][name]
+        lines.append(f"{name:<{width}}  " + " ".join(f"{v:8d}" for v in row)
+                     + f"  {100 * producer:7.1f}% {100 * user:5.1f}%")
+    return "\n".join(lines)
+
+
+# Counts of every test id predicted as every class, for test files without a known id -> class mapping
+def format_crosstab(test_ids, predicted, class_names=CLASS_NAMES):
+    ids = np.unique(test_ids)
+    width = max(len(name) for name in class_names)
+    lines = [f"{len(test_ids)} test points by file class id (no mapping given, no accuracy reported)",
+             f"{'id/predicted':<12}  " + " ".join(f"{name[:width]:>{width}}" for name in class_names)]
+    for class_id in ids:
+        counts = np.bincount(predicted[test_ids == class_id], minlength=len(class_names))
+        lines.append(f"{int(class_id):<12}  " + " ".join(f"{v:>{width}d}" for v in counts))
+    return "\n".join(lines)
+
+
+# Label map as a BGR image
+def colorize(labels, class_names=CLASS_NAMES):
+    palette = np.array([CLASS_COLORS.get(name, (0, 0, 0)) for name in class_names], dtype=np.uint8)
+    return palette[labels]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("source", nargs="?", default="data.zip", help="data.zip or the extracted data directory")
+    parser.add_argument("--method", choices=METHODS, default="gaussian")
+    parser.add_argument("-k", type=int, default=5, help="neighbours for knn")
+    parser.add_argument("-o", "--output", help="write the colorized label map here")
+    parser.add_argument("--test-classes", help="class of each test_points.txt id, e.g. 1=water,2=built-up,... "
+                                               "(reports test accuracy; unknown by default)")
+    args = parser.parse_args()
+
+    try:
+        cube = BandStack.open(args.source).cube
+        samples, labels = load_training_samples(args.source, cube)
+        start = time.perf_counter()
+        classifier = make_classifier(args.method, args.k).fit(samples, labels)
+        fit_time = time.perf_counter() - start
+        start = time.perf_counter()
+        label_map = predict_scene(cube, classifier)
+        predict_time = time.perf_counter() - start
+        if args.test_classes:
+            test_samples, test_labels = load_test_samples(args.source, cube, parse_class_ids(args.test_classes))
+            test_output = format_report(accuracy_report(test_labels, classifier.predict(test_samples)))
+        else:
+            test_samples, test_ids = load_test_points(args.source, cube)
+            test_output = format_crosstab(test_ids, classifier.predict(test_samples))
+    except (IOError, KeyError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+    height, width = label_map.shape
+    print(f"{args.method}: trained on {len(samples)} points in {1000 * fit_time:.1f} ms, "
+          f"classified {height}x{width} pixels in {1000 * predict_time:.1f} ms")
+    print(test_output)
+    if args.output:
+        cv2.imwrite(args.output, colorize(label_map))
+        print(f"Label map saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
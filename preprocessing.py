@@ -0,0 +1,196 @@
+"""Normalization and standardization of image data.
+
+Statistics are gathered in a single streaming pass. RunningStats takes
+chunks one at a time (an image, a batch of images, row strips of a
+memmap) and merges each chunk's count, mean and sum of squared
+deviations into the running totals (Chan et al.), so dataset-wide mean
+and std never need the whole dataset in memory. Statistics are either
+global or per channel (channels last).
+
+normalize() and standardize() write straight into a float32 (or
+float16) buffer: either one the caller passes in as `out` (reuse it
+across images, or pass the input itself for in-place work on float
+data) or a single new array. No float64 intermediates are created.
+
+    stats = RunningStats(per_channel=True)
+    for batch in batches:                  # (N, H, W, C) or (H, W, C)
+        stats.update(batch)
+    x = standardize(image, stats.mean, stats.std, dtype=np.float16)
+"""
+
+import cv2
+import numpy as np
+
+STRIP_PIXELS = 1 << 18  # Pixels per block for float paths (float16 casts, float statistics)
+OUTPUT_DTYPES = (np.float32, np.float16)
+
+
+# Channel count of an image or batch with channels last; 2D arrays are single-channel images
+def _channels(array):
+    return 1 if array.ndim == 2 else array.shape[-1]
+
+
+# Count, mean and M2 (sum of squared deviations) per channel of one chunk, in one pass
+def chunk_moments(chunk):
+    chunk = np.asarray(chunk)
+    channels = _channels(chunk)
+    pixels = chunk.reshape(-1, channels)
+    count = pixels.shape[0]
+    if count == 0:
+        return 0, np.zeros(channels), np.zeros(channels)
+    if np.issubdtype(chunk.dtype, np.integer) and channels <= 4:
+        # Integer data: OpenCV sums in double in one pass, exact for image bit depths
+        mean, std = cv2.meanStdDev(np.ascontiguousarray(pixels).reshape(count, 1, channels))
+        mean = mean.ravel()
+        return count, mean, std.ravel() ** 2 * count
+    # Float data (or many channels): merge small float64 blocks so nothing chunk-sized is upcast
+    total = (0, np.zeros(channels), np.zeros(channels))
+    for start in range(0, count, STRIP_PIXELS):
+        block = pixels[start:start + STRIP_PIXELS].astype(np.float64)
+        mean = block.mean(axis=0)
+        block -= mean
+        total = merge_moments(total, (block.shape[0], mean, np.einsum("ij,ij->j", block, block)))
+    return total
+
+
+# Combine two (count, mean, M2) triples (Chan et al. parallel variance)
+def merge_moments(a, b):
+    count_a, mean_a, m2_a = a
+    count_b, mean_b, m2_b = b
+    if count_a == 0:
+        return b
+    if count_b == 0:
+        return a
+    count = count_a + count_b
+    delta = mean_b - mean_a
+    mean = mean_a + delta * (count_b / count)
+    m2 = m2_a + m2_b + delta ** 2 * (count_a * count_b / count)
+    return count, mean, m2
+
+
+# Streaming mean / variance over chunks of images, per channel or global
+class RunningStats:
+    def __init__(self, per_channel=False):
+        self.per_channel = per_channel
+        self.count = 0  # Pixels per channel
+        self._mean = None
+        self._m2 = None
+
+    def update(self, chunk):
+        count, mean, m2 = chunk_moments(chunk)
+        if count == 0:
+            return self
+        if self._mean is not None and mean.shape != self._mean.shape:
+            raise ValueError(f"Chunk has {mean.size} channels, earlier chunks had {self._mean.size}")
+        if self._mean is None:
+            self.count, self._mean, self._m2 = count, mean, m2
+        else:
+            self.count, self._mean, self._m2 = merge_moments((self.count, self._mean, self._m2), (count, mean, m2))
+        return self
+
+    def merge(self, other):
+        if other._mean is not None:
+            if self._mean is None:
+                self.count, self._mean, self._m2 = other.count, other._mean.copy(), other._m2.copy()
+            else:
+                self.count, self._mean, self._m2 = merge_moments((self.count, self._mean, self._m2),
+                                                                 (other.count, other._mean, other._m2))
+        return self
+
+    # (count, mean, M2) per channel, or folded over channels for global statistics
+    def _moments(self):
+        if self._mean is None:
+            raise ValueError("No data has been added")
+        if self.per_channel:
+            return self.count, self._mean, self._m2
+        total = (0, 0.0, 0.0)
+        for mean, m2 in zip(self._mean, self._m2):
+            total = merge_moments(total, (self.count, mean, m2))
+        return total
+
+    @property
+    def mean(self):
+        return self._moments()[1]
+
+    @property
+    def var(self):
+        count, _, m2 = self._moments()
+        return m2 / count
+
+    @property
+    def std(self):
+        return np.sqrt(self.var)
+
+
+# Mean and std of an array (or an iterable of chunks) in one pass; arrays are read in row strips,
+# so memory-mapped inputs are streamed rather than loaded
+def compute_stats(data, per_channel=False, chunk_rows=256):
+    stats = RunningStats(per_channel)
+    chunks = data
+    if isinstance(data, np.ndarray):
+        chunks = (data[start:start + chunk_rows] for start in range(0, max(1, len(data)), chunk_rows))
+    for chunk in chunks:
+        stats.update(chunk)
+    return stats.mean, stats.std
+
+
+def _output(image, dtype, out):
+    dtype = np.dtype(dtype)
+    if dtype not in [np.dtype(d) for d in OUTPUT_DTYPES]:
+        raise ValueError(f"Unsupported output dtype {dtype} (expected float32 or float16)")
+    if out is None:
+        return np.empty(image.shape, dtype=dtype)
+    if out.shape != image.shape:
+        raise ValueError(f"out has shape {out.shape}, expected {image.shape}")
+    return out
+
+
+# out = image * scale + offset, computed in float32. float16 results go through a small float32 strip buffer,
+# because numpy's float16 arithmetic is slow and a full float32 temporary would double the memory.
+def _affine(image, scale, offset, out):
+    scale = np.asarray(scale, dtype=np.float32)
+    offset = np.asarray(offset, dtype=np.float32)
+    if out.dtype == np.float32:
+        np.multiply(image, scale, out=out)
+        if offset.any():
+            np.add(out, offset, out=out)
+        return out
+    rows = max(1, STRIP_PIXELS // max(1, image[:1].size))
+    scratch = np.empty((min(rows, len(image)),) + image.shape[1:], dtype=np.float32)
+    for start in range(0, len(image), rows):
+        block = scratch[:len(image[start:start + rows])]
+        np.multiply(image[start:start + rows], scale, out=block)
+        np.add(block, offset, out=block)
+        out[start:start + rows] = block
+    return out
+
+
+# Scale pixel values into [0, 1]; `out` may be a preallocated buffer or the (float) input itself
+def normalize(image, max_value=255.0, dtype=np.float32, out=None):
+    out = _output(image, dtype, out)
+    return _affine(image, 1.0 / max_value, 0.0, out)
+
+
+# (image - mean) / std with global or per-channel statistics; computed from the image when not given
+def standardize(image, mean=None, std=None, dtype=np.float32, out=None):
+    if mean is None or std is None:
+        mean, std = compute_stats(image)
+    std = np.where(np.asarray(std) > 0, std, 1.0)  # Constant images stay at zero instead of dividing by zero
+    out = _output(image, dtype, out)
+    return _affine(image, 1.0 / std, -np.asarray(mean) / std, out)
+
+
+# Standardized image as uint8 for previews (127 + 127 * z, saturated), computed from the source pixels
+def standardized_to_uint8(image, mean, std, out=None):
+    std = np.where(np.asarray(std) > 0, std, 1.0)
+    alpha = 127.0 / std
+    beta = 127.0 - np.asarray(mean) * alpha
+    if np.ndim(alpha) == 0:
+        return cv2.addWeighted(image, float(alpha), image, 0.0, float(beta), dst=out, dtype=cv2.CV_8U)
+    scaled = _affine(image, alpha, beta, np.empty(image.shape, dtype=np.float32))
+    if out is None:
+        out = np.empty(image.shape, dtype=np.uint8)
+    np.clip(scaled, 0, 255, out=scaled)
+    np.rint(scaled, out=scaled)  # Round like cv2.addWeighted does for global statistics
+    np.copyto(out, scaled, casting="unsafe")
+    return out
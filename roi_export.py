@@ -0,0 +1,102 @@
+"""Export of ROI pixel data (raw, normalized, standardized) for training jobs.
+
+Formats:
+
+  npy   one .npy file per array (processed_roi.npy, processed_normalized.npy,
+        processed_standardized.npy). Load with np.load(path, mmap_mode="r").
+  raw   a single processed_data.bin plus processed_data.json describing it:
+
+            {"format": "roi-raw", "version": 1, "byte_order": "little",
+             "arrays": {"roi": {"dtype": "|u1", "shape": [h, w, 3], "offset": 0}, ...}}
+
+        dtype is a numpy type string with explicit byte order ("<f8", "|u1").
+
+        Every array is C-ordered and starts at a 64-byte aligned offset, so
+        np.memmap(bin, dtype, "r", offset, shape) maps it without copying.
+        load_roi_data() does exactly that.
+  text  the old processed_data.txt layout (a size line followed by every value
+        space-separated, per array). Slow and large; kept for old tooling.
+"""
+
+import json
+import os
+import sys
+
+import numpy as np
+
+EXPORT_FORMATS = ("npy", "raw", "text")
+ALIGNMENT = 64
+RAW_FORMAT = "roi-raw"
+RAW_VERSION = 1
+
+
+def _aligned(offset):
+    return (offset + ALIGNMENT - 1) // ALIGNMENT * ALIGNMENT
+
+
+# Write every array as <prefix>_<name>.npy
+def save_npy(save_path, arrays, prefix="processed"):
+    paths = []
+    for name, array in arrays.items():
+        path = os.path.join(save_path, f"{prefix}_{name}.npy")
+        np.save(path, np.ascontiguousarray(array))
+        paths.append(path)
+    return paths
+
+
+# Write all arrays into one aligned binary file with a JSON header next to it
+def save_raw(save_path, arrays, stem="processed_data"):
+    bin_path = os.path.join(save_path, f"{stem}.bin")
+    header_path = os.path.join(save_path, f"{stem}.json")
+    header = {"format": RAW_FORMAT, "version": RAW_VERSION, "byte_order": sys.byteorder, "arrays": {}}
+    offset = 0
+    with open(bin_path, "wb") as file:
+        for name, array in arrays.items():
+            array = np.ascontiguousarray(array)
+            offset = _aligned(offset)
+            file.seek(offset)
+            file.write(memoryview(array).cast("B"))  # Written straight from the array buffer
+            header["arrays"][name] = {"dtype": array.dtype.str, "shape": list(array.shape), "offset": offset}
+            offset += array.nbytes
+    with open(header_path, "w") as file:
+        json.dump(header, file, indent=2)
+    return [bin_path, header_path]
+
+
+# The old processed_data.txt writer
+def save_text(save_path, arrays, filename="processed_data.txt"):
+    labels = {"roi": "ROI", "normalized": "Normalized", "standardized": "Standardized"}
+    path = os.path.join(save_path, filename)
+    with open(path, "w") as file:
+        for name, array in arrays.items():
+            file.write(f"{labels.get(name, name)}: {array.size}\n")
+            file.write(" ".join(map(str, array.flatten())) + "\n")
+    return [path]
+
+
+# Save the ROI arrays in one of EXPORT_FORMATS and return the written paths
+def save_roi_data(save_path, arrays, fmt="npy"):
+    if fmt == "npy":
+        return save_npy(save_path, arrays)
+    if fmt == "raw":
+        return save_raw(save_path, arrays)
+    if fmt == "text":
+        return save_text(save_path, arrays)
+    raise ValueError(f"Unknown export format: {fmt} (expected one of {', '.join(EXPORT_FORMATS)})")
+
+
+# Memory-map the arrays of a raw export (path to the .json header or the .bin file), zero copy
+def load_roi_data(path, mode="r"):
+    stem = os.path.splitext(path)[0]
+    with open(stem + ".json") as file:
+        header = json.load(file)
+    if header.get("format") != RAW_FORMAT:
+        raise ValueError(f"Not a {RAW_FORMAT} header: {stem}.json")
+    arrays = {}
+    for name, info in header["arrays"].items():
+        shape = tuple(info["shape"])
+        if 0 in shape:
+            arrays[name] = np.empty(shape, dtype=info["dtype"])  # np.memmap cannot map zero bytes
+        else:
+            arrays[name] = np.memmap(stem + ".bin", dtype=info["dtype"], mode=mode, offset=info["offset"], shape=shape)
+    return arrays
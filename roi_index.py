@@ -0,0 +1,335 @@
+"""Per-ROI feature summaries and a columnar index for dataset QA and near-duplicate search.
+
+For every ROI the index keeps:
+
+    hist    per-channel histogram, HIST_BINS bins per channel, each channel summing to 1 (float16)
+    mean    per-channel mean (float32)
+    std     per-channel standard deviation (float32)
+    phash   64-bit perceptual hash: DCT of the 32x32 grayscale ROI, the 8x8 lowest frequencies
+            compared with their median (uint64)
+    roi     x, y, w, h in the source image (int32)
+    source  / label  ids into the string tables of index.json (int32)
+
+Features are computed in batches: one cv2.calcHist per channel and ROI
+(faster than any pure NumPy histogram), mean and std derived from the
+256-bin histograms for the whole batch at once, and the DCTs of the
+whole batch as two matrix products. The index is a directory with one
+.npy file per column plus index.json, memory-mapped on load:
+
+    index/
+      index.json    {"format": "roi-index", "version": 1, "count": n, "hist_bins": 32,
+                     "sources": [...], "labels": [...]}
+      hist.npy  mean.npy  std.npy  phash.npy  roi.npy  source.npy  label.npy
+
+Queries use the hash column: nearest() scans all hashes with
+np.bitwise_count (about a millisecond for 100k ROIs), duplicate_pairs()
+finds every pair within a Hamming distance through exact-match buckets
+on hash blocks (pigeonhole principle) instead of comparing all pairs.
+
+    python roi_index.py build images/ -m rois.csv -o roi_index/
+    python roi_index.py dups roi_index/ --max-distance 4
+    python roi_index.py query roi_index/ some_crop.png -k 5
+"""
+
+import argparse
+import json
+import os
+import sys
+import time
+
+import cv2
+import numpy as np
+
+INDEX_FORMAT = "roi-index"
+INDEX_VERSION = 1
+HIST_BINS = 32
+HASH_SIZE = 32  # Side of the grayscale image the DCT is taken of
+HASH_BITS = 8  # Side of the low-frequency block that makes the 64-bit hash
+COLUMNS = ("hist", "mean", "std", "phash", "roi", "source", "label")
+BATCH_SIZE = 1024
+
+
+# Orthonormal DCT-II matrix, so dct(x) = D @ x @ D.T
+def _dct_matrix(n):
+    k = np.arange(n)[:, None]
+    matrix = np.cos(np.pi * (2 * np.arange(n)[None, :] + 1) * k / (2 * n)) * np.sqrt(2.0 / n)
+    matrix[0] /= np.sqrt(2.0)
+    return matrix.astype(np.float32)
+
+
+DCT_MATRIX = _dct_matrix(HASH_SIZE)
+_BIT_WEIGHTS = np.uint64(1) << np.arange(64, dtype=np.uint64)
+
+
+# Grayscale view of a BGR, BGRA or single-channel ROI
+def _gray(roi):
+    if roi.ndim == 2:
+        return roi
+    if roi.shape[2] == 4:
+        return cv2.cvtColor(roi, cv2.COLOR_BGRA2GRAY)
+    return cv2.cvtColor(roi, cv2.COLOR_BGR2GRAY)
+
+
+# 64-bit perceptual hashes of a stack of HASH_SIZE x HASH_SIZE grayscale images, shape (n,) uint64
+def phash_batch(small):
+    coefficients = DCT_MATRIX @ small.astype(np.float32) @ DCT_MATRIX.T  # Batched 2-D DCT
+    low = coefficients[:, :HASH_BITS, :HASH_BITS].reshape(len(small), -1)
+    median = np.median(low[:, 1:], axis=1, keepdims=True)  # The DC term only reflects brightness
+    bits = (low > median).astype(np.uint64)
+    return (bits * _BIT_WEIGHTS).sum(axis=1, dtype=np.uint64)
+
+
+# Features of a list of uint8 ROIs (any sizes; 1, 3 or 4 channels, the first 3 are used)
+def compute_features(rois, bins=HIST_BINS):
+    count = len(rois)
+    counts = np.zeros((count, 3, 256), dtype=np.float32)
+    small = np.empty((count, HASH_SIZE, HASH_SIZE), dtype=np.uint8)
+    for i, roi in enumerate(rois):
+        if roi.dtype != np.uint8:
+            raise ValueError(f"ROI {i} is {roi.dtype}, expected uint8")
+        if roi.size == 0:
+            raise ValueError(f"ROI {i} is empty")
+        channels = 1 if roi.ndim == 2 else min(3, roi.shape[2])
+        for c in range(channels):
+            counts[i, c] = cv2.calcHist([roi], [c], None, [256], [0, 256]).ravel()
+        if channels == 1:
+            counts[i, 1:] = counts[i, 0]  # Gray ROIs get the same histogram in every channel
+        small[i] = cv2.resize(_gray(roi), (HASH_SIZE, HASH_SIZE), interpolation=cv2.INTER_AREA)
+
+    # Exact mean / std of every channel from the 256-bin counts, for the whole batch at once
+    pixels = counts.sum(axis=2, keepdims=True)
+    values = np.arange(256, dtype=np.float64)
+    mean = (counts @ values) / pixels[..., 0]
+    var = (counts @ (values * values)) / pixels[..., 0] - mean * mean
+    hist = counts.reshape(count, 3, bins, 256 // bins).sum(axis=3) / pixels
+    return {"hist": hist.reshape(count, 3 * bins).astype(np.float16), "mean": mean.astype(np.float32),
+            "std": np.sqrt(np.maximum(var, 0.0)).astype(np.float32), "phash": phash_batch(small)}
+
+
+# Feature summary of one ROI as plain Python values (e.g. for a JSON sidecar)
+def describe(roi):
+    features = compute_features([roi])
+    return {"mean": features["mean"][0].tolist(), "std": features["std"][0].tolist(),
+            "phash": f"{int(features['phash'][0]):016x}",
+            "hist": [round(float(v), 5) for v in features["hist"][0]], "hist_bins": HIST_BINS}
+
+
+# Hamming distances between one 64-bit hash and an array of hashes
+def hamming(hashes, query):
+    return np.bitwise_count(np.bitwise_xor(hashes, np.uint64(query)))
+
+
+# Collects features batch by batch, then writes the columnar index
+class RoiIndexWriter:
+    def __init__(self, bins=HIST_BINS):
+        self.bins = bins
+        self.columns = {name: [] for name in COLUMNS}
+        self.sources = {}  # string -> id
+        self.labels = {}
+        self.count = 0
+
+    def _string_id(self, table, value):
+        return table.setdefault(value, len(table))
+
+    # Add ROIs of one source image: rois are (x, y, w, h) boxes of image, labels one per box
+    def add_image(self, image, boxes, source="", labels=None):
+        labels = labels or [""] * len(boxes)
+        for start in range(0, len(boxes), BATCH_SIZE):
+            batch = boxes[start:start + BATCH_SIZE]
+            crops = [image[y:y + h, x:x + w] for x, y, w, h in batch]
+            self.add(crops, batch, [source] * len(batch), labels[start:start + BATCH_SIZE])
+
+    # Add already cropped ROIs
+    def add(self, crops, boxes=None, sources=None, labels=None):
+        if not crops:
+            return
+        features = compute_features(crops, self.bins)
+        for name in ("hist", "mean", "std", "phash"):
+            self.columns[name].append(features[name])
+        if boxes is None:
+            boxes = [(0, 0, crop.shape[1], crop.shape[0]) for crop in crops]
+        self.columns["roi"].append(np.asarray(boxes, dtype=np.int32).reshape(-1, 4))
+        sources = sources or [""] * len(crops)
+        labels = labels or [""] * len(crops)
+        self.columns["source"].append(np.array([self._string_id(self.sources, s) for s in sources], dtype=np.int32))
+        self.columns["label"].append(np.array([self._string_id(self.labels, s) for s in labels], dtype=np.int32))
+        self.count += len(crops)
+
+    def save(self, directory):
+        os.makedirs(directory, exist_ok=True)
+        empty = {"hist": (0, 3 * self.bins), "mean": (0, 3), "std": (0, 3), "roi": (0, 4)}
+        dtypes = {"hist": np.float16, "mean": np.float32, "std": np.float32, "phash": np.uint64, "roi": np.int32,
+                  "source": np.int32, "label": np.int32}
+        for name in COLUMNS:
+            parts = self.columns[name]
+            array = np.concatenate(parts) if parts else np.zeros(empty.get(name, (0,)), dtype=dtypes[name])
+            tmp = os.path.join(directory, f"{name}.tmp.npy")
+            np.save(tmp, array)
+            os.replace(tmp, os.path.join(directory, f"{name}.npy"))
+        header = {"format": INDEX_FORMAT, "version": INDEX_VERSION, "count": self.count, "hist_bins": self.bins,
+                  "sources": list(self.sources), "labels": list(self.labels)}
+        with open(os.path.join(directory, "index.json"), "w") as file:
+            json.dump(header, file)  # Written last: a directory with index.json is complete
+        return directory
+
+
+# A saved index, columns memory-mapped
+class RoiIndex:
+    def __init__(self, directory, mmap=True):
+        with open(os.path.join(directory, "index.json")) as file:
+            header = json.load(file)
+        if header.get("format") != INDEX_FORMAT or header.get("version") != INDEX_VERSION:
+            raise ValueError(f"Not a {INDEX_FORMAT} v{INDEX_VERSION} directory: {directory}")
+        self.directory = directory
+        self.bins = header["hist_bins"]
+        self.sources = header["sources"]
+        self.labels = header["labels"]
+        for name in COLUMNS:
+            setattr(self, name, np.load(os.path.join(directory, f"{name}.npy"), mmap_mode="r" if mmap else None))
+        self.phash = np.array(self.phash)  # Scanned by every query: copied into memory, not read through the mmap
+
+    def __len__(self):
+        return len(self.phash)
+
+    # Row i as a dict
+    def record(self, i):
+        x, y, w, h = (int(v) for v in self.roi[i])
+        return {"index": int(i), "source": self.sources[self.source[i]], "label": self.labels[self.label[i]],
+                "x": x, "y": y, "w": w, "h": h, "phash": f"{int(self.phash[i]):016x}",
+                "mean": [round(float(v), 2) for v in self.mean[i]], "std": [round(float(v), 2) for v in self.std[i]]}
+
+    # The k entries closest to a hash, (indices, distances) sorted by distance, optionally within max_distance
+    def nearest(self, phash, k=10, max_distance=None):
+        distances = hamming(self.phash, phash)
+        if max_distance is not None:
+            candidates = np.flatnonzero(distances <= max_distance)
+        elif k < len(distances):
+            candidates = np.argpartition(distances, k)[:k]
+        else:
+            candidates = np.arange(len(distances))
+        order = np.lexsort((candidates, distances[candidates]))[:k]
+        return candidates[order], distances[candidates[order]]
+
+    # Entries with the most similar histograms (L1 distance), (indices, distances)
+    def nearest_histograms(self, hist, k=10):
+        distances = np.abs(self.hist.astype(np.float32) - np.asarray(hist, dtype=np.float32)).sum(axis=1)
+        k = min(k, len(distances))
+        candidates = np.argpartition(distances, k - 1)[:k] if k < len(distances) else np.arange(len(distances))
+        order = np.argsort(distances[candidates], kind="stable")
+        return candidates[order], distances[candidates[order]]
+
+    # Nearest entries to an image (an ROI crop): by hash, ties broken by histogram distance
+    def query(self, image, k=10):
+        features = compute_features([image], self.bins)
+        indices, distances = self.nearest(features["phash"][0], k=4 * k)
+        hist = np.abs(self.hist[indices].astype(np.float32) - features["hist"][0].astype(np.float32)).sum(axis=1)
+        order = np.lexsort((hist, distances))[:k]
+        return indices[order], distances[order], hist[order]
+
+    # Every pair (i, j, distance), i < j, whose hashes differ in at most max_distance bits
+    def duplicate_pairs(self, max_distance=4):
+        hashes = self.phash
+        blocks = min(max_distance + 1, 64)  # Two hashes within max_distance agree exactly on at least one block
+        edges = np.linspace(0, 64, blocks + 1).astype(int)
+        found = []
+        for low, high in zip(edges[:-1], edges[1:]):
+            keys = (hashes >> np.uint64(low)) & np.uint64((1 << int(high - low)) - 1)
+            order = np.argsort(keys, kind="stable")
+            sorted_keys = keys[order]
+            # Pairs inside each bucket of equal keys: compare every entry with the one `offset` places later,
+            # for offsets up to the largest bucket, instead of looping over buckets
+            offset = 1
+            while offset < len(order):
+                same = np.flatnonzero(sorted_keys[offset:] == sorted_keys[:-offset])
+                if not len(same):
+                    break
+                left, right = order[same], order[same + offset]
+                distance = np.bitwise_count(hashes[left] ^ hashes[right])
+                close = distance <= max_distance
+                found.append(np.stack([np.minimum(left, right)[close], np.maximum(left, right)[close],
+                                       distance[close].astype(np.int64)], axis=1))
+                offset += 1
+        if not found:
+            return np.zeros((0, 3), dtype=np.int64)
+        pairs = np.unique(np.concatenate(found), axis=0)  # A pair can share several blocks
+        return pairs[np.lexsort((pairs[:, 1], pairs[:, 0], pairs[:, 2]))]
+
+
+# Build an index from an annotation manifest (the image,x,y,w,h,label files augmentation.py reads)
+def build_index(image_dir, manifest, output_dir, progress=True):
+    from augmentation import load_annotations
+    from cropping import clip_roi
+    from image_cache import imread
+
+    writer = RoiIndexWriter()
+    annotations = load_annotations(manifest, image_dir)
+    start = time.perf_counter()
+    for n, (path, rois) in enumerate(annotations.items()):
+        image = imread(path, use_cache=False)  # One pass, nothing is read twice
+        if image is None:
+            print(f"Skipping unreadable image: {path}", file=sys.stderr)
+            continue
+        boxes, labels = [], []
+        for x, y, w, h, label in rois:
+            clipped = clip_roi(x, y, w, h, image.shape[1], image.shape[0])
+            if clipped is not None:
+                boxes.append(clipped)
+                labels.append(label)
+        writer.add_image(image, boxes, os.path.relpath(path, image_dir), labels)
+        if progress:
+            print(f"\r{n + 1}/{len(annotations)} images  {writer.count} ROIs", end="", file=sys.stderr)
+    if progress:
+        print(file=sys.stderr)
+    writer.save(output_dir)
+    return writer.count, time.perf_counter() - start
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    commands = parser.add_subparsers(dest="command", required=True)
+    build = commands.add_parser("build", help="index the ROIs of a manifest")
+    build.add_argument("image_dir")
+    build.add_argument("-m", "--manifest", required=True, help="CSV or JSONL with image,x,y,w,h,label")
+    build.add_argument("-o", "--output", required=True, help="index directory")
+    dups = commands.add_parser("dups", help="list near-duplicate ROI pairs")
+    dups.add_argument("index")
+    dups.add_argument("--max-distance", type=int, default=4, help="Hamming distance of the 64-bit hashes")
+    query = commands.add_parser("query", help="find the ROIs closest to an image")
+    query.add_argument("index")
+    query.add_argument("image")
+    query.add_argument("-k", type=int, default=5)
+    args = parser.parse_args()
+
+    try:
+        if args.command == "build":
+            count, seconds = build_index(args.image_dir, args.manifest, args.output)
+            print(f"Indexed {count} ROIs in {seconds:.2f} s into {args.output}")
+        elif args.command == "dups":
+            index = RoiIndex(args.index)
+            start = time.perf_counter()
+            pairs = index.duplicate_pairs(args.max_distance)
+            elapsed = time.perf_counter() - start
+            for i, j, distance in pairs:
+                a, b = index.record(i), index.record(j)
+                print(f"{distance:2d}  {a['source']} ({a['x']},{a['y']},{a['w']},{a['h']}) {a['label']}  ~  "
+                      f"{b['source']} ({b['x']},{b['y']},{b['w']},{b['h']}) {b['label']}")
+            print(f"{len(pairs)} pairs within {args.max_distance} bits among {len(index)} ROIs "
+                  f"({1000 * elapsed:.1f} ms)")
+        else:
+            index = RoiIndex(args.index)
+            image = cv2.imread(args.image)
+            if image is None:
+                raise IOError(f"Could not read image: {args.image}")
+            start = time.perf_counter()
+            indices, distances, hist = index.query(image, args.k)
+            elapsed = time.perf_counter() - start
+            for i, distance, h in zip(indices, distances, hist):
+                print(f"{int(distance):2d} bits  hist L1 {h:.3f}  {json.dumps(index.record(i))}")
+            print(f"{1000 * elapsed:.1f} ms over {len(index)} ROIs")
+    except (IOError, ValueError, KeyError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,467 @@
+"""Marker detection over several cameras / streams at once, merged by timestamp.
+
+StreamManager opens every source (camera index, video file, RTSP-style
+URL or image directory, see frame_sources.py) and gives each one a
+capture thread. All streams share one pool of detection threads and one
+DetectorPool, so 8 cameras do not need 8 sets of workers: the workers
+take frames from the streams in turn (round robin), live streams keep
+only their newest frames (older ones are dropped and counted), files
+and image directories are read without dropping anything. File streams
+are taken in timestamp order across streams instead, and none runs
+more than max_lead seconds of media time ahead of another, so clips
+with different frame rates stay in step and the merge buffer stays
+small.
+
+Every frame gets a timestamp in seconds on a common clock: the capture
+time since the manager started for live streams, the media position
+for files (frame index / --fps for image directories). Detections come
+out of detections() merged across streams in timestamp order; a result
+is held back until no running stream can still produce an earlier one
+(or, for live streams, until it is max_delay seconds old). align()
+groups the merged stream into sets of frames taken within a tolerance
+of each other, one frame per stream at most.
+
+    python stream_manager.py cam0.mp4 cam1.mp4 cam2.mp4 -o markers.jsonl --workers 4
+    python stream_manager.py 0 1 rtsp://10.0.0.5/stream --display
+
+    with StreamManager(["0", "1", "clip.mp4"], workers=4) as manager:
+        for detection in manager.detections():
+            print(detection.time, detection.stream, detection.ids)
+    print(manager.report())
+
+Output lines (JSONL) are batch_detect.py records plus the stream time:
+{"frame": 12, "source": "cam1.mp4", "time": 0.4, "markers": [...]}.
+"""
+
+import argparse
+import collections
+import heapq
+import json
+import sys
+import threading
+import time
+
+import cv2
+from cv2 import aruco
+
+from batch_detect import make_record
+from frame_pipeline import StageCounter
+from frame_sources import open_frame_source
+from marker_detection import DEFAULT_DICTIONARY, DetectorPool, detect_markers
+
+DEFAULT_QUEUE_SIZE = 2  # Frames buffered per stream before live streams drop the oldest
+DEFAULT_MAX_DELAY = 0.5  # Seconds a live result waits for slower streams before it is emitted anyway
+DEFAULT_MAX_LEAD = 0.25  # Seconds of media time a file stream may be taken ahead of the other file streams
+DEFAULT_FPS = 30.0  # Frame rate assumed for image directories
+
+
+# One frame of one stream on its way through detection
+class StreamFrame:
+    __slots__ = ("stream", "index", "sequence", "time", "frame", "corners", "ids")
+
+    def __init__(self, stream, index, timestamp, frame):
+        self.stream = stream  # Stream name
+        self.index = index  # Frame number within the stream (counts dropped frames too)
+        self.sequence = 0  # Order in which the workers took it, set by StreamQueues.get
+        self.time = timestamp
+        self.frame = frame
+        self.corners = None
+        self.ids = None
+
+    def record(self):
+        record = make_record(self.index, self.stream, self.corners, self.ids)
+        record["time"] = round(self.time, 4)
+        return record
+
+
+# Per-stream frame queues read by the shared workers: live streams round robin, file streams (no dropping)
+# lowest timestamp first and at most max_lead seconds ahead of any other open file stream
+class StreamQueues:
+    def __init__(self, max_lead=DEFAULT_MAX_LEAD):
+        self.max_lead = max_lead
+        self._queues = collections.OrderedDict()  # stream -> deque
+        self._limits = {}
+        self._drop_oldest = {}
+        self._open = set()
+        self._taken = collections.Counter()
+        self._frontier = {}  # file stream -> timestamp of the last frame taken from it
+        self.dropped = collections.Counter()
+        self._cond = threading.Condition()
+
+    def add_stream(self, name, maxsize, drop_oldest):
+        with self._cond:
+            self._queues[name] = collections.deque()
+            self._limits[name] = maxsize
+            self._drop_oldest[name] = drop_oldest
+            self._open.add(name)
+            if not drop_oldest:
+                self._frontier[name] = float("-inf")
+
+    # Queue a frame; a full live stream drops its oldest frame, a full file stream waits. False once stopped.
+    def put(self, item, stop):
+        with self._cond:
+            items = self._queues[item.stream]
+            while len(items) >= self._limits[item.stream] and not stop.is_set():
+                if self._drop_oldest[item.stream]:
+                    items.popleft()
+                    self.dropped[item.stream] += 1
+                    break
+                self._cond.wait(0.1)
+            if stop.is_set():
+                return False
+            items.append(item)
+            self._cond.notify_all()
+            return True
+
+    def close_stream(self, name):
+        with self._cond:
+            self._open.discard(name)
+            self._cond.notify_all()
+
+    # File stream whose queued frame comes first in media time, if taking it stays within max_lead of every
+    # open file stream with nothing queued yet (whose next frame is no earlier than its last one)
+    def _next_file_stream(self):
+        heads = [(items[0].time, name) for name, items in self._queues.items() if name in self._frontier and items]
+        if not heads:
+            return None
+        timestamp, name = min(heads)
+        waiting = [self._frontier[other] for other, items in self._queues.items()
+                   if other in self._frontier and other in self._open and not items]
+        if waiting and timestamp > min(waiting) + self.max_lead:
+            return None
+        return name
+
+    # Next frame, taking the streams in turn (a file stream's turn goes to the file stream furthest behind);
+    # None on timeout or when every stream is closed and empty
+    def get(self, timeout=0.1):
+        with self._cond:
+            deadline = time.perf_counter() + timeout
+            while True:
+                file_stream = self._next_file_stream()
+                for name in list(self._queues):
+                    self._queues.move_to_end(name)  # Next call starts with the following stream
+                    if name in self._frontier:
+                        name = file_stream
+                    if name is None or not self._queues[name]:
+                        continue
+                    item = self._queues[name].popleft()
+                    item.sequence = self._taken[name]
+                    self._taken[name] += 1
+                    if name in self._frontier:
+                        self._frontier[name] = item.time
+                    self._cond.notify_all()
+                    return item
+                remaining = deadline - time.perf_counter()
+                if not self._open or remaining <= 0:
+                    return None
+                self._cond.wait(remaining)
+
+    # Frames the workers have taken from a stream so far
+    def taken(self, name):
+        with self._cond:
+            return self._taken[name]
+
+    def is_drained(self, name):
+        with self._cond:
+            return name not in self._open and not self._queues[name]
+
+    def close(self):
+        with self._cond:
+            self._open.clear()
+            self._cond.notify_all()
+
+
+# Merges the workers' results into one stream ordered by timestamp
+class DetectionMerger:
+    def __init__(self, max_delay=DEFAULT_MAX_DELAY):
+        self.max_delay = max_delay
+        self.late = 0  # Results emitted after a later timestamp had already gone out
+        self._pending = {}  # stream -> {sequence: result}, results that finished out of order
+        self._next = collections.Counter()  # stream -> next sequence to release
+        self._watermark = {}  # stream -> timestamp of its newest result released in order
+        self._heap = []  # (time, stream, sequence, result, arrived) waiting for the other streams
+        self._last_time = float("-inf")
+        self._lock = threading.Lock()
+
+    def add_stream(self, name):
+        with self._lock:
+            self._pending[name] = {}
+            self._watermark[name] = float("-inf")
+
+    # A worker finished a frame
+    def put(self, result):
+        with self._lock:
+            pending = self._pending[result.stream]
+            pending[result.sequence] = result
+            # Release this stream's results in the order the workers took them, their times only go up
+            while self._next[result.stream] in pending:
+                item = pending.pop(self._next[result.stream])
+                self._next[result.stream] += 1
+                self._watermark[result.stream] = max(self._watermark[result.stream], item.time)
+                heapq.heappush(self._heap, (item.time, item.stream, item.sequence, item, time.perf_counter()))
+
+    # Results that no running stream can precede any more; `running` maps stream -> (running, live)
+    def pop_ready(self, running):
+        ready = []
+        with self._lock:
+            limits = [self._watermark[name] for name, (active, _) in running.items() if active]
+            horizon = min(limits) if limits else float("inf")
+            now = time.perf_counter()
+            while self._heap:
+                timestamp, stream, _, item, arrived = self._heap[0]
+                live = running.get(stream, (False, False))[1]
+                if timestamp > horizon and not (live and now - arrived >= self.max_delay):
+                    break
+                heapq.heappop(self._heap)
+                if timestamp < self._last_time:
+                    self.late += 1
+                self._last_time = max(self._last_time, timestamp)
+                ready.append(item)
+        return ready
+
+    # Number of a stream's results released in order so far
+    def released(self, name):
+        with self._lock:
+            return self._next[name]
+
+    def __len__(self):
+        return len(self._heap)
+
+
+# A capture source plus its bookkeeping
+class Stream:
+    def __init__(self, name, source, fps=DEFAULT_FPS):
+        self.name = name
+        self.source = source
+        self.live = getattr(source, "is_live", True)
+        self.fps = fps
+        self.capture = StageCounter("capture")
+        self.detect = StageCounter("detect")
+        self.finished = False  # Capture ended
+        self.thread = None
+
+    # Timestamp of the frame just read: capture time for live streams, media time otherwise
+    def timestamp(self, index, clock_start):
+        if self.live:
+            return time.perf_counter() - clock_start
+        position = self.source.get(cv2.CAP_PROP_POS_MSEC)
+        if position > 0:
+            return position / 1000.0
+        return index / self.fps
+
+
+# Capture threads per stream, a shared pool of detection workers and the merged, time-ordered output
+class StreamManager:
+    def __init__(self, sources, workers=4, dictionary=DEFAULT_DICTIONARY, params=None, queue_size=DEFAULT_QUEUE_SIZE,
+                 max_delay=DEFAULT_MAX_DELAY, fps=DEFAULT_FPS, keep_frames=False, loop=False,
+                 max_lead=DEFAULT_MAX_LEAD):
+        self.workers = max(1, workers)
+        self.detectors = DetectorPool(self.workers, dictionary, params)
+        self.keep_frames = keep_frames  # Keep the pixels in the results (for display)
+        self.queues = StreamQueues(max_lead)
+        self.errors = collections.Counter()  # stream -> frames whose detection raised
+        self.merger = DetectionMerger(max_delay)
+        self.streams = {}
+        for spec in sources:
+            name = str(spec)
+            if name in self.streams:
+                raise ValueError(f"Source given twice: {name}")
+            source = open_frame_source(spec, loop=loop)
+            if not source.isOpened():
+                for stream in self.streams.values():
+                    stream.source.release()
+                raise IOError(f"Could not open source {name}")
+            stream = self.streams[name] = Stream(name, source, fps)
+            self.queues.add_stream(name, queue_size, drop_oldest=stream.live)
+            self.merger.add_stream(name)
+        self._stop = threading.Event()
+        self._threads = []
+        self._workers_alive = 0
+        self._workers_lock = threading.Lock()
+        self.started = None
+        self.emitted = 0
+
+    def start(self):
+        self.started = time.perf_counter()
+        for stream in self.streams.values():
+            stream.thread = threading.Thread(target=self._capture_loop, args=(stream,), name=f"capture-{stream.name}",
+                                             daemon=True)
+            self._threads.append(stream.thread)
+        self._workers_alive = self.workers
+        for i in range(self.workers):
+            self._threads.append(threading.Thread(target=self._worker_loop, name=f"detect-{i}", daemon=True))
+        for thread in self._threads:
+            thread.start()
+        return self
+
+    def _capture_loop(self, stream):
+        index = 0
+        try:
+            while not self._stop.is_set():
+                start = time.perf_counter()
+                ret, frame = stream.source.read()
+                if not ret:
+                    break
+                timestamp = stream.timestamp(index, self.started)
+                stream.capture.add(time.perf_counter() - start)
+                if not self.queues.put(StreamFrame(stream.name, index, timestamp, frame), self._stop):
+                    break
+                index += 1
+        except Exception as e:
+            print(f"Error reading {stream.name}: {str(e)}")
+        finally:
+            stream.finished = True
+            self.queues.close_stream(stream.name)
+
+    def _worker_loop(self):
+        try:
+            while not self._stop.is_set():
+                item = self.queues.get(timeout=0.1)
+                if item is None:
+                    if all(self.queues.is_drained(name) for name in self.streams):
+                        break
+                    continue
+                start = time.perf_counter()
+                try:
+                    with self.detectors.borrow() as detector:
+                        item.corners, item.ids = detect_markers(item.frame, detector=detector, raise_errors=True)
+                except Exception as e:
+                    print(f"Error detecting markers in {item.stream} frame {item.index}: {str(e)}")
+                    item.corners, item.ids = None, None  # Still merged, or the stream's later results wait forever
+                    self.errors[item.stream] += 1
+                self.streams[item.stream].detect.add(time.perf_counter() - start)
+                if not self.keep_frames:
+                    item.frame = None
+                self.merger.put(item)
+        finally:
+            with self._workers_lock:
+                self._workers_alive -= 1
+
+    # stream -> (may still produce results, live)
+    def _running(self):
+        running = {}
+        for name, stream in self.streams.items():
+            done = self.queues.is_drained(name) and self.merger.released(name) >= self.queues.taken(name)
+            running[name] = (not done, stream.live)
+        return running
+
+    @property
+    def finished(self):
+        return self._workers_alive == 0 and len(self.merger) == 0
+
+    # Merged detections in timestamp order, until every stream has ended (or stop() was called)
+    def detections(self, poll=0.01):
+        while True:
+            ready = self.merger.pop_ready(self._running())
+            for item in ready:
+                self.emitted += 1
+                yield item
+            if not ready:
+                if self.finished or (self._stop.is_set() and self._workers_alive == 0):
+                    for item in self.merger.pop_ready({}):  # Whatever is left, in order
+                        self.emitted += 1
+                        yield item
+                    return
+                time.sleep(poll)
+
+    def stop(self):
+        self._stop.set()
+        self.queues.close()
+        for thread in self._threads:
+            thread.join(timeout=2.0)
+        self._threads = []
+        for stream in self.streams.values():
+            stream.source.release()
+
+    def stats(self):
+        elapsed = time.perf_counter() - self.started if self.started else 0.0
+        streams = {}
+        for name, stream in self.streams.items():
+            streams[name] = {"captured": stream.capture.count, "detected": stream.detect.count,
+                             "dropped": self.queues.dropped[name], "errors": self.errors[name],
+                             "fps": stream.detect.count / elapsed if elapsed > 0 else 0.0,
+                             "detect_ms": 1000.0 * stream.detect.busy_seconds / max(1, stream.detect.count)}
+        detected = sum(stream["detected"] for stream in streams.values())
+        return {"streams": streams, "detected": detected, "seconds": elapsed, "emitted": self.emitted,
+                "fps": detected / elapsed if elapsed > 0 else 0.0, "late": self.merger.late, "workers": self.workers}
+
+    def report(self):
+        stats = self.stats()
+        lines = []
+        for name, stream in stats["streams"].items():
+            lines.append(f"{name:<24} {stream['detected']:6d} frames  {stream['fps']:7.1f} fps  "
+                         f"{stream['detect_ms']:6.2f} ms/frame  {stream['dropped']} dropped  {stream['errors']} errors")
+        lines.append(f"{'total':<24} {stats['detected']:6d} frames  {stats['fps']:7.1f} fps  on {stats['workers']} "
+                     f"workers, {stats['late']} emitted out of order")
+        return "\n".join(lines)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+# Group time-ordered detections into sets taken within `tolerance` seconds, at most one frame per stream
+def align(detections, tolerance=1 / DEFAULT_FPS / 2):
+    group = []
+    for item in detections:
+        if group and (item.time - group[0].time > tolerance or any(g.stream == item.stream for g in group)):
+            yield group
+            group = []
+        group.append(item)
+    if group:
+        yield group
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("sources", nargs="+", help="camera indices, video files / URLs or image directories")
+    parser.add_argument("-o", "--output", help="write merged detections to this .jsonl file")
+    parser.add_argument("--workers", type=int, default=4, help="detection threads shared by all streams")
+    parser.add_argument("--dictionary", default=DEFAULT_DICTIONARY)
+    parser.add_argument("--queue-size", type=int, default=DEFAULT_QUEUE_SIZE)
+    parser.add_argument("--max-delay", type=float, default=DEFAULT_MAX_DELAY,
+                        help="seconds a live result waits for slower streams")
+    parser.add_argument("--max-lead", type=float, default=DEFAULT_MAX_LEAD,
+                        help="seconds of media time a file stream may run ahead of the others")
+    parser.add_argument("--fps", type=float, default=DEFAULT_FPS, help="frame rate of image directories")
+    parser.add_argument("--display", action="store_true", help="one window per stream")
+    args = parser.parse_args()
+
+    try:
+        manager = StreamManager(args.sources, args.workers, args.dictionary, queue_size=args.queue_size,
+                                max_delay=args.max_delay, fps=args.fps, keep_frames=args.display,
+                                max_lead=args.max_lead)
+    except (IOError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+
+    output = open(args.output, "w") if args.output else None
+    markers = 0
+    try:
+        with manager:
+            for item in manager.detections():
+                if item.ids is not None:
+                    markers += len(item.ids)
+                if output is not None:
+                    output.write(json.dumps(item.record()) + "\n")
+                if args.display:
+                    if item.ids is not None:
+                        aruco.drawDetectedMarkers(item.frame, item.corners, item.ids)
+                    cv2.imshow(item.stream, item.frame)
+                    if cv2.waitKey(1) & 0xFF == ord("q"):
+                        break
+    except KeyboardInterrupt:
+        pass
+    finally:
+        if output is not None:
+            output.close()
+        if args.display:
+            cv2.destroyAllWindows()
+    print(manager.report())
+    print(f"{markers} markers")
+
+
+if __name__ == "__main__":
+    main()
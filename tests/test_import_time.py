@@ -0,0 +1,21 @@
+"""Import budgets of the package and the headless entry points, see benchmarks/check_import_time.py."""
+
+from benchmarks import check_import_time
+
+
+def test_import_budgets():
+    lines = []
+    failures = check_import_time.run_checks(runs=3, out=lines.append)
+    assert not failures, "\n".join(lines)
+
+
+def test_parse_importtime_counts_top_level_imports_after_marker():
+    stderr = "\n".join([
+        "import time: self [us] | cumulative | imported package",
+        "import time:       500 |        500 | site",
+        check_import_time.MARKER,
+        "import time:       900 |        900 |   json.decoder",
+        "import time:       300 |       1200 | json",
+        "import time:      2000 |       2000 | roi_index",
+    ])
+    assert check_import_time.parse_importtime(stderr) == 3.2
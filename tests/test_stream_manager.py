@@ -0,0 +1,38 @@
+"""StreamManager keeps merging, and counts the failure, when a detector raises on a frame."""
+
+import os
+
+import cv2
+
+from benchmarks.fixtures import marker_frames
+from stream_manager import StreamManager
+
+
+# Detector that raises on its n-th call and delegates otherwise
+class FailingDetector:
+    def __init__(self, detector, fail_on=3):
+        self.detector = detector
+        self.fail_on = fail_on
+        self.calls = 0
+
+    def detectMarkers(self, image):
+        self.calls += 1
+        if self.calls == self.fail_on:
+            raise cv2.error("injected detector failure")
+        return self.detector.detectMarkers(image)
+
+
+def test_detector_failure_is_counted_and_merged(tmp_path):
+    frames = marker_frames(160, 120, count=8, seed=3)
+    for i, frame in enumerate(frames):
+        cv2.imwrite(os.path.join(tmp_path, f"{i:03d}.png"), frame)
+
+    manager = StreamManager([str(tmp_path)], workers=1)
+    detector = manager.detectors._free.get()
+    manager.detectors._free.put(FailingDetector(detector))
+    with manager:
+        results = list(manager.detections())
+
+    assert [item.index for item in results] == list(range(len(frames)))
+    assert results[2].ids is None
+    assert manager.stats()["streams"][str(tmp_path)]["errors"] == 1
@@ -0,0 +1,216 @@
+"""Parallel tiled processing of large arrays through shared memory.
+
+TileScheduler puts the input and the output array in
+multiprocessing.shared_memory blocks. It then hands a process pool
+nothing but tile coordinates. Each worker attaches to both blocks once,
+reads its tile plus a halo of neighbouring pixels straight from the
+shared input, runs the tile function and writes the tile's core region
+straight into the shared output. Nothing pixel-sized is pickled or
+copied per worker; the only copy is the input into shared memory, and
+callers that produce the input themselves can write into
+scheduler.input directly and skip it.
+
+The halo is the context a neighbourhood operation needs beyond the tile
+edge: with a large enough halo the stitched result equals running the
+function on the whole array (filters.filter_halo() gives it for a
+filter spec). Operations without a finite halo cannot be tiled exactly:
+Canny's hysteresis follows connected edges across any number of tiles,
+so filter_tiled() runs the stages before "edge" on tiles and "edge" and
+everything after it on the whole stitched image.
+
+    with TileScheduler(functools.partial(apply_filters, filter_type="blur -> sharpen"),
+                       image.shape, image.dtype, halo=filter_halo("blur -> sharpen")) as scheduler:
+        sharp = scheduler.run(image)   # Shared output buffer, reused by the next run
+    edges = filter_tiled(image, "blur -> edge")   # blur tiled, Canny untiled: equals apply_filters
+
+    python tile_scheduler.py big.jpg --filter "blur -> sharpen" --workers 8 -o big_sharp.png
+    python tile_scheduler.py data.zip --classify knn --workers 8 -o landcover.png
+"""
+
+import argparse
+import functools
+import multiprocessing
+import os
+import sys
+import time
+from multiprocessing import shared_memory
+
+import cv2
+import numpy as np
+
+from filters import apply_filters, filter_halo, split_tileable
+
+DEFAULT_TILE_SIZE = 512
+PROBE_SIZE = 64
+
+
+# A numpy array in a named shared memory block; other processes attach by name instead of receiving a copy
+class SharedArray:
+    def __init__(self, shape, dtype, name=None):
+        self.shape = tuple(shape)
+        self.dtype = np.dtype(dtype)
+        self.owner = name is None  # Only the creator unlinks the block
+        size = max(1, int(np.prod(self.shape)) * self.dtype.itemsize)
+        if self.owner:
+            self.shm = shared_memory.SharedMemory(create=True, size=size)
+        else:
+            self.shm = shared_memory.SharedMemory(name=name)
+        self.array = np.ndarray(self.shape, dtype=self.dtype, buffer=self.shm.buf)
+
+    # What another process needs to attach: (name, shape, dtype)
+    @property
+    def spec(self):
+        return (self.shm.name, self.shape, self.dtype.str)
+
+    @classmethod
+    def attach(cls, spec):
+        name, shape, dtype = spec
+        return cls(shape, dtype, name=name)
+
+    def close(self):
+        self.array = None  # Views must be gone before the buffer can be released
+        self.shm.close()
+        if self.owner:
+            self.shm.unlink()
+
+
+# Core regions (y0, y1, x0, x1) of the tiles covering a height x width array, row by row
+def plan_tiles(height, width, tile_size=DEFAULT_TILE_SIZE):
+    return [(y, min(height, y + tile_size), x, min(width, x + tile_size))
+            for y in range(0, height, tile_size) for x in range(0, width, tile_size)]
+
+
+# Run fn on one tile plus its halo and write the core of the result into dst
+def _process_tile(src, dst, fn, halo, tile):
+    y0, y1, x0, x1 = tile
+    height, width = src.shape[:2]
+    py0, px0 = max(0, y0 - halo), max(0, x0 - halo)
+    py1, px1 = min(height, y1 + halo), min(width, x1 + halo)
+    result = fn(src[py0:py1, px0:px1])
+    dst[y0:y1, x0:x1] = result[y0 - py0:y1 - py0, x0 - px0:x1 - px0]
+    return tile
+
+
+# Per-process state, filled in by _init_worker
+_worker_state = {}
+
+
+def _init_worker(input_spec, output_spec, fn, halo):
+    cv2.setNumThreads(1)  # One OpenCV thread per process, the pool provides the parallelism
+    _worker_state.update(input=SharedArray.attach(input_spec), output=SharedArray.attach(output_spec), fn=fn, halo=halo)
+
+
+def _run_tile(tile):
+    state = _worker_state
+    return _process_tile(state["input"].array, state["output"].array, state["fn"], state["halo"], tile)
+
+
+# Tiled, parallel application of fn to arrays of one shape; pool and shared buffers are reused across runs
+class TileScheduler:
+    def __init__(self, fn, shape, dtype, tile_size=DEFAULT_TILE_SIZE, halo=0, workers=None):
+        self.fn = fn
+        self.halo = halo
+        self.tile_size = tile_size
+        self.workers = workers or os.cpu_count() or 1
+        # Output channels and dtype come from running fn on a small block of zeros
+        probe_shape = (min(shape[0], PROBE_SIZE), min(shape[1], PROBE_SIZE)) + tuple(shape[2:])
+        probe = np.asarray(fn(np.zeros(probe_shape, dtype=dtype)))
+        self.input = SharedArray(shape, dtype)
+        self.output = SharedArray(tuple(shape[:2]) + probe.shape[2:], probe.dtype)
+        self.tiles = plan_tiles(shape[0], shape[1], tile_size)
+        self.pool = None
+        if self.workers > 1:
+            self.pool = multiprocessing.Pool(self.workers, initializer=_init_worker,
+                                             initargs=(self.input.spec, self.output.spec, fn, halo))
+
+    # Process `array` (or whatever was written into self.input.array when None). The result is the
+    # shared output buffer, overwritten by the next run, unless `out` is given.
+    def run(self, array=None, out=None):
+        if array is not None:
+            if array.shape != self.input.shape:
+                raise ValueError(f"TileScheduler set up for {self.input.shape}, got {array.shape}")
+            np.copyto(self.input.array, array)  # The one copy: into shared memory, read by every worker
+        if self.pool is None:
+            for tile in self.tiles:
+                _process_tile(self.input.array, self.output.array, self.fn, self.halo, tile)
+        else:
+            chunksize = max(1, len(self.tiles) // (4 * self.workers))
+            for _ in self.pool.imap_unordered(_run_tile, self.tiles, chunksize):
+                pass
+        if out is not None:
+            np.copyto(out, self.output.array)
+            return out
+        return self.output.array
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        self.input.close()
+        self.output.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+# One-off tiled run; returns a private copy of the result
+def run_tiled(array, fn, tile_size=DEFAULT_TILE_SIZE, halo=0, workers=None):
+    with TileScheduler(fn, array.shape, array.dtype, tile_size, halo, workers) as scheduler:
+        return scheduler.run(array).copy()
+
+
+# apply_filters over tiles, with the halo the filter spec needs; stages from the first one that cannot be
+# tiled (edge) on run on the whole stitched image, so the result always equals apply_filters(image, spec)
+def filter_tiled(image, spec, tile_size=DEFAULT_TILE_SIZE, workers=None):
+    tiled, untiled = split_tileable(spec)
+    result = image
+    if tiled:
+        fn = functools.partial(apply_filters, filter_type=tiled)
+        result = run_tiled(image, fn, tile_size, filter_halo(tiled), workers)
+    if untiled:
+        result = apply_filters(result, untiled)
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("input", help="image file (--filter) or data.zip / band directory (--classify)")
+    mode = parser.add_mutually_exclusive_group(required=True)
+    mode.add_argument("--filter", help='filter spec, e.g. "blur -> sharpen -> edge"')
+    mode.add_argument("--classify", choices=("mindist", "gaussian", "knn"), help="classify a band stack")
+    parser.add_argument("--workers", type=int, default=None, help="processes (default: all cores)")
+    parser.add_argument("--tile-size", type=int, default=DEFAULT_TILE_SIZE)
+    parser.add_argument("-o", "--output", required=True)
+    args = parser.parse_args()
+
+    try:
+        if args.filter:
+            image = cv2.imread(args.input)
+            if image is None:
+                raise IOError(f"Could not read image: {args.input}")
+            start = time.perf_counter()
+            result = filter_tiled(image, args.filter, args.tile_size, args.workers)
+            elapsed = time.perf_counter() - start
+        else:
+            from band_stack import BandStack
+            from pixel_classifier import colorize, load_training_samples, make_classifier, predict_scene
+
+            image = BandStack.open(args.input).cube
+            classifier = make_classifier(args.classify).fit(*load_training_samples(args.input, image))
+            fn = functools.partial(predict_scene, classifier=classifier)
+            start = time.perf_counter()
+            result = colorize(run_tiled(image, fn, args.tile_size, 0, args.workers))
+            elapsed = time.perf_counter() - start
+        cv2.imwrite(args.output, result)
+    except (IOError, KeyError, ValueError) as e:
+        print(f"Error: {str(e)}")
+        sys.exit(1)
+    print(f"{image.shape[1]}x{image.shape[0]} in {elapsed:.2f} s, saved to {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,241 @@
+"""Tiled, multi-resolution access to very large images.
+
+On a cache miss TiledImage decodes the whole image once (PIL decodes
+JPEG, PNG and WebP in full on the first access, so a cold open needs
+the decoded image in memory, plus a converted copy for modes other
+than RGB / L). The pyramid build is what is streamed: the decoded image
+is converted and written strip by strip into on-disk .npy files, full
+resolution (BGR) plus a pyramid of half-size levels, all in the same
+pass and memory mapped afterwards. Later opens of the same file (same
+path, size and mtime) reuse the cache without decoding. Tiles are
+read from the memory-mapped levels through a byte-budgeted LRU cache,
+so a viewer only ever holds the tiles it shows.
+
+    image = TiledImage.open("survey.tif")
+    image.levels                     # [(h, w), (h/2, w/2), ...]
+    tile = image.tile(level, tx, ty) # BGR array of at most tile_size x tile_size
+    image.full_res                   # level 0 memmap; slicing reads only the slice from disk
+
+Pyramids live under DEFAULT_CACHE_DIR (<IMAGE_CACHE_DIR or the system
+temp dir>/tiled_image_cache, or pass cache_dir). The directory is capped
+at TILED_IMAGE_CACHE_BYTES (default 4 GB): after a new pyramid is built
+the least recently opened ones are deleted until the rest fits.
+prune_cache(cache_dir, 0) empties it.
+"""
+
+import glob
+import os
+import shutil
+import tempfile
+import time
+
+import cv2
+import numpy as np
+
+from image_cache import DEFAULT_DISK_DIR, LRUCache, cache_entry, default_cache, read_decode_seconds, write_meta
+
+DEFAULT_CACHE_DIR = os.path.join(DEFAULT_DISK_DIR or tempfile.gettempdir(), "tiled_image_cache")
+DEFAULT_CACHE_MAX_BYTES = int(os.environ.get("TILED_IMAGE_CACHE_BYTES", 4 * 1024 ** 3))
+STRIP_ROWS = 512  # Rows converted / downsampled at a time while building the cache
+
+
+# Shapes (h, w) of the pyramid levels: halve until the whole level fits into one tile
+def pyramid_shapes(height, width, tile_size):
+    shapes = [(height, width)]
+    while max(shapes[-1]) > tile_size:
+        h, w = shapes[-1]
+        shapes.append((max(1, h // 2), max(1, w // 2)))
+    return shapes
+
+
+# Streams rows into the .npy files of all pyramid levels at once; each level is fed by halving the one above
+class _PyramidWriter:
+    def __init__(self, paths, shapes):
+        self.paths = paths
+        self.shapes = shapes
+        self.rows = [0] * len(shapes)
+        self.leftover = [None] * len(shapes)  # Odd row waiting for its partner before it can be halved
+        self.files = []
+        for path, (height, width) in zip(paths, shapes):
+            file = open(path + ".tmp", "wb")
+            header = {"descr": np.lib.format.dtype_to_descr(np.dtype(np.uint8)), "fortran_order": False,
+                      "shape": (height, width, 3)}
+            np.lib.format.write_array_header_1_0(file, header)
+            self.files.append(file)
+
+    def push(self, level, rows):
+        rows = rows[:self.shapes[level][0] - self.rows[level]]  # Never write past the level's height
+        if len(rows) == 0:
+            return
+        self.files[level].write(memoryview(np.ascontiguousarray(rows)).cast("B"))
+        self.rows[level] += len(rows)
+        if level + 1 == len(self.shapes):
+            return
+        if self.leftover[level] is not None:
+            rows = np.concatenate([self.leftover[level], rows])
+            self.leftover[level] = None
+        if len(rows) % 2:
+            self.leftover[level] = rows[-1:].copy()
+        even = len(rows) // 2 * 2
+        if even:
+            width = self.shapes[level + 1][1]
+            self.push(level + 1, cv2.resize(rows[:even, :2 * width], (width, even // 2), interpolation=cv2.INTER_AREA))
+
+    def close(self):
+        # Levels only one row high (very thin images) still need their single row
+        for level in range(len(self.shapes) - 1):
+            if self.rows[level + 1] < self.shapes[level + 1][0] and self.leftover[level] is not None:
+                width = self.shapes[level + 1][1]
+                self.push(level + 1, cv2.resize(self.leftover[level], (width, 1), interpolation=cv2.INTER_AREA))
+        for file in self.files:
+            file.close()
+        for path, rows, (height, width) in zip(self.paths, self.rows, self.shapes):
+            if rows != height:
+                raise IOError(f"Pyramid level {path} got {rows} of {height} rows")
+        for path in self.paths:
+            os.replace(path + ".tmp", path)  # Only complete levels ever carry the final name
+
+
+# Decode an image (in full: PIL decodes it on the first crop) and write all pyramid levels as .npy files in
+# one pass, strip by strip. Plain file writes keep the written pixels in the page cache, not this process.
+def _build_pyramid(path, directory, tile_size):
+    from PIL import Image  # Only needed on a cache miss
+
+    Image.MAX_IMAGE_PIXELS = None  # Survey and satellite images exceed PIL's decompression-bomb limit
+    with Image.open(path) as pil_image:
+        if pil_image.mode not in ("RGB", "L"):
+            pil_image = pil_image.convert("RGB")
+        width, height = pil_image.size
+        shapes = pyramid_shapes(height, width, tile_size)
+        paths = [os.path.join(directory, f"level_{level}.npy") for level in range(len(shapes))]
+        writer = _PyramidWriter(paths, shapes)
+        for y in range(0, height, STRIP_ROWS):
+            strip = np.asarray(pil_image.crop((0, y, width, min(height, y + STRIP_ROWS))))
+            code = cv2.COLOR_GRAY2BGR if strip.ndim == 2 else cv2.COLOR_RGB2BGR
+            writer.push(0, cv2.cvtColor(strip, code))
+        writer.close()
+    return paths
+
+
+# Bytes and last use (newest meta.json mtime, touched on every open) of one image's cache entry
+def _entry_usage(entry):
+    size, last_used = 0, 0.0
+    for root, _, files in os.walk(entry):
+        for name in files:
+            try:
+                stat = os.stat(os.path.join(root, name))
+            except OSError:
+                continue  # Removed by another process meanwhile
+            size += stat.st_size
+            if name == "meta.json":
+                last_used = max(last_used, stat.st_mtime)
+    return size, last_used
+
+
+# Delete the least recently opened pyramids until the cache directory holds at most max_bytes; `keep` (an
+# entry in use) is never deleted. Returns the number of bytes freed.
+def prune_cache(cache_dir=DEFAULT_CACHE_DIR, max_bytes=DEFAULT_CACHE_MAX_BYTES, keep=None):
+    try:
+        entries = [os.path.join(cache_dir, name) for name in os.listdir(cache_dir)]
+    except OSError:
+        return 0
+    usage = {entry: _entry_usage(entry) for entry in entries if os.path.isdir(entry)}
+    total = sum(size for size, _ in usage.values())
+    freed = 0
+    for entry in sorted(usage, key=lambda e: usage[e][1]):
+        if total - freed <= max_bytes:
+            break
+        if keep and os.path.abspath(entry) == os.path.abspath(keep):
+            continue
+        shutil.rmtree(entry, ignore_errors=True)  # Files still mapped elsewhere (Windows) stay until next time
+        if not os.path.exists(entry):
+            freed += usage[entry][0]
+    return freed
+
+
+# A large image as a pyramid of memory-mapped levels with an LRU tile cache
+class TiledImage:
+    def __init__(self, levels, tile_size=512, cache_bytes=256 * 1024 * 1024):
+        self._levels = levels  # Level 0 is full resolution, each next level is half the size
+        self.tile_size = tile_size
+        self.cache = LRUCache(cache_bytes)
+
+    # Open through the pyramid cache; hits and decode time go into `stats` (the shared image cache stats)
+    @classmethod
+    def open(cls, path, cache_dir=DEFAULT_CACHE_DIR, tile_size=512, cache_bytes=256 * 1024 * 1024, stats=None,
+             cache_max_bytes=DEFAULT_CACHE_MAX_BYTES):
+        stats = stats or default_cache.stats
+        entry = cache_entry(path, cache_dir)
+        directory = os.path.join(entry, f"tiles_{tile_size}")
+        os.makedirs(directory, exist_ok=True)
+        meta = os.path.join(directory, "meta.json")
+        paths = sorted(glob.glob(os.path.join(directory, "level_*.npy")), key=lambda p: int(p[p.rindex("_") + 1:-4]))
+        if paths and max(np.load(paths[-1], mmap_mode="r").shape[:2]) <= tile_size:
+            stats.record_hit(read_decode_seconds(meta), disk=True)
+            try:
+                os.utime(meta)  # Most recently used, for prune_cache
+            except OSError:
+                pass
+        else:
+            start = time.perf_counter()
+            paths = _build_pyramid(path, directory, tile_size)
+            decode_seconds = time.perf_counter() - start
+            stats.record_miss(decode_seconds)
+            write_meta(meta, decode_seconds, os.path.abspath(path))
+            prune_cache(cache_dir, cache_max_bytes, keep=entry)
+        levels = [np.load(level_path, mmap_mode="r") for level_path in paths]
+        return cls(levels, tile_size, cache_bytes)
+
+    @property
+    def full_res(self):
+        return self._levels[0]
+
+    @property
+    def levels(self):
+        return [level.shape[:2] for level in self._levels]
+
+    @property
+    def shape(self):
+        return self._levels[0].shape
+
+    def level_array(self, level):
+        return self._levels[level]
+
+    # Factor from level coordinates to full-resolution pixels (exact, levels are rounded down)
+    def scale(self, level):
+        return self._levels[0].shape[1] / self._levels[level].shape[1]
+
+    # Coarsest level that still has at least `zoom` level pixels per screen pixel
+    def level_for_zoom(self, zoom):
+        level = 0
+        while level + 1 < len(self._levels) and 1.0 / self.scale(level + 1) >= zoom:
+            level += 1
+        return level
+
+    # Number of tiles (columns, rows) at a level
+    def grid(self, level):
+        height, width = self._levels[level].shape[:2]
+        return (-(-width // self.tile_size), -(-height // self.tile_size))
+
+    # Tiles intersecting the rectangle [x0, x1) x [y0, y1) in level coordinates
+    def visible_tiles(self, level, x0, y0, x1, y1):
+        columns, rows = self.grid(level)
+        size = self.tile_size
+        tx0, ty0 = max(0, int(x0) // size), max(0, int(y0) // size)
+        tx1, ty1 = min(columns, -(-int(x1) // size)), min(rows, -(-int(y1) // size))
+        return [(tx, ty) for ty in range(ty0, ty1) for tx in range(tx0, tx1)]
+
+    # One tile as an in-memory BGR array
+    def tile(self, level, tx, ty):
+        key = (level, tx, ty)
+        tile = self.cache.get(key)
+        if tile is None:
+            size = self.tile_size
+            source = self._levels[level]
+            tile = self.cache.put(key, np.array(source[ty * size:(ty + 1) * size, tx * size:(tx + 1) * size]))
+        return tile
+
+    # Map level coordinates to full-resolution pixel coordinates
+    def to_full_res(self, x, y, level):
+        factor = self.scale(level)
+        return x * factor, y * factor
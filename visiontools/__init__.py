@@ -0,0 +1,77 @@
+"""Importable entry point to the shared detection, filtering, cropping and normalization code.
+
+Importing the package loads nothing heavy: every name below is resolved
+from its module on first use (PEP 562 module __getattr__), so a worker
+that only needs load_roi_data never imports OpenCV, and nothing here
+imports tkinter or PIL (only the GUI scripts do, and only on their GUI
+paths).
+
+    import visiontools
+    corners, ids = visiontools.detect_markers(frame)      # imports cv2 / marker_detection now
+    edges = visiontools.apply_filters(frame, "blur -> edge")
+    crop = visiontools.crop_roi(image, visiontools.roi_from_points(start, end, image.shape))
+    data = visiontools.normalize(crop)
+
+The implementations stay in the top-level modules the scripts import
+(marker_detection.py, filters.py, cropping.py, preprocessing.py, ...);
+benchmarks/check_import_time.py keeps the import cost of the package and
+of the headless entry points within budget.
+"""
+
+import importlib
+
+# Public name -> module that defines it
+_EXPORTS = {
+    # Marker detection
+    "detect_markers": "marker_detection",
+    "get_detector": "marker_detection",
+    "DetectorPool": "marker_detection",
+    "DEFAULT_DICTIONARY": "marker_detection",
+    "MarkerTracker": "marker_tracking",
+    # Filters
+    "apply_filters": "filters",
+    "FilterChain": "filters",
+    "filter_halo": "filters",
+    # ROI cropping and export
+    "clip_roi": "cropping",
+    "crop_roi": "cropping",
+    "roi_from_points": "cropping",
+    "save_crop": "cropping",
+    "export_roi": "cropping",
+    "crop_batch": "batch_crop",
+    # Normalization
+    "normalize": "preprocessing",
+    "standardize": "preprocessing",
+    "standardized_to_uint8": "preprocessing",
+    "compute_stats": "preprocessing",
+    "RunningStats": "preprocessing",
+    "save_roi_data": "roi_export",
+    "load_roi_data": "roi_export",
+    # ROI statistics and near-duplicate index
+    "RoiIndex": "roi_index",
+    "RoiIndexWriter": "roi_index",
+    # Images and frames
+    "imread": "image_cache",
+    "ImageCache": "image_cache",
+    "TiledImage": "tiled_image",
+    "open_frame_source": "frame_sources",
+    "FramePipeline": "frame_pipeline",
+    "StreamManager": "stream_manager",
+    "AsyncSaver": "async_saver",
+    "FrameProfiler": "frame_profiler",
+}
+
+__all__ = sorted(_EXPORTS)
+
+
+def __getattr__(name):
+    module = _EXPORTS.get(name)
+    if module is None:
+        raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+    value = getattr(importlib.import_module(module), name)
+    globals()[name] = value  # Later lookups skip __getattr__
+    return value
+
+
+def __dir__():
+    return sorted(set(globals()) | set(_EXPORTS))